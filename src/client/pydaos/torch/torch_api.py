@@ -11,7 +11,10 @@ to access training data on DAOS DFS via POSIX container.
 In addition, it provides Checkpoint class to save and load PyTorch model checkpoints.
 """
 
+import errno
+import hashlib
 import io
+import json
 import math
 import os
 import stat
@@ -29,6 +32,10 @@ PARALLEL_SCAN_WORKERS = 16
 DIR_CACHE_SIZE = 64 * 1024
 DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
 DEFAULT_CHUNKS_LIMIT = 1024 // DEFAULT_CHUNK_SIZE
+DEFAULT_DEDUP_CHUNK_SIZE = 4 * 1024 * 1024
+MANIFEST_MAGIC = b"DAOS_TORCH_CKPT_MANIFEST"
+MANIFEST_VERSION = 1
+CHUNK_FILE_PREFIX = ".ckpt_chunk."
 
 
 def transform_fn_default(data):
@@ -321,8 +328,8 @@ class WriteBuffer(io.BufferedIOBase):
             if work is None:
                 break
 
-            (offset, chunk) = work
-            self._dfs.write(self._path, self._mode, self._oflags,
+            (path, offset, chunk) = work
+            self._dfs.write(path, self._mode, self._oflags,
                             self._class_name, self._file_chunk_size, offset, chunk)
 
     def write(self, data):
@@ -397,7 +404,7 @@ class WriteBuffer(io.BufferedIOBase):
         forcing the caller to wait until some of the chunks are written to the storage.
         """
 
-        self._queue.put((offset, chunk))
+        self._queue.put((self._path, offset, chunk))
 
     @property
     def closed(self):
@@ -416,6 +423,112 @@ class WriteBuffer(io.BufferedIOBase):
         return False
 
 
+class IncrementalWriteBuffer(WriteBuffer):
+    """
+    Class representing stream like write buffer for incremental (deduplicated) checkpoints.
+
+    The stream is split into chunks of dedup_chunk_size bytes and every chunk is addressed by
+    the SHA-256 digest of its content. Chunks are stored as separate files next to the
+    checkpoint and only chunks that are not already present in the container are written.
+    On close() a small manifest listing the chunk digests is written under the checkpoint name,
+    so the unchanged parts of the model state (frozen layers, embeddings, etc.) are shared
+    with the earlier checkpoints instead of being written again.
+
+    This class is not intended to be used directly: Checkpoint class is the main interface.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, dfs, path, mode, open_flags, class_name,
+                 file_chunk_size, dedup_chunk_size, chunks_limit, workers, known_chunks):
+        if dedup_chunk_size <= 0:
+            raise ValueError("dedup_chunk_size must be greater than zero")
+
+        self._digests = []
+        # digests of the chunks known to be stored in the container, shared with Checkpoint
+        self._known_chunks = known_chunks
+        # digests of the chunks written by this buffer, known only once the writes succeeded
+        self._pending_chunks = set()
+        self._written_chunks = 0
+        super().__init__(dfs, path, mode, open_flags, class_name,
+                         file_chunk_size, dedup_chunk_size, chunks_limit, workers)
+
+    def close(self):
+        """Upload any chunks left in buffer, wait for the transfers and write the manifest."""
+        if self.closed:
+            return
+
+        super().close()
+
+        if any(worker.exitcode != 0 for worker in self._workers):
+            raise OSError(errno.EIO, "failed to write checkpoint chunks", self._path)
+        self._known_chunks.update(self._pending_chunks)
+
+        manifest = _pack_manifest(self._position, self._transfer_chunk_size, self._digests)
+        self._dfs.write(self._path, self._mode, self._oflags,
+                        self._class_name, self._file_chunk_size, 0, manifest)
+
+    def _submit_chunk(self, offset, chunk):
+        """ Submits chunk for writing only if its content is not stored in the container yet.
+        The offset is not used: chunks are addressed by content, the manifest keeps their order.
+        """
+
+        digest = hashlib.sha256(chunk).hexdigest()
+        self._digests.append(digest)
+        if digest in self._known_chunks or digest in self._pending_chunks:
+            return
+
+        path = _chunk_path(self._path, digest)
+        if self._dfs.exists(path, len(chunk)):
+            self._known_chunks.add(digest)
+            return
+
+        if len(self._workers) == 0:
+            self._dfs.write(path, self._mode, self._oflags,
+                            self._class_name, self._file_chunk_size, 0, chunk)
+            self._known_chunks.add(digest)
+            self._written_chunks += 1
+            return
+
+        # the workers can't report back, the digest is known once they all exited successfully
+        self._pending_chunks.add(digest)
+        self._written_chunks += 1
+        self._queue.put((path, 0, chunk))
+
+    @property
+    def written_chunks(self):
+        """Return the number of chunks written, the others were already stored."""
+        return self._written_chunks
+
+
+def _chunk_path(path, digest):
+    """ Returns path of the deduplicated chunk stored next to the checkpoint file """
+
+    return os.path.join(os.path.dirname(path), CHUNK_FILE_PREFIX + digest)
+
+
+def _pack_manifest(size, chunk_size, digests):
+    """ Serializes the incremental checkpoint manifest, the header line carries the length of the
+    JSON body so any stale data left in the file by a larger checkpoint is ignored on read """
+
+    body = json.dumps({"size": size, "chunk_size": chunk_size, "chunks": digests}).encode()
+    header = b"%s %d %d\n" % (MANIFEST_MAGIC, MANIFEST_VERSION, len(body))
+    return header + body
+
+
+def _unpack_manifest(data):
+    """ Returns parsed manifest or None if data is not an incremental checkpoint manifest """
+
+    if not data.startswith(MANIFEST_MAGIC):
+        return None
+
+    end = data.index(b"\n")
+    (_, version, length) = bytes(data[:end]).split()
+    if int(version) != MANIFEST_VERSION:
+        raise ValueError(f"unsupported checkpoint manifest version: {int(version)}")
+
+    return json.loads(bytes(data[end + 1:end + 1 + int(length)]))
+
+
 class Checkpoint():
     """
     Class representing checkpoint interface for pytorch to save and load
@@ -449,6 +562,15 @@ class Checkpoint():
     workers: int (optional)
         Number of workers to be used for parallel chunked writes.
         This parameter is used only when transfer_chunk_size is set to non-zero value.
+    incremental: bool (optional)
+        Write incremental (deduplicated) checkpoints, default is False.
+        The checkpoint is split into chunks of dedup_chunk_size bytes and only the chunks
+        whose content changed since the previous checkpoints are written to the container,
+        the checkpoint file itself holds a small manifest referencing the chunks.
+        Chunk files are stored in the prefix directory and are shared between the checkpoints.
+    dedup_chunk_size: int (optional)
+        Chunk size used for content hashing in incremental mode,
+        default is DEFAULT_DEDUP_CHUNK_SIZE = 4MB.
 
     Methods
     -------
@@ -469,6 +591,8 @@ class Checkpoint():
                  transfer_chunk_size=DEFAULT_CHUNK_SIZE,
                  chunks_limit=DEFAULT_CHUNKS_LIMIT,
                  workers=4,
+                 incremental=False,
+                 dedup_chunk_size=DEFAULT_DEDUP_CHUNK_SIZE,
                  ):
         self._pool = pool
         self._cont = cont
@@ -480,6 +604,10 @@ class Checkpoint():
         self._transfer_chunk_size = transfer_chunk_size
         self._chunks_limit = chunks_limit
         self._workers = workers
+        self._incremental = incremental
+        self._dedup_chunk_size = dedup_chunk_size
+        # digests of the deduplicated chunks known to be stored in the container
+        self._known_chunks = set()
         self._dfs = _Dfs(pool=pool, cont=cont, rd_only=False)
 
     def __del__(self):
@@ -506,6 +634,14 @@ class Checkpoint():
         path = os.path.join(self._prefix, file)
         size = self._dfs.get_file_size(path)
 
+        # Any checkpoint might be incremental, whatever the mode it is read with.
+        # Only the magic is read first, so full checkpoints are not read twice
+        if size > len(MANIFEST_MAGIC):
+            (magic,) = self._dfs.batch_read([(path, len(MANIFEST_MAGIC), 0)])
+            if magic == MANIFEST_MAGIC:
+                manifest = _unpack_manifest(self._dfs.read(path, size))
+                return self._read_chunks(path, manifest, stream)
+
         chunks_limit = self._chunks_limit
         if chunks_limit == 0:
             chunks_limit = size // DEFAULT_CHUNK_SIZE
@@ -531,6 +667,29 @@ class Checkpoint():
         stream.seek(0)
         return stream
 
+    def _read_chunks(self, path, manifest, stream):
+        """ Reassembles incremental checkpoint from the chunks referenced by its manifest """
+
+        size = manifest["size"]
+        chunk_size = manifest["chunk_size"]
+        digests = manifest["chunks"]
+
+        chunks = [(_chunk_path(path, digest), min(chunk_size, size - idx * chunk_size), 0)
+                  for idx, digest in enumerate(digests)]
+
+        chunks_limit = self._chunks_limit
+        if chunks_limit == 0:
+            chunks_limit = max(len(chunks), 1)
+
+        for i in range(0, len(chunks), chunks_limit):
+            batch = chunks[i:i + chunks_limit]
+            for data in self._dfs.batch_read(batch):
+                stream.write(data)
+
+        self._known_chunks.update(digests)
+        stream.seek(0)
+        return stream
+
     def writer(self, file):
         """ Returns write buffer to save the checkpoint file """
 
@@ -538,6 +697,12 @@ class Checkpoint():
             raise ValueError("file is required")
 
         path = os.path.join(self._prefix, file)
+        if self._incremental:
+            return IncrementalWriteBuffer(self._dfs, path, self._mode, self._oflags,
+                                          self._class_name, self._file_chunk_size,
+                                          self._dedup_chunk_size, self._chunks_limit,
+                                          self._workers, self._known_chunks)
+
         return WriteBuffer(self._dfs, path, self._mode, self._oflags,
                            self._class_name, self._file_chunk_size, self._transfer_chunk_size,
                            self._chunks_limit, self._workers)
@@ -673,6 +838,106 @@ class _Dfs():
 
         return result
 
+    def walk_worker_fn(self, in_work, out_entries, readdir_batch_size=READDIR_BATCH_SIZE):
+        """
+        Worker function to walk the directory tree in parallel.
+        For every (path, index) tuple received from `in_work` it emits (path, dirs, files,
+        to_scan, error) to `out_entries`, with the subdirectory names, (name, size) tuples of
+        the other entries and the anchored subdirectories to scan.
+        """
+
+        self.worker_init()
+
+        while True:
+            work = in_work.get()
+            if work is None:
+                break
+
+            (path, index) = work
+
+            dirs = []
+            files = []
+            to_scan = []
+            ret = torch_shim.torch_list_with_anchor(DAOS_MAGIC, self._dfs,
+                                                    path, index, files, dirs, readdir_batch_size
+                                                    )
+            try:
+                if ret != 0:
+                    raise OSError(ret, os.strerror(ret), path)
+                for d in dirs:
+                    to_scan.append(self.split_dir_for_parallel_scan(os.path.join(path, d)))
+            except OSError as err:
+                out_entries.put((path, [], [], [], err))
+                continue
+
+            out_entries.put((path, dirs, files, to_scan, None))
+
+    def parallel_walk(self, path=None,
+                      readdir_batch_size=READDIR_BATCH_SIZE,
+                      workers=PARALLEL_SCAN_WORKERS):
+        """
+        Walks the directory tree with the same parallel anchored readdir as parallel_list.
+
+        It yields a tuple (path, dirs, files) for every directory, once all its anchored parts
+        were scanned, where `dirs` is the list of subdirectory names and `files` the list of
+        (name, size) tuples of the other entries.
+        """
+        if path is None:
+            path = os.sep
+
+        if not path.startswith(os.sep):
+            raise ValueError("relative path is unacceptable")
+
+        procs = []
+        work = Queue()
+        entries = Queue()
+        for _ in range(workers):
+            worker = Process(target=self.walk_worker_fn, args=(work, entries, readdir_batch_size))
+            worker.start()
+            procs.append(worker)
+
+        # directory path: [anchored parts left to scan, dirs, files]
+        pending = {}
+        queued = 0
+
+        def submit(anchored_dirs):
+            nonlocal queued
+            if not anchored_dirs:
+                return
+            pending[anchored_dirs[0][0]] = [len(anchored_dirs), [], []]
+            for anchored_dir in anchored_dirs:
+                work.put(anchored_dir)
+                queued += 1
+
+        try:
+            submit(self.split_dir_for_parallel_scan(path))
+
+            while queued > 0:
+                (dir_path, dirs, files, to_scan, error) = entries.get()
+                queued -= 1
+                if error is not None:
+                    raise error
+
+                for anchored_dirs in to_scan:
+                    submit(anchored_dirs)
+
+                state = pending[dir_path]
+                state[0] -= 1
+                state[1].extend(dirs)
+                state[2].extend(files)
+                if state[0] == 0:
+                    del pending[dir_path]
+                    yield (dir_path, state[1], state[2])
+        finally:
+            if queued > 0:
+                for worker in procs:
+                    worker.terminate()
+            else:
+                for _ in procs:
+                    work.put(None)
+            for worker in procs:
+                worker.join()
+
     def read(self, path, size):
         """ This is specialized version of file read, when the file size is known in advance. """
 
@@ -722,3 +987,13 @@ class _Dfs():
         if ret != 0:
             raise OSError(ret, os.strerror(ret), path)
         return size
+
+    def exists(self, path, size=None):
+        """ Returns True if the file exists and, when size is given, has exactly that size """
+
+        ret, fsize = torch_shim.torch_get_fsize(DAOS_MAGIC, self._dfs, path)
+        if ret == errno.ENOENT:
+            return False
+        if ret != 0:
+            raise OSError(ret, os.strerror(ret), path)
+        return size is None or fsize == size
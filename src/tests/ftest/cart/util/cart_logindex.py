@@ -0,0 +1,272 @@
+# /*
+#  * (C) Copyright 2025 Hewlett Packard Enterprise Development LP
+#  *
+#  * SPDX-License-Identifier: BSD-2-Clause-Patent
+# */
+
+"""
+Sidecar indexes of CaRT log files, used by LogIter.
+
+Large log files are indexed in one pass, keeping only the offset, pid and
+level of every line, and the index is saved next to the log so that the next
+tool opening it does not have to scan it again.  Logs compressed by
+compress_log() are written as independent bz2 streams, with a block table
+allowing to decompress only the blocks holding the lines of a pid.
+"""
+
+import argparse
+import array
+import bz2
+import json
+import os
+import sys
+from collections import OrderedDict
+
+# Number of lines summarised by each block of the sidecar index.
+INDEX_BLOCK_LINES = 64 * 1024
+INDEX_MAGIC = b'CaRT log index 1\n'
+
+# Uncompressed size of each independent stream of a log written by compress_log().
+COMPRESS_BLOCK_SIZE = 4 * 1024 * 1024
+BZ2_INDEX_MAGIC = b'CaRT bz2 log index 1\n'
+
+
+def get_index_name(fname):
+    """Return the name of the sidecar index of a log file"""
+    return '{}.index'.format(fname)
+
+
+def _get_line_pid(fields):
+    """Return the pid of a line split in bytes fields, or None if it is not a cart log line"""
+    if len(fields) < 6 or len(fields[0]) != 17 or fields[0][2:3] != b'/':
+        return None
+    pidtid = fields[2][5:-1]
+    pid = pidtid.split(b"/")
+    return int(pid[0])
+
+
+class LogIndex():
+    """Index of the lines of a log file.
+
+    The start offset of every line is kept, plus an end of file entry, with the pid and level
+    of the line, -1 and 0 for lines which are not cart log lines.  Every INDEX_BLOCK_LINES lines
+    are summarised by the pids, facilities, lowest level and time range of the block.
+    """
+
+    def __init__(self):
+        self.offsets = array.array('Q', [0])
+        self.line_pids = array.array('q')
+        self.line_levels = array.array('B')
+        self.blocks = []
+        self.pids = OrderedDict()
+
+    def build(self, data, log_levels):
+        """Index the lines of data, a memory mapped file.
+
+        Raises KeyError with the name of the level of a line missing from log_levels.
+        """
+        pids = self.pids
+
+        index = 0
+        position = 0
+        block = None
+        for line in iter(data.readline, b''):
+            if index % INDEX_BLOCK_LINES == 0:
+                block = {'pids': set(), 'facilities': set(), 'min_level': 0,
+                         'first_time': None, 'last_time': None}
+                self.blocks.append(block)
+            position += len(line)
+            self.offsets.append(position)
+            fields = line.split(None, 5)
+            index += 1
+            l_pid = _get_line_pid(fields)
+            if l_pid is None:
+                self.line_pids.append(-1)
+                self.line_levels.append(0)
+                continue
+            level = log_levels[fields[4].decode('latin-1')]
+            self.line_levels.append(level)
+            self.line_pids.append(l_pid)
+            if l_pid in pids:
+                pids[l_pid]['line_count'] += 1
+            else:
+                pids[l_pid] = {'line_count': 1, 'first_index': index}
+            pids[l_pid]['last_index'] = index
+
+            block['pids'].add(l_pid)
+            block['facilities'].add(fields[3])
+            if not block['min_level'] or level < block['min_level']:
+                block['min_level'] = level
+            if block['first_time'] is None:
+                block['first_time'] = fields[0]
+            block['last_time'] = fields[0]
+
+        for block in self.blocks:
+            block['facilities'] = sorted(fac.decode('latin-1') for fac in block['facilities'])
+            for key in ('first_time', 'last_time'):
+                if block[key] is not None:
+                    block[key] = block[key].decode('latin-1')
+
+    def load(self, fname, stbuf):
+        """Load the sidecar index of fname if it matches the file, returns True on success"""
+        try:
+            with open(get_index_name(fname), 'rb') as index_fd:
+                if index_fd.readline() != INDEX_MAGIC:
+                    return False
+                header = json.loads(index_fd.readline())
+                if header['size'] != stbuf.st_size or header['mtime_ns'] != stbuf.st_mtime_ns \
+                   or header['byteorder'] != sys.byteorder \
+                   or header['block_lines'] != INDEX_BLOCK_LINES:
+                    return False
+                offsets = array.array('Q')
+                offsets.fromfile(index_fd, header['lines'] + 1)
+                line_pids = array.array('q')
+                line_pids.fromfile(index_fd, header['lines'])
+                line_levels = array.array('B')
+                line_levels.fromfile(index_fd, header['lines'])
+        except (OSError, EOFError, ValueError, KeyError):
+            return False
+
+        self.offsets = offsets
+        self.line_pids = line_pids
+        self.line_levels = line_levels
+        self.pids = OrderedDict((int(pid), info) for (pid, info) in header['pids'])
+        self.blocks = header['blocks']
+        for block in self.blocks:
+            block['pids'] = set(block['pids'])
+        return True
+
+    def save(self, fname, stbuf):
+        """Write the sidecar index of fname, ignoring errors as it is only a cache"""
+        header = {'size': stbuf.st_size,
+                  'mtime_ns': stbuf.st_mtime_ns,
+                  'byteorder': sys.byteorder,
+                  'block_lines': INDEX_BLOCK_LINES,
+                  'lines': len(self.line_pids),
+                  'pids': list(self.pids.items()),
+                  'blocks': [dict(block, pids=sorted(block['pids'])) for block in self.blocks]}
+        index_name = get_index_name(fname)
+        tmp_name = '{}.{}.tmp'.format(index_name, os.getpid())
+        try:
+            with open(tmp_name, 'wb') as index_fd:
+                index_fd.write(INDEX_MAGIC)
+                index_fd.write(json.dumps(header).encode() + b'\n')
+                self.offsets.tofile(index_fd)
+                self.line_pids.tofile(index_fd)
+                self.line_levels.tofile(index_fd)
+            os.replace(tmp_name, index_name)
+        except OSError:
+            # The log directory might be read-only, the next run will index the file again.
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+
+
+def read_block_table(fname, stbuf):
+    """Load the block table of a file written by compress_log().
+
+    Returns the pids and the blocks of the file, or None if there is no valid block table.
+    """
+    try:
+        with open(get_index_name(fname), 'rb') as index_fd:
+            if index_fd.readline() != BZ2_INDEX_MAGIC:
+                return None
+            header = json.loads(index_fd.readline())
+            if header['size'] != stbuf.st_size or header['mtime_ns'] != stbuf.st_mtime_ns:
+                return None
+            pids = OrderedDict((int(pid), info) for (pid, info) in header['pids'])
+            blocks = header['blocks']
+            for block in blocks:
+                block['pids'] = set(block['pids'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return (pids, blocks)
+
+
+def read_block(fd, block):
+    """Return the decompressed data of one block of a file written by compress_log()"""
+    fd.seek(block['offset'])
+    return bz2.decompress(fd.read(block['length']))
+
+
+def compress_log(fname, block_size=COMPRESS_BLOCK_SIZE, remove=True):
+    """Compress a log file to fname.bz2, with a block table for LogIter
+
+    The compressed file is a series of independent bz2 streams of about block_size bytes of whole
+    lines so it can still be read by bzip2 or bzcat, the offset, line range and pids of every
+    stream are saved in the sidecar index of the compressed file.  The log file and any sidecar
+    index of it are removed afterwards unless remove is False.
+    """
+    bz2_name = '{}.bz2'.format(fname)
+    pids = OrderedDict()
+    blocks = []
+
+    index = 0
+    offset = 0
+    with open(fname, 'rb') as in_fd, open(bz2_name, 'wb') as out_fd:
+        while True:
+            data = in_fd.read(block_size)
+            if not data:
+                break
+            # End the block on a line boundary.
+            data += in_fd.readline()
+            block_pids = set()
+            first_index = index + 1
+            for line in data.splitlines():
+                index += 1
+                l_pid = _get_line_pid(line.split(None, 5))
+                if l_pid is None:
+                    continue
+                block_pids.add(l_pid)
+                if l_pid in pids:
+                    pids[l_pid]['line_count'] += 1
+                else:
+                    pids[l_pid] = {'line_count': 1, 'first_index': index}
+                pids[l_pid]['last_index'] = index
+            compressed = bz2.compress(data, 9)
+            out_fd.write(compressed)
+            blocks.append({'offset': offset,
+                           'length': len(compressed),
+                           'first_index': first_index,
+                           'lines': index - first_index + 1,
+                           'pids': sorted(block_pids)})
+            offset += len(compressed)
+
+    stbuf = os.stat(bz2_name)
+    header = {'size': stbuf.st_size,
+              'mtime_ns': stbuf.st_mtime_ns,
+              'lines': index,
+              'pids': list(pids.items()),
+              'blocks': blocks}
+    index_name = get_index_name(bz2_name)
+    tmp_name = '{}.{}.tmp'.format(index_name, os.getpid())
+    with open(tmp_name, 'wb') as index_fd:
+        index_fd.write(BZ2_INDEX_MAGIC)
+        index_fd.write(json.dumps(header).encode() + b'\n')
+    os.replace(tmp_name, index_name)
+
+    if remove:
+        os.unlink(fname)
+        try:
+            os.unlink(get_index_name(fname))
+        except FileNotFoundError:
+            pass
+    return bz2_name
+
+
+def run():
+    """Compress log files"""
+    parser = argparse.ArgumentParser(description='Compress CaRT log files with a block table')
+    parser.add_argument('--compress', action='store_true', required=True,
+                        help='compress the files to <file>.bz2 and remove them')
+    parser.add_argument('--block-size', type=int, default=COMPRESS_BLOCK_SIZE,
+                        help='uncompressed size of each block in bytes')
+    parser.add_argument('files', nargs='+', help='input files')
+    args = parser.parse_args()
+    for fname in args.files:
+        compress_log(fname, block_size=args.block_size)
+
+
+if __name__ == '__main__':
+    run()
@@ -12,10 +12,14 @@ This provides a way of querying CaRT logfiles for processing.
 """
 
 import bz2
+import io
+import mmap
 import os
 import re
 from collections import OrderedDict
 
+import cart_logindex
+
 
 class InvalidPid(Exception):
     """Exception to be raised when invalid pid is requested."""
@@ -90,15 +94,16 @@ class LogLine():
     # Match DF_CONT
     re_cont = re.compile(r"[0-9a-f]{8}/[0-9a-f]{8}(:?)")
 
+    # The message fields are only split when first accessed, so lines that are only filtered on
+    # their pid or level stay cheap.  StateIter adds rpc, pdesc, pparent and rpc_opcode.
+    __slots__ = ('_line', '_parsed', 'pid', 'fac', 'level', 'time_stamp', 'hostname', 'rpc',
+                 'pdesc', 'pparent', 'rpc_opcode')
+
     def __init__(self, line):
-        fields = line.split()
-        # Work out the end of the fixed-width portion, and the beginning of the
-        # message.  The hostname and pid fields are both variable width
-        idx = 29 + len(fields[1]) + len(fields[2])
+        fields = line.split(None, 5)
         pidtid = fields[2][5:-1]
         pid = pidtid.split("/")
         self.pid = int(pid[0])
-        self._preamble = line[:idx]
         self.fac = fields[3]
         try:
             self.level = LOG_LEVELS[fields[4]]
@@ -107,32 +112,79 @@ class LogLine():
 
         self.time_stamp = fields[0]
         self.hostname = fields[1]
-        self._fields = fields[5:]
+        self._line = line
+        # (preamble, fields, msg, trace, function, descriptor) once parsed
+        self._parsed = None
+
+    def _parse(self):
+        """Split the message of the line into fields, on first use"""
+        line = self._line
+        self._line = None
+        fields = line.split()
+        # Work out the end of the fixed-width portion, and the beginning of the
+        # message.  The hostname and pid fields are both variable width
+        idx = 29 + len(fields[1]) + len(fields[2])
+        preamble = line[:idx]
+        fields = fields[5:]
+        trace = False
+        function = None
+        descriptor = None
         try:
-            if self._fields[1][-2:] == '()':
-                self.trace = False
-                self.function = self._fields[1][:-2]
-            elif self._fields[1][-1:] == ')':
-                self.trace = True
-            else:
-                self.trace = False
+            if fields[1][-2:] == '()':
+                function = fields[1][:-2]
+            elif fields[1][-1:] == ')':
+                trace = True
         except IndexError:
             # Catch truncated log lines.
-            self.trace = False
+            pass
 
-        if self.trace and self.level in (7, 3) and self.fac in ('rpc', 'hg'):
-            del self._fields[2:5]
+        if trace and self.level in (7, 3) and self.fac in ('rpc', 'hg'):
+            del fields[2:5]
 
-        if self.trace:
-            fn_str = self._fields[1]
+        if trace:
+            fn_str = fields[1]
             start_idx = fn_str.find('(')
-            self.function = fn_str[:start_idx]
+            function = fn_str[:start_idx]
             desc = fn_str[start_idx + 1:-1]
             if desc == '(nil)':
-                self.descriptor = ''
+                descriptor = ''
             else:
-                self.descriptor = desc
-        self._msg = ' '.join(self._fields)
+                descriptor = desc
+        self._parsed = (preamble, fields, ' '.join(fields), trace, function, descriptor)
+        return self._parsed
+
+    @property
+    def _preamble(self):
+        return (self._parsed or self._parse())[0]
+
+    @property
+    def _fields(self):
+        return (self._parsed or self._parse())[1]
+
+    @property
+    def _msg(self):
+        return (self._parsed or self._parse())[2]
+
+    @property
+    def trace(self):
+        """True for lines logged by the trace macros, with a descriptor"""
+        return (self._parsed or self._parse())[3]
+
+    @property
+    def function(self):
+        """The function logging the line, raises AttributeError if not known"""
+        function = (self._parsed or self._parse())[4]
+        if function is None:
+            raise AttributeError('function')
+        return function
+
+    @property
+    def descriptor(self):
+        """The descriptor of a trace line, raises AttributeError for other lines"""
+        descriptor = (self._parsed or self._parse())[5]
+        if descriptor is None:
+            raise AttributeError('descriptor')
+        return descriptor
 
     def to_str(self, mark=False):
         """Convert the object to a string"""
@@ -143,6 +195,8 @@ class LogLine():
         return '{}    {}'.format(preamble, self._msg)
 
     def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
         if attr == 'parent':
             if self._fields[2] == 'Registered':
                 # This is a bit of a hack but handle the case where descriptor
@@ -166,6 +220,20 @@ class LogLine():
                 pass
         raise AttributeError
 
+    def in_functions(self, functions):
+        """Returns True if the line was logged by one of the functions.
+
+        The line is only parsed if one of the names appears in it, so most lines are rejected
+        without splitting their message.
+        """
+        if self._parsed is None and not any(name in self._line for name in functions):
+            return False
+        return (self._parsed or self._parse())[4] in functions
+
+    def msg_count(self, text):
+        """Return the number of times text appears in the line, from the filename onwards"""
+        return self._msg.count(text)
+
     def get_msg(self):
         """Return the message part of a line, stripping up to and including the filename"""
         return ' '.join(self._fields[1:])
@@ -372,6 +440,44 @@ class LogLine():
         return self.get_field(-1).rstrip('.')
 
 
+class LogPipeline():
+    """Route the lines of a single pass over a log file to the analyzers interested in them.
+
+    An analyzer is any object with add_line() and report() methods, such as the tracers of
+    cart_logtest.  It is registered with the facilities and the functions it wants to see, None
+    for all of them.  The facility is read from the fixed part of the line and the functions
+    are pre-filtered with in_functions(), so lines no analyzer wants are never fully parsed.
+    """
+
+    def __init__(self):
+        self._analyzers = []
+        self._routes = {}
+
+    def add_analyzer(self, analyzer, facs=None, functions=None):
+        """Register an analyzer"""
+        if functions is not None:
+            functions = frozenset(functions)
+        self._analyzers.append((analyzer, facs, functions))
+        self._routes = {}
+
+    def add_line(self, line):
+        """Pass a line to the interested analyzers"""
+        try:
+            route = self._routes[line.fac]
+        except KeyError:
+            route = [(analyzer, functions) for (analyzer, facs, functions) in self._analyzers
+                     if facs is None or line.fac in facs]
+            self._routes[line.fac] = route
+        for (analyzer, functions) in route:
+            if functions is None or line.in_functions(functions):
+                analyzer.add_line(line)
+
+    def report(self):
+        """Report the results of every analyzer, in registration order"""
+        for (analyzer, _, _) in self._analyzers:
+            analyzer.report()
+
+
 class StateIter():
     """Helper class for LogIter to add a state-full iterator.
 
@@ -449,14 +555,25 @@ class LogIter():
 
     This class implements a iterator for lines in a cart log file.  The iterator
     is rewindable, and there are options for automatically skipping lines.
+
+    Small files are loaded into memory, large files are memory mapped and
+    indexed in one pass, keeping only the offset, pid and level of every
+    line, and bz2 files are re-read for every pid.  Files written by
+    cart_logindex.compress_log() are the exception, their block table
+    allows decompressing only the blocks holding lines of the pid.
+
+    The index of a large file is saved next to it as a sidecar file, so that
+    the next tool opening the same log, or a rerun, does not have to scan it
+    again, unless write_index is False.  The sidecar is only used while the
+    size and modification time of the log, and the block size, match.
     """
 
-    def __init__(self, fname, check_encoding=False):
+    def __init__(self, fname, check_encoding=False, write_index=True):
         """Load a file, and check how many processes have written to it"""
         # Depending on file size either pre-read entire file into memory,
-        # or do a first pass checking the pid list.  This allows the same
-        # iterator to work fast if the file can be kept in memory, or the
-        # same, bug slower if it needs to be re-read each time.
+        # or do a first pass indexing the lines of the memory mapped file.
+        # This allows the same iterator to work fast if the file can be kept
+        # in memory, and in bounded memory otherwise.
         #
         # Try and open the file as utf-8, but if that doesn't work then
         # find and report the error, then continue with the file open as
@@ -475,9 +592,12 @@ class LogIter():
 
         if fname.endswith('.bz2'):
             # Allow direct operation on bz2 files.  Supports multiple pids
-            # per file as normal, however does not try and seek to file
-            # positions, rather walks the entire file for each pid.
-            self._fd = bz2.open(fname, 'rt')
+            # per file as normal, if the file has a block table then only the
+            # blocks of the pid are decompressed, otherwise it does not try
+            # and seek to file positions, rather walks the entire file for
+            # each pid.
+            # pylint: disable-next=consider-using-with
+            self._fd = open(fname, 'rb')
             self.bz2 = True
         else:
             if check_encoding:
@@ -502,12 +622,25 @@ class LogIter():
 
         self.fname = fname
         self._data = []
+        self._pids = OrderedDict()
+        self._mmap = None
+        # Index of the memory mapped file, see cart_logindex.LogIndex.
+        self._offsets = None
+        self._line_pids = None
+        self._line_levels = None
+        self._blocks = []
+        self._bz2_blocks = None
+        self._write_index = write_index
 
         stbuf = os.fstat(self._fd.fileno())
         self.__from_file = bool(stbuf.st_size > (1024 * 1024 * 100)) or self.bz2
 
-        if self.__from_file:
-            self._load_pids()
+        if self.bz2:
+            if not self._read_block_table(stbuf):
+                self._fd = bz2.open(self._fd, 'rt')
+                self._load_pids()
+        elif self.__from_file:
+            self._load_index()
         else:
             self._load_data()
 
@@ -522,6 +655,9 @@ class LogIter():
         self._iter_count = 0
         self._iter_pid = None
         self._iter_last_index = 0
+        self._line_index = 0
+        self._block_index = 0
+        self._block_lines = iter(())
 
     def _load_data(self):
         """Load all data into memory"""
@@ -567,6 +703,82 @@ class LogIter():
             position += len(line)
         self._pids = pids
 
+    def _load_index(self):
+        """Memory map the file, and load its sidecar index or index it"""
+        stbuf = os.fstat(self._fd.fileno())
+        self._mmap = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+        index = cart_logindex.LogIndex()
+        if not index.load(self.fname, stbuf):
+            try:
+                index.build(self._mmap, LOG_LEVELS)
+            except KeyError as error:
+                raise InvalidLogFile(error.args[0]) from error
+            if self._write_index:
+                index.save(self.fname, stbuf)
+        self._offsets = index.offsets
+        self._line_pids = index.line_pids
+        self._line_levels = index.line_levels
+        self._blocks = index.blocks
+        self._pids = index.pids
+
+    def reopen(self):
+        """Reopen a bz2 file, so that a forked process does not share the file offset.
+
+        Memory mapped and in-memory files have no offset to share, and are left as they are.
+        """
+        if not self.bz2:
+            return
+        # pylint: disable-next=consider-using-with
+        self._fd = open(self.fname, 'rb')
+        if self._bz2_blocks is None:
+            self._fd = bz2.open(self._fd, 'rt')
+
+    def get_index_name(self):
+        """Return the name of the sidecar index of the file"""
+        return cart_logindex.get_index_name(self.fname)
+
+    def get_blocks(self):
+        """Return the summaries of the blocks of the index, for memory mapped files only.
+
+        Each block is a dict with the pids, facilities, lowest (most severe) level, first and
+        last time stamps of cart_logindex.INDEX_BLOCK_LINES lines.
+        """
+        return self._blocks
+
+    def _read_block_table(self, stbuf):
+        """Load the block table of a bz2 file with a sidecar index, returns True on success"""
+        table = cart_logindex.read_block_table(self.fname, stbuf)
+        if table is None:
+            return False
+        (self._pids, self._bz2_blocks) = table
+        return True
+
+    def _read_block(self, block):
+        """Decompress one block of a bz2 file with a sidecar index, returns a line iterator"""
+        data = cart_logindex.read_block(self._fd, block)
+        try:
+            text = data.decode('utf-8')
+        except UnicodeDecodeError as err:
+            text = data.decode('latin-1')
+            if not self.file_corrupt:
+                print('ERROR: Invalid data in server.log on following line')
+                start = text.rfind('\n', 0, err.start) + 1
+                print(text[start:].split('\n', 1)[0])
+                self.file_corrupt = True
+        return io.StringIO(text, newline=None)
+
+    def _get_line(self, index):
+        """Return the text of a line of the memory mapped file"""
+        data = self._mmap[self._offsets[index]:self._offsets[index + 1]]
+        try:
+            return data.decode(self._fd.encoding)
+        except UnicodeDecodeError:
+            if not self.file_corrupt:
+                print('ERROR: Invalid data in server.log on following line')
+                print(data.decode('latin-1').rstrip('\n'))
+                self.file_corrupt = True
+            return data.decode('latin-1')
+
     def new_iter(self, pid=None, stateful=False, trace_only=False, raw=False):
         """Rewind file iterator, and set options
 
@@ -581,12 +793,11 @@ class LogIter():
             except KeyError as error:
                 raise InvalidPid from error
 
-            if self.__from_file:
-                if self.bz2:
-                    self._iter_last_index = self._iter_pid['last_index']
-                else:
-                    self._iter_last_index = \
-                        self._iter_pid['last_index'] - self._iter_pid['first_index'] + 1
+            if self.bz2:
+                self._iter_last_index = self._iter_pid['last_index']
+            elif self.__from_file:
+                self._iter_last_index = \
+                    self._iter_pid['last_index'] - self._iter_pid['first_index'] + 1
             else:
                 self._iter_last_index = self._iter_pid['last_index']
 
@@ -608,21 +819,63 @@ class LogIter():
     def __iter__(self):
         self._iter_index = 0
         self._iter_count = 0
-        if self.__from_file:
-            if self._pid is None or self.bz2:
-                self._fd.seek(0)
+        if self._bz2_blocks is not None:
+            self._block_index = 0
+            self._block_lines = iter(())
+        elif self.bz2:
+            self._fd.seek(0)
+        elif self.__from_file:
+            if self._pid is None:
+                self._line_index = 0
             else:
-                self._fd.seek(self._iter_pid['file_pos'])
+                self._line_index = self._iter_pid['first_index'] - 1
         else:
             self._offset = 0
         return self
 
     def __lnext(self):
-        """Helper function for __next__"""
-        if self.__from_file:
-            line = self._fd.readline()
-            if not line:
+        """Helper function for __next__
+
+        Returns None for lines of other pids which are skipped without parsing them.
+        """
+        if self._mmap is not None:
+            index = self._line_index
+            if index >= len(self._line_pids):
                 raise StopIteration
+            self._line_index += 1
+            l_pid = self._line_pids[index]
+            if self._pid is not None and l_pid != self._pid:
+                block_lines = cart_logindex.INDEX_BLOCK_LINES
+                block_index = index // block_lines
+                if index % block_lines == 0 and \
+                   self._pid not in self._blocks[block_index]['pids']:
+                    # Skip the whole block, keeping the line count in step.
+                    next_index = (block_index + 1) * block_lines
+                    self._iter_index += next_index - index - 1
+                    self._line_index = next_index
+                return None
+            if l_pid == -1:
+                return LogRaw(self._get_line(index))
+            return LogLine(self._get_line(index))
+
+        if self.__from_file:
+            if self._bz2_blocks is not None:
+                line = next(self._block_lines, None)
+                while line is None:
+                    if self._block_index >= len(self._bz2_blocks):
+                        raise StopIteration
+                    block = self._bz2_blocks[self._block_index]
+                    self._block_index += 1
+                    if self._pid is not None and self._pid not in block['pids']:
+                        # Skip the block without decompressing it, keeping the line count in step.
+                        self._iter_index += block['lines']
+                        continue
+                    self._block_lines = self._read_block(block)
+                    line = next(self._block_lines, None)
+            else:
+                line = self._fd.readline()
+                if not line:
+                    raise StopIteration
             fields = line.split(None, 8)
             if len(fields) < 6 or len(fields[0]) != 17 or fields[0][2] != '/':
                 return LogRaw(line)
@@ -646,6 +899,9 @@ class LogIter():
 
             line = self.__lnext()
 
+            if line is None:
+                continue
+
             if not self._raw and isinstance(line, LogRaw):
                 continue
 
@@ -7,6 +7,8 @@
 """This provides consistency checking for CaRT log files."""
 
 import argparse
+import io
+import multiprocessing
 import re
 import sys
 import time
@@ -148,15 +150,20 @@ shown_logs = set()
 wf = None  # pylint: disable=invalid-name
 
 
+def format_line(line, sev, msg):
+    """Return a log line in gcc error format"""
+    return "{}:{}:1: {}: {} '{}'".format(line.filename,
+                                         line.lineno,
+                                         sev,
+                                         msg,
+                                         line.get_anon_msg())
+
+
 def show_line(line, sev, msg, custom=None):
     """Output a log line in gcc error format"""
     # Only report each individual line once.
 
-    log = "{}:{}:1: {}: {} '{}'".format(line.filename,
-                                        line.lineno,
-                                        sev,
-                                        msg,
-                                        line.get_anon_msg())
+    log = format_line(line, sev, msg)
     if log in shown_logs:
         return False
     print(log)
@@ -168,6 +175,27 @@ def show_line(line, sev, msg, custom=None):
     return True
 
 
+def replay_output(output, shown):
+    """Print the output of a check run in another process, given the lines it reported.
+
+    Lines already reported in this process are skipped as show_line() would, along with the
+    memory address printed after them.
+    """
+    skipped = False
+    for line in output.splitlines():
+        if line in shown:
+            skipped = line in shown_logs
+            if skipped:
+                continue
+            shown_logs.add(line)
+        elif skipped and line.startswith('Memory address is '):
+            # Only printed when the line above was reported.
+            continue
+        else:
+            skipped = False
+        print(line)
+
+
 class HwmCounter():
     """Class to track integer values, with high-water mark"""
 
@@ -239,9 +267,12 @@ class LogTest():
         if not self.quiet and not self._common_shown:
             self._show_common_logs()
 
-    def add_tracer(self, callback, facs):
-        """Add a tracer for later use"""
-        self._tracers.append((callback, facs))
+    def add_tracer(self, callback, facs, functions=None):
+        """Add a tracer for later use
+
+        The tracer is passed the lines of the facilities and functions given, None for all.
+        """
+        self._tracers.append((callback, facs, functions))
 
     def save_log_line(self, line):
         """Record a single line of logging"""
@@ -281,10 +312,19 @@ class LogTest():
                                             100 * count / self.log_count))
         self._common_shown = True
 
-    def check_log_file(self, abort_on_warning, show_memleaks=True, leak_wf=None):
-        """Check a single log file for consistency"""
+    def check_log_file(self, abort_on_warning, show_memleaks=True, leak_wf=None, jobs=1):
+        """Check a single log file for consistency
+
+        With jobs > 1 the pids are checked by a pool of forked processes, unless tracers or web
+        feedback objects are in use as these cannot be shared across processes.
+        """
+        pids = self._li.get_pids()
+        if jobs > 1 and len(pids) > 1 and not self._tracers and wf is None and leak_wf is None:
+            self._check_pids_parallel(pids, abort_on_warning, show_memleaks, jobs)
+            return
+
         to_raise = None
-        for pid in self._li.get_pids():
+        for pid in pids:
             if wf:
                 wf.reset_pending()
             try:
@@ -297,6 +337,67 @@ class LogTest():
         if to_raise:
             raise to_raise
 
+    def _check_pids_parallel(self, pids, abort_on_warning, show_memleaks, jobs):
+        """Check the pids in parallel, merging the results in pid order.
+
+        The output of each pid is replayed in pid order whatever order the workers finish in,
+        skipping lines already reported for an earlier pid, see replay_output().  The first error
+        in pid order is raised, as in sequential mode.
+        """
+        global _parallel_test  # pylint: disable=global-statement
+        _parallel_test = (self, abort_on_warning, show_memleaks)
+        to_raise = None
+        try:
+            ctx = multiprocessing.get_context('fork')
+            with ctx.Pool(min(jobs, len(pids)), initializer=self._li.reopen) as pool:
+                for (output, shown, error, stats) in pool.imap(_check_pid_worker, pids):
+                    replay_output(output, shown)
+                    (log_locs, log_fac, log_levels, log_count, fi_triggered, fi_location) = stats
+                    self.log_locs.update(log_locs)
+                    self.log_fac.update(log_fac)
+                    self.log_levels.update(log_levels)
+                    self.log_count += log_count
+                    if fi_triggered:
+                        self.fi_triggered = True
+                        self.fi_location = fi_location
+                    if error is not None and to_raise is None:
+                        to_raise = error
+        finally:
+            _parallel_test = None
+        self._show_common_logs()
+        if to_raise:
+            raise to_raise
+
+    def check_pid_captured(self, pid, abort_on_warning, show_memleaks=True):
+        """Check a single pid with the output captured, for the workers of a parallel check.
+
+        Returns the output, the lines reported, the error raised or None, and the statistics
+        to be merged into those of the parent.
+        """
+        self.log_locs = Counter()
+        self.log_fac = Counter()
+        self.log_levels = Counter()
+        self.log_count = 0
+        # The parent process reports the common logs once for all pids.
+        self._common_shown = True
+        shown_logs.clear()
+
+        real_stdout = sys.stdout
+        sys.stdout = io.StringIO()
+        error = None
+        try:
+            self._check_pid_from_log_file(pid, abort_on_warning, None,
+                                          show_memleaks=show_memleaks)
+        except LogCheckError as err:
+            error = err
+        finally:
+            output = sys.stdout.getvalue()
+            sys.stdout = real_stdout
+
+        stats = (self.log_locs, self.log_fac, self.log_levels, self.log_count,
+                 self.fi_triggered, self.fi_location)
+        return (output, set(shown_logs), error, stats)
+
     def check_dfuse_io(self):
         """Parse dfuse i/o"""
         for pid in self._li.get_pids():
@@ -347,41 +448,42 @@ class LogTest():
 
         trace_lines = 0
         non_trace_lines = 0
-        cb_list = []
+        pipeline = cart_logparse.LogPipeline()
 
         if not self.quiet:
             rpc_r = RpcReporting()
             if self.ftest_mode:
                 rpc_r.dynamic_level = True
 
-            cb_list.append((rpc_r, ('hg', 'rpc')))
-        for tracer in self._tracers:
-            cb_list.append((tracer[0], tracer[1]))
+            pipeline.add_analyzer(rpc_r, ('hg', 'rpc'), RpcReporting.known_functions)
+        for (callback, facs, functions) in self._tracers:
+            pipeline.add_analyzer(callback, facs, functions)
 
         if not self.ftest_mode:
             mem_r = MemReporting()
             mem_r.wf = leak_wf
             mem_r.show_memleaks = show_memleaks
-            cb_list.append((mem_r, None))
+            pipeline.add_analyzer(mem_r)
 
         for line in self._li.new_iter(pid=pid, stateful=True):
-            for (cbe, facs) in cb_list:
-                if facs is None or line.fac in facs:
-                    cbe.add_line(line)
+            pipeline.add_line(line)
             self.save_log_line(line)
             try:
-                msg = ''.join(line._fields[2:])
-
-                if 'DER_UNKNOWN' in msg:
-                    show_line(line, 'NORMAL', 'Use of DER_UNKNOWN')
-                if 'Unknown error' in msg:
-                    show_line(line, 'NORMAL', 'Invalid strerror value')
-                # Warn if a line references the name of the function it was in,
-                # but skip short function names or _internal suffixes.
-                if line.function in msg and len(line.function) > 6 and \
-                   re.search(r'\b' + line.function + r'\b', msg) is not None and \
-                   '{}_internal'.format(line.function) not in msg:
-                    show_line(line, 'NORMAL', 'Logging references function name')
+                # Only join the message for lines which may fail these checks, the name of the
+                # function appears once before the message.
+                if line.msg_count('DER_UNKNOWN') or line.msg_count(line.function) > 1:
+                    msg = ''.join(line._fields[2:])
+
+                    if 'DER_UNKNOWN' in msg:
+                        show_line(line, 'NORMAL', 'Use of DER_UNKNOWN')
+                    if 'Unknown error' in msg:
+                        show_line(line, 'NORMAL', 'Invalid strerror value')
+                    # Warn if a line references the name of the function it was in,
+                    # but skip short function names or _internal suffixes.
+                    if line.function in msg and len(line.function) > 6 and \
+                       re.search(r'\b' + line.function + r'\b', msg) is not None and \
+                       '{}_internal'.format(line.function) not in msg:
+                        show_line(line, 'NORMAL', 'Logging references function name')
             except AttributeError:
                 pass
             if abort_on_warning:
@@ -516,8 +618,7 @@ class LogTest():
             mem_r.active_desc = active_desc
 
         del active_desc['root']
-        for (cbe, _) in cb_list:
-            cbe.report()
+        pipeline.report()
 
         if not self.ftest_mode:
             active_desc = mem_r.active_desc
@@ -555,6 +656,16 @@ class LogTest():
             raise WarningMode()
 
 
+# The test run by the workers of LogTest._check_pids_parallel(), inherited when forking.
+_parallel_test = None  # pylint: disable=invalid-name
+
+
+def _check_pid_worker(pid):
+    """Check one pid in a worker process"""
+    (log_test, abort_on_warning, show_memleaks) = _parallel_test
+    return log_test.check_pid_captured(pid, abort_on_warning, show_memleaks)
+
+
 class MemReporting():
     """Class for checking memory allocations"""
 
@@ -782,10 +893,15 @@ def run():
     parser.add_argument('--dfuse', help='Summarise dfuse I/O', action='store_true')
     parser.add_argument('--warnings', action='store_true')
     parser.add_argument('--ftest-mode', action='store_true')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of processes checking the pids of the file in parallel')
     parser.add_argument('file', help='input file')
     args = parser.parse_args()
+    # In ftest mode the log directory is archived afterwards, so do not leave sidecar index files
+    # in it.
+    write_index = not args.ftest_mode
     try:
-        log_iter = cart_logparse.LogIter(args.file)
+        log_iter = cart_logparse.LogIter(args.file, write_index=write_index)
     except UnicodeDecodeError:
         # If there is a unicode error in the log file then retry with checks
         # enabled which should both report the error and run in latin-1 so
@@ -795,7 +911,7 @@ def run():
         # The only possible danger here is the file is simply too big to check
         # the encoding on, in which case this second attempt would fail with
         # an out-of-memory error.
-        log_iter = cart_logparse.LogIter(args.file, check_encoding=True)
+        log_iter = cart_logparse.LogIter(args.file, check_encoding=True, write_index=write_index)
 
     # ftest mode is called from launch.py for logs after functional testing.
     # It logs everything to a output file, and does not perform memory leak or double-free checks.
@@ -815,7 +931,7 @@ def run():
         test_iter.check_dfuse_io()
     else:
         try:
-            test_iter.check_log_file(args.warnings)
+            test_iter.check_log_file(args.warnings, jobs=args.jobs)
         except LogError:
             print('Errors in log file, ignoring')
         except NotAllFreed:
@@ -36,6 +36,13 @@ class CodeLoc():
         else:
             self.no_fault = True
 
+    def merge(self, other):
+        """Add the logging instances of the same location from another run"""
+        self.count += other.count
+        self.allocation = self.allocation or other.allocation
+        self.fault_injected = self.fault_injected or other.fault_injected
+        self.no_fault = self.no_fault or other.no_fault
+
     def is_fi_location(self):
         """Return true if a possible fault injection site"""
         return (self.allocation or self.fault_injected)
@@ -109,6 +116,18 @@ class UsageTracer():
                     data[key][key2][key3] = new_obj
         self._files = data
 
+    def merge(self, other):
+        """Add the data of another tracer, such as one run in a worker process"""
+        for (dname, files) in other._files.items():  # pylint: disable=protected-access
+            dfiles = self._files.setdefault(dname, {})
+            for (bname, locs) in files.items():
+                blocs = dfiles.setdefault(bname, {})
+                for (lineno, loc) in locs.items():
+                    if lineno in blocs:
+                        blocs[lineno].merge(loc)
+                    else:
+                        blocs[lineno] = loc
+
     def save(self, fname):
         """Save intermediate data to file"""
         data = {}
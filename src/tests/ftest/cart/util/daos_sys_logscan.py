@@ -7,6 +7,8 @@
 """Scan daos_engine log files to get a summary of pools activity."""
 
 import argparse
+import io
+import multiprocessing
 import re
 import sys
 
@@ -27,6 +29,7 @@ class SysPools():
 
     # Engine rank assignment and pool service leader step_up/down events
     re_rank_assign = re.compile(r"ds_mgmt_drpc_set_rank.*set rank to (\d+)")
+    rank_functions = frozenset({'ds_mgmt_drpc_set_rank'})
     re_step_up = re.compile(r"rdb_raft_step_up.*([0-9a-fA-F]{8}).*leader of term (\d+)")
     re_step_down = re.compile(r"rdb_raft_step_down.*([0-9a-fA-F]{8}).*leader of term (\d+)")
 
@@ -42,9 +45,9 @@ class SysPools():
     re_pmap_update = re.compile(upd_re)
 
     # uniform rebuild string identifier rb=<pool_uuid>/<rebuild_ver>/<rebuild_gen>/<opcode_string>
-    # need special "_rf" versions of regex's to match "Reclaim fail" op (as opposed to "Reclaim")
-    rbid_re = r"rb=([0-9a-fA-F]{8})/(\d+)/(\d+)/(Rebuild|Reclaim)"
-    rbid_rf_re = r"rb=([0-9a-fA-F]{8})/(\d+)/(\d+)/(Reclaim fail)"
+    # "Reclaim fail" is tried first so that it is not matched as the "Reclaim" op
+    rb_op_re = r"(Reclaim fail|Rebuild|Reclaim)"
+    rbid_re = r"rb=([0-9a-fA-F]{8})/(\d+)/(\d+)/" + rb_op_re
 
     # Future possibility: match the rebuild preliminary steps
     # rebuild_task_ult() wait for scheduling, and map dist - both would info to match on.
@@ -54,45 +57,39 @@ class SysPools():
     # Rebuild: PS leader engine starting and status checking a given operation
     # statuses: "scanning", "pulling", "completed", "aborted", "failed"
     ldr_start_re = "rebuild_leader_start.*" + rbid_re + "$"
-    ldr_start_rf_re = "rebuild_leader_start.*" + rbid_rf_re + "$"
 
     ldr_status_re = r"rebuild_leader_status_check\(\).*" + rbid_re + r" \[(\w+)\]" + \
         r".*status (-?\d+)/(\d+) .*duration=(\d+)"
-    ldr_status_rf_re = r"rebuild_leader_status_check\(\).*" + rbid_rf_re + r" \[(\w+)\]" + \
-        r".*status (-?\d+)/(\d+) .*duration=(\d+)"
-    ldr_scan_hung_re = r"update_and_warn_for_slow_engines\(\).*" + rbid_re + \
-        r".*scan hung.*waiting for (\d+)/(\d+) engines"
-    ldr_scan_hung_rf_re = r"update_and_warn_for_slow_engines\(\).*" + rbid_rf_re + \
-        r".*scan hung.*waiting for (\d+)/(\d+) engines"
-    ldr_pull_hung_re = r"update_and_warn_for_slow_engines\(\).*" + rbid_re + \
-        r".*pull hung.*waiting for (\d+)/(\d+) engines"
-    ldr_pull_hung_rf_re = r"update_and_warn_for_slow_engines\(\).*" + rbid_rf_re + \
-        r".*pull hung.*waiting for (\d+)/(\d+) engines"
+    ldr_hung_re = r"update_and_warn_for_slow_engines\(\).*" + rbid_re + \
+        r".*(scan|pull) hung.*waiting for (\d+)/(\d+) engines"
     re_rebuild_ldr_start = re.compile(ldr_start_re)
-    re_rebuild_ldr_start_rf = re.compile(ldr_start_rf_re)
 
     re_rebuild_ldr_status = re.compile(ldr_status_re)
-    re_rebuild_ldr_status_rf = re.compile(ldr_status_rf_re)
-    re_rebuild_ldr_scan_hung = re.compile(ldr_scan_hung_re)
-    re_rebuild_ldr_scan_hung_rf = re.compile(ldr_scan_hung_rf_re)
-    re_rebuild_ldr_pull_hung = re.compile(ldr_pull_hung_re)
-    re_rebuild_ldr_pull_hung_rf = re.compile(ldr_pull_hung_rf_re)
+    re_rebuild_ldr_hung = re.compile(ldr_hung_re)
 
     # Legacy rebuild PS leader logging (before uniform rebuild string)
     old_ldr_start_re = \
-        r"rebuild_leader_start.*([0-9a-fA-F]{8}).*version=(\d+)/(\d+).*op=(Rebuild|Reclaim)"
-    old_ldr_start_rf_re = \
-        r"rebuild_leader_start.*([0-9a-fA-F]{8}).*version=(\d+)/(\d+).*op=(Reclaim fail)"
+        r"rebuild_leader_start.*([0-9a-fA-F]{8}).*version=(\d+)/(\d+).*op=" + rb_op_re
     old_ldr_status_re = \
-        (r"rebuild_leader_status_check\(\) (Rebuild|Reclaim) \[(\w+)\] \(pool ([0-9a-fA-F]{8}) "
-         r"leader (\d+) term (\d+).*ver=(\d+),gen (\d+).*duration=(\d+) secs")
-    old_ldr_status_rf_re = \
-        (r"rebuild_leader_status_check\(\) (Reclaim fail) \[(\w+)\] \(pool ([0-9a-fA-F]{8}) "
+        (r"rebuild_leader_status_check\(\) " + rb_op_re + r" \[(\w+)\] \(pool ([0-9a-fA-F]{8}) "
          r"leader (\d+) term (\d+).*ver=(\d+),gen (\d+).*duration=(\d+) secs")
     re_old_ldr_start = re.compile(old_ldr_start_re)
-    re_old_ldr_start_rf = re.compile(old_ldr_start_rf_re)
     re_old_ldr_status = re.compile(old_ldr_status_re)
-    re_old_ldr_status_rf = re.compile(old_ldr_status_rf_re)
+
+    # Functions logging the lines matched by the regular expressions above, all other lines are
+    # skipped without being parsed.
+    scan_functions = frozenset({'rdb_raft_step_up', 'rdb_raft_step_down', 'ds_pool_tgt_map_update',
+                                'rebuild_leader_start', 'rebuild_leader_status_check',
+                                'update_and_warn_for_slow_engines'})
+
+    # The regular expressions above in the order they are tried, the matcher of each is in
+    # _scan_matchers.  They are combined in a single regular expression, with a named group for
+    # each, so a line is tried against all of them at once, see _scan_line().
+    scan_regexes = (re_step_up, re_step_down, re_pmap_update, re_rebuild_ldr_start,
+                    re_old_ldr_start, re_rebuild_ldr_status, re_old_ldr_status,
+                    re_rebuild_ldr_hung)
+    re_scan = re.compile('|'.join(f'(?P<m{idx}>{regex.pattern})'
+                                  for (idx, regex) in enumerate(scan_regexes)))
 
     def __init__(self):
         # dictionaries indexed by pool UUID
@@ -110,6 +107,12 @@ class SysPools():
         self._check_rb_legacy_fmt = True
         self._debug = False
 
+        # matchers of scan_regexes, in the same order
+        self._scan_matchers = (self._match_ps_step_up, self._match_ps_step_down,
+                               self._match_ps_pmap_update, self._match_ps_rb_start,
+                               self._match_legacy_ps_rb_start, self._match_ps_rb_status,
+                               self._match_legacy_ps_rb_status, self._match_ps_rb_hung_warn)
+
         # other nested dictionaries within self._pools will be built-up
         # pool leadership terms dictionary indexed by integer term number
         # self._pools[puuid][term] -> {rank, begin_time, end_time, host, pid, logfile, maps={}}
@@ -190,17 +193,20 @@ class SysPools():
         """Return all warnings stored when scanning engine log files"""
         return self._warnings
 
-    def _set_rank(self, log_iter):
+    @classmethod
+    def find_rank(cls, log_iter):
+        """Return the rank assigned to the engine of a log file, or -1 if not found"""
         print(f"INFO: searching for rank in file {log_iter.fname}")
         for line in log_iter.new_iter():
+            if not line.in_functions(cls.rank_functions):
+                continue
             # when a rank assignment log line found (engine start)
-            match = self.re_rank_assign.match(line.get_msg())
+            match = cls.re_rank_assign.match(line.get_msg())
             if match:
-                self._file_to_rank[log_iter.fname] = int(match.group(1))
-                return True
+                return int(match.group(1))
 
             # Future enhancement: what about log rotation (not an engine start scenario)?
-        return False
+        return -1
 
     # return log-message, hostname, and date/timestamp components of the line
     def _get_line_components(self, line):
@@ -219,11 +225,8 @@ class SysPools():
         # see re_step_up and re_step_down
         return match.group(1), int(match.group(2))
 
-    def _match_ps_step_up(self, fname, line, pid, rank):
-        msg, host, datetime = self._get_line_components(line)
-        match = self.re_step_up.match(msg)
-        if not match:
-            return False
+    def _match_ps_step_up(self, match, fname, line, pid, rank):
+        _, host, datetime = self._get_line_components(line)
 
         puuid, term = self._get_ps_leader_components(match)
         if puuid not in self._pools:
@@ -241,11 +244,8 @@ class SysPools():
                   f"\tPID {pid}\t{fname}")
         return True
 
-    def _match_ps_step_down(self, fname, line, pid, rank):
-        msg, host, datetime = self._get_line_components(line)
-        match = self.re_step_down.match(msg)
-        if not match:
-            return False
+    def _match_ps_step_down(self, match, fname, line, pid, rank):
+        _, host, datetime = self._get_line_components(line)
 
         puuid, term = self._get_ps_leader_components(match)
         if puuid not in self._pools:
@@ -274,11 +274,8 @@ class SysPools():
         # see re_pmap_update
         return match.group(1), int(match.group(2)), int(match.group(3))
 
-    def _match_ps_pmap_update(self, fname, line, pid, rank):
-        msg, host, datetime = self._get_line_components(line)
-        match = self.re_pmap_update.match(msg)
-        if not match:
-            return False
+    def _match_ps_pmap_update(self, match, fname, line, pid, rank):
+        _, host, datetime = self._get_line_components(line)
 
         puuid, from_ver, to_ver = self._get_pmap_update_components(match)
         # ignore if this engine is not the leader
@@ -298,16 +295,11 @@ class SysPools():
         # see re_rebuild_ldr_start, re_old_ldr_start
         return match.group(1), int(match.group(2)), int(match.group(3)), match.group(4)
 
-    def _match_ps_rb_start(self, fname, line, pid, rank):
+    def _match_ps_rb_start(self, match, fname, line, pid, rank):
         # Do not match on new rebuild log format if we found legacy format
         if not self._check_rb_new_fmt:
             return False
-        msg, host, datetime = self._get_line_components(line)
-        match = self.re_rebuild_ldr_start_rf.match(msg)
-        if not match:
-            match = self.re_rebuild_ldr_start.match(msg)
-            if not match:
-                return False
+        _, host, datetime = self._get_line_components(line)
 
         # Disable checking for legacy rebuild log format, to save execution time
         self._check_rb_legacy_fmt = False
@@ -334,16 +326,11 @@ class SysPools():
                   f"rank {rank}\t{host}\tPID {pid}\t{fname}")
         return True
 
-    def _match_legacy_ps_rb_start(self, fname, line, pid, rank):
+    def _match_legacy_ps_rb_start(self, match, fname, line, pid, rank):
         # Do not match on legacy rebuild log format if we found new format
         if not self._check_rb_legacy_fmt:
             return False
-        msg, host, datetime = self._get_line_components(line)
-        match = self.re_old_ldr_start_rf.match(msg)
-        if not match:
-            match = match = self.re_old_ldr_start.match(msg)
-            if not match:
-                return False
+        _, host, datetime = self._get_line_components(line)
 
         # Disable checking for new rebuild log format, to save execution time
         self._check_rb_new_fmt = False
@@ -376,16 +363,11 @@ class SysPools():
         return self._get_rb_components(match) + (match.group(5), int(match.group(6)),
                                                  int(match.group(7)), int(match.group(8)))
 
-    def _match_ps_rb_status(self, fname, line, pid, rank):
+    def _match_ps_rb_status(self, match, fname, line, pid, rank):
         # Do not match on new rebuild log format if we found legacy format
         if not self._check_rb_new_fmt:
             return False
-        msg, host, datetime = self._get_line_components(line)
-        match = self.re_rebuild_ldr_status_rf.match(msg)
-        if not match:
-            match = self.re_rebuild_ldr_status.match(msg)
-            if not match:
-                return False
+        _, host, datetime = self._get_line_components(line)
 
         # Disable checking for legacy rebuild log format, to save execution time
         self._check_rb_legacy_fmt = False
@@ -434,16 +416,11 @@ class SysPools():
         return match.group(1), match.group(2), match.group(3), int(match.group(4)), \
             int(match.group(5)), int(match.group(6)), int(match.group(7)), int(match.group(8))
 
-    def _match_legacy_ps_rb_status(self, fname, line, pid, rank):
+    def _match_legacy_ps_rb_status(self, match, fname, line, pid, rank):
         # Do not match on legacy rebuild log format if we found new format
         if not self._check_rb_legacy_fmt:
             return False
-        msg, host, datetime = self._get_line_components(line)
-        match = self.re_old_ldr_status_rf.match(msg)
-        if not match:
-            match = self.re_old_ldr_status.match(msg)
-            if not match:
-                return False
+        _, host, datetime = self._get_line_components(line)
 
         # Disable checking for new rebuild log format, to save execution time
         self._check_rb_new_fmt = False
@@ -486,23 +463,17 @@ class SysPools():
         return True
 
     def _get_ps_rb_hung_warn_components(self, match):
-        # puuid, map version, rebuild-generation, operation, status, duration
-        # see re_rebuild_ldr_scan_hung and re_rebuild_ldr_pull_hung
-        return self._get_rb_components(match) + (int(match.group(5)), int(match.group(6)))
-
-    def _match_ps_rb_hung_warn(self, fname, line, pid, rank):
-        msg, host, datetime = self._get_line_components(line)
-        match1 = self.re_rebuild_ldr_scan_hung_rf.match(msg)
-        if not match1:
-            match1 = self.re_rebuild_ldr_scan_hung.match(msg)
-        match2 = self.re_rebuild_ldr_pull_hung_rf.match(msg)
-        if not match2:
-            match2 = self.re_rebuild_ldr_pull_hung.match(msg)
-        if not match1 and not match2:
-            return False
+        # puuid, map version, rebuild-generation, operation, phase, status, duration
+        # see re_rebuild_ldr_hung
+        return self._get_rb_components(match) + (match.group(5), int(match.group(6)),
+                                                 int(match.group(7)))
 
-        if match1:
-            puuid, ver, gen, op, compl_eng, tot_eng = self._get_ps_rb_hung_warn_components(match1)
+    def _match_ps_rb_hung_warn(self, match, fname, line, pid, rank):
+        _, host, datetime = self._get_line_components(line)
+
+        puuid, ver, gen, op, phase, compl_eng, tot_eng = \
+            self._get_ps_rb_hung_warn_components(match)
+        if phase == "scan":
             term = self._cur_term[puuid]
             self._pools[puuid][term]["maps"][ver]["rb_gens"][gen]["scan_hung"] = True
             self._pools[puuid][term]["maps"][ver]["rb_gens"][gen]["scan_num_eng_wait"] = compl_eng
@@ -510,9 +481,7 @@ class SysPools():
             if self._debug:
                 print(f"{datetime} FOUND rebuild SCAN hung term={term} rb={puuid}/{ver}/{gen}/{op} "
                       f"{compl_eng} / {tot_eng} done, rank {rank}\t{host}\tPID {pid}\t{fname}")
-
-        if match2:
-            puuid, ver, gen, op, compl_eng, tot_eng = self._get_ps_rb_hung_warn_components(match2)
+        else:
             term = self._cur_term[puuid]
             self._pools[puuid][term]["maps"][ver]["rb_gens"][gen]["pull_hung"] = True
             self._pools[puuid][term]["maps"][ver]["rb_gens"][gen]["pull_num_eng_wait"] = compl_eng
@@ -525,51 +494,57 @@ class SysPools():
 
     def scan_file(self, log_iter, rank=-1):
         """Scan a daos engine log file and insert important pool events into a nested dictionary"""
-        fname = log_iter.fname
+        self.scan_events(*self.extract_events(log_iter, rank=rank))
+
+    @classmethod
+    def extract_events(cls, log_iter, rank=-1):
+        """Return the name and rank of a log file, and the lines of every pid matching re_scan.
 
+        This is the expensive part of scanning a file, and does not depend on the other files so
+        it can run in a worker process.  The lines are then replayed by scan_events().
+        """
         # Find rank assignment log line for this file. Can't do much without it.
+        if rank == -1:
+            rank = cls.find_rank(log_iter)
+
+        pid_lines = []
+        if rank != -1:
+            for pid in log_iter.get_pids():
+                lines = [line for line in log_iter.new_iter(pid=pid)
+                         if line.in_functions(cls.scan_functions)
+                         and cls.re_scan.match(line.get_msg())]
+                pid_lines.append((pid, lines))
+        return (log_iter.fname, rank, pid_lines)
+
+    def scan_events(self, fname, rank, pid_lines):
+        """Insert the pool events of the lines returned by extract_events() for a file"""
         self._file_to_rank[fname] = rank
-        if rank == -1 and not self._set_rank(log_iter):
+        if rank == -1:
             self._warn("cannot find rank assignment in log file - skipping", fname)
             return
-        rank = self._file_to_rank[fname]
 
-        for pid in log_iter.get_pids():
+        for (pid, lines) in pid_lines:
             print(f"INFO: scanning file {fname} rank {rank}, PID {pid}")
-            for line in log_iter.new_iter(pid=pid):
-                # Find pool term begin (PS leader step_up)
-                if self._match_ps_step_up(fname, line, pid, rank):
-                    continue
-
-                # Find pool term end (PS leader step_down)
-                if self._match_ps_step_down(fname, line, pid, rank):
-                    continue
-
-                # Find pool map updates
-                if self._match_ps_pmap_update(fname, line, pid, rank):
-                    continue
-
-                # Find rebuild start by the PS leader
-                if self._match_ps_rb_start(fname, line, pid, rank):
-                    continue
-
-                if self._match_legacy_ps_rb_start(fname, line, pid, rank):
-                    continue
-
-                # Find rebuild status updates
-                if self._match_ps_rb_status(fname, line, pid, rank):
-                    continue
-
-                if self._match_legacy_ps_rb_status(fname, line, pid, rank):
-                    continue
-
-                # Find rebuild scan or pull phase hung warnings
-                if self._match_ps_rb_hung_warn(fname, line, pid, rank):
-                    continue
+            for line in lines:
+                self._scan_line(fname, line, pid, rank)
 
             # Future: for a PID that is killed, clear any associated cur_ldr_rank / cur_ldr_pid.
             # At logfile end, it could be due to engine killed, or could just be log rotation.
 
+    def _scan_line(self, fname, line, pid, rank):
+        # Pool term begin and end (PS leader step_up/step_down), pool map updates, rebuild start
+        # and status updates by the PS leader, and rebuild scan or pull phase hung warnings.
+        msg = line.get_msg()
+        match = self.re_scan.match(msg)
+        if not match:
+            return
+        # The named group of the first pattern matching closes last.  Its matcher may still
+        # decline the line, in which case the patterns after it are tried in turn.
+        for idx in range(int(match.lastgroup[1:]), len(self.scan_regexes)):
+            match = self.scan_regexes[idx].match(msg)
+            if match and self._scan_matchers[idx](match, fname, line, pid, rank):
+                return
+
     def print_pools(self):
         # pylint: disable=too-many-locals
         # pylint: disable=too-many-nested-blocks
@@ -668,9 +643,39 @@ class SysPools():
         # _pools[puuid][term]["maps"] should have been inserted in ascending order already?
 
 
+def open_log(fname):
+    """Open a log file, reporting and working around invalid utf-8 data"""
+    try:
+        return cart_logparse.LogIter(fname)
+    except UnicodeDecodeError:
+        return cart_logparse.LogIter(fname, check_encoding=True)
+
+
+def extract_file_events(work):
+    """Open a log file and extract its events, in a worker process for a parallel scan.
+
+    Returns the name, rank, output and the lines of every pid of the file, see
+    SysPools.extract_events(), or None for the lines if the file is corrupt.
+    """
+    (fname, rank) = work
+    real_stdout = sys.stdout
+    sys.stdout = io.StringIO()
+    pid_lines = None
+    try:
+        log_iter = open_log(fname)
+        if not log_iter.file_corrupt:
+            (_, rank, pid_lines) = SysPools.extract_events(log_iter, rank=rank)
+        output = sys.stdout.getvalue()
+    finally:
+        sys.stdout = real_stdout
+    return (fname, rank, output, pid_lines)
+
+
 def run():
     """Scan a list of daos_engine logfiles"""
     ap = argparse.ArgumentParser()
+    ap.add_argument('--jobs', type=int, default=1,
+                    help='number of processes reading the log files in parallel')
     ap.add_argument('filelist', nargs='+')
     args = ap.parse_args()
 
@@ -684,6 +689,7 @@ def run():
 
     sp = SysPools()
 
+    work = []
     for fname in args.filelist:
         if fname.endswith("cart_logtest"):
             continue
@@ -692,15 +698,24 @@ def run():
         match = rank_in_fname_re.search(fname)
         if match:
             rank = int(match.group(1))
+        work.append((fname, rank))
 
-        try:
-            log_iter = cart_logparse.LogIter(fname)
-        except UnicodeDecodeError:
-            log_iter = cart_logparse.LogIter(args.file, check_encoding=True)
+    if args.jobs > 1 and len(work) > 1:
+        with multiprocessing.Pool(min(args.jobs, len(work))) as pool:
+            results = pool.map(extract_file_events, work)
+    else:
+        results = [extract_file_events(item) for item in work]
 
-        if log_iter.file_corrupt:
+    for (_, _, output, pid_lines) in results:
+        if pid_lines is None:
+            print(output, end='')
             sys.exit(1)
-        sp.scan_file(log_iter, rank=rank)
+
+    # The pool terms span the files of several ranks, so replay the files in rank order whatever
+    # the order of the file list, and those of a rank in the order given.
+    for (fname, rank, output, pid_lines) in sorted(results, key=lambda result: result[1]):
+        print(output, end='')
+        sp.scan_events(fname, rank, pid_lines)
 
     print(f"\n======== Pools Report ({len(sp.warnings)} warnings from scanning) ========\n")
     sp.sort()
@@ -27,7 +27,7 @@ from util.logger_utils import LOG_FILE_FORMAT, get_console_handler, get_file_han
 from util.network_utils import PROVIDER_ALIAS, SUPPORTED_PROVIDERS
 from util.package_utils import find_packages
 from util.results_utils import Job, LaunchTestName, Results
-from util.run_utils import RunException
+from util.run_utils import RunException, get_run_remote_times
 from util.storage_utils import StorageException
 from util.yaml_utils import YamlException
 
@@ -127,18 +127,22 @@ class Launch():
             except TypeError as error:
                 logger.error("Error writing %s: %s", details_json, str(error))
 
-    def _configure(self, overwrite_config=False):
+    def _configure(self, overwrite_config=False, job_results_dir=None):
         """Configure launch to start logging and track test results.
 
         Args:
             overwrite (bool, optional): if true overwrite any existing avocado config files. If
                 false do not modify any existing avocado config files. Defaults to False.
+            job_results_dir (str, optional): directory in which to place the avocado job-results
+                instead of the directory defined by the avocado config files. Defaults to None.
 
         Raises:
             LaunchException: if there are any issues obtaining data from avocado commands
         """
         # Setup the avocado config files to ensure these files are read by avocado
         self.avocado.set_config(overwrite_config)
+        if job_results_dir:
+            self.avocado.logs_dir = os.path.abspath(job_results_dir)
 
         # Configure the logfile
         self.avocado.set_version()
@@ -234,9 +238,12 @@ class Launch():
         """
         status = 0
 
+        # Keep a copy of the environment before it is updated for running tests with launch.py
+        environment = os.environ.copy()
+
         # Setup launch to log and run the requested action
         try:
-            self._configure(args.overwrite_config)
+            self._configure(args.overwrite_config, args.job_results_dir)
         except (AvocadoException, LaunchException):
             message = "Error configuring launch.py to start logging and track test results"
             return self.get_exit_status(1, message, "Setup", sys.exc_info())
@@ -377,11 +384,17 @@ class Launch():
         setup_result.end()
 
         # Run the tests in this test group
-        test_status |= group.run_tests(
-            logger, self.result, self.repeat, self.slurm_setup, args.sparse, args.failfast,
-            not args.disable_stop_daos, args.archive, args.rename, args.jenkinslog, core_files,
-            args.logs_threshold, args.user_create, code_coverage, self.job_results_dir,
-            self.logdir, args.clear_mounts, cleanup_files)
+        if args.concurrent > 1:
+            test_status |= group.run_tests_concurrently(
+                logger, self.result, args.concurrent, self._get_concurrent_command(args),
+                self.logdir, environment, args.override, cleanup_files)
+        else:
+            test_status |= group.run_tests(
+                logger, self.result, self.repeat, self.slurm_setup, args.sparse, args.failfast,
+                not args.disable_stop_daos, args.archive, args.rename, args.jenkinslog, core_files,
+                args.logs_threshold, args.user_create, code_coverage, self.job_results_dir,
+                self.logdir, args.clear_mounts, cleanup_files, args.pipeline, args.stream_archive)
+        self.details["test status"] = test_status
 
         # Convert the test status to a launch.py status
         status |= summarize_run(logger, self.mode, test_status)
@@ -389,6 +402,13 @@ class Launch():
         # Record the group details
         self.details.update(group.details)
 
+        # Record the time spent running remote commands from launch.py
+        run_remote_times = get_run_remote_times()
+        logger.debug(
+            "Remote commands: %s calls in %.3f seconds (slowest: %.3f seconds)",
+            run_remote_times["calls"], run_remote_times["total"], run_remote_times["max"])
+        self.details["run_remote"] = run_remote_times
+
         # Restart the timer for the test result to account for any non-test execution steps
         setup_result.start()
 
@@ -396,6 +416,36 @@ class Launch():
         # execution steps complete
         return self.get_exit_status(status, "Executing tests complete")
 
+    def _get_concurrent_command(self, args):
+        """Get a function returning the launch.py command used to run a test concurrently.
+
+        Args:
+            args (argparse.Namespace): command line arguments for this program
+
+        Returns:
+            callable: function returning the launch.py command, as a list, used to run a test
+                given the TestInfo, servers, clients, and avocado job-results directory
+        """
+        # The hosts, tags, and job-results directory are defined for each test. The local host is
+        # shared by all of the tests running at the same time, so it is not cleaned or archived.
+        exclude = ("concurrent", "include_localhost", "job_results_dir", "list", "mode", "modify",
+                   "overwrite_config", "test_clients", "test_servers", "yaml_directory")
+        arguments = get_launch_arguments(args, exclude)
+        tags = [tag for tag in args.tags if not os.path.isfile(tag)]
+        mode = "normal" if self.mode == "ci" else self.mode
+
+        def get_command(test, servers, clients, job_results_dir):
+            command = [sys.executable, os.path.abspath(__file__), "--mode", mode]
+            command.extend(arguments)
+            command.extend(["--job_results_dir", job_results_dir, "--test_servers", str(servers)])
+            if clients:
+                command.extend(["--test_clients", str(clients)])
+            command.extend(tags)
+            command.append(test.test_file)
+            return command
+
+        return get_command
+
 
 def __arg_type_file(val):
     """Parse a file argument.
@@ -471,9 +521,12 @@ def __arg_type_mount_point(val):
     return val
 
 
-def main():
-    """Launch DAOS functional tests."""
-    # Parse the command line arguments
+def get_argument_parser():
+    """Get the parser for the launch.py command line arguments.
+
+    Returns:
+        ArgumentParser: the launch.py command line argument parser
+    """
     description = [
         "DAOS functional test launcher",
         "",
@@ -546,6 +599,14 @@ def main():
         default=[],
         type=__arg_type_mount_point,
         help="mount points to remove before running each test")
+    parser.add_argument(
+        "-cr", "--concurrent",
+        action="store",
+        default=1,
+        type=int,
+        help="maximum number of tests to run at the same time, each on its own subset of the test "
+             "hosts. Tests using slurm partitions or reservations, or requiring more hosts than "
+             "are available, are run by themselves with all of the test hosts")
     parser.add_argument(
         "-dsd", "--disable_stop_daos",
         action="store_true",
@@ -574,6 +635,12 @@ def main():
         "-j", "--jenkinslog",
         action="store_true",
         help="rename the avocado test logs directory for publishing in Jenkins")
+    parser.add_argument(
+        "--job_results_dir",
+        action="store",
+        default=None,
+        help="directory in which to place the avocado job-results instead of the directory "
+             "defined by the avocado config files")
     parser.add_argument(
         "-l", "--list",
         action="store_true",
@@ -616,6 +683,14 @@ def main():
         "-p", "--process_cores",
         action="store_true",
         help="process core files from tests")
+    parser.add_argument(
+        "-pl", "--pipeline",
+        action="store",
+        default=0,
+        type=int,
+        help="maximum number of tests whose log files are archived in the background while the "
+             "next tests run. Requires --archive; 0 archives the log files of each test before "
+             "running the next test")
     parser.add_argument(
         "-pr", "--provider",
         action="store",
@@ -638,6 +713,11 @@ def main():
         "-s", "--sparse",
         action="store_true",
         help="limit output to pass/fail")
+    parser.add_argument(
+        "-sa", "--stream_archive",
+        action="store_true",
+        help="when archiving host log files, check and compress the files on each host in "
+             "parallel while streaming them to this host")
     parser.add_argument(
         "-sc", "--slurm_control_node",
         action="store",
@@ -728,6 +808,44 @@ def main():
              "exists with the specified extension - e.g. dtx/basic.custom.yaml "
              "for --yaml_extension=custom - this file will be used instead of the "
              "standard test yaml file.")
+    return parser
+
+
+def get_launch_arguments(args, exclude):
+    """Get the launch.py command line options that reproduce the specified arguments.
+
+    Positional arguments and options set to their default values are not included.
+
+    Args:
+        args (argparse.Namespace): command line arguments for this program
+        exclude (list): destinations of the options not to include
+
+    Returns:
+        list: the launch.py command line options
+    """
+    arguments = []
+    for action in get_argument_parser()._actions:     # pylint: disable=protected-access
+        if not action.option_strings or action.dest in list(exclude) + ["help"]:
+            continue
+        value = getattr(args, action.dest)
+        if value is None or value == action.default:
+            continue
+        option = action.option_strings[-1]
+        if action.nargs == 0:
+            # Flags are repeated for counted options, e.g. --verbose
+            arguments.extend([option] * int(value))
+        elif isinstance(value, list):
+            for item in value:
+                arguments.extend([option, str(item)])
+        else:
+            arguments.extend([option, str(value)])
+    return arguments
+
+
+def main():
+    """Launch DAOS functional tests."""
+    # Parse the command line arguments
+    parser = get_argument_parser()
     args = parser.parse_args()
 
     # Override arguments via the mode
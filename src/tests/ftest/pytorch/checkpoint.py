@@ -73,6 +73,69 @@ class PytorchCheckpointTest(TestWithServers):
                                               chunk_size=chunk_size, chunks_limit=chunks_limit,
                                               workers=worker)
 
+    def test_checkpoint_incremental(self):
+        """Test Pytorch Checkpoint interface in incremental (deduplicated) mode
+
+        Test Description: Ensure that consecutive checkpoints sharing most of their content
+        are read back correctly, as well as the earlier checkpoints referencing the same chunks,
+        and that only the chunks changed since the previous checkpoint are written again
+
+        :avocado: tags=all,full_regression
+        :avocado: tags=vm
+        :avocado: tags=pytorch
+        :avocado: tags=PytorchCheckpointTest,test_checkpoint_incremental
+        """
+
+        pool = self.get_pool()
+        container = self.get_container(pool)
+
+        size = self.params.get("size", "/run/checkpoint_incremental/*", 4 * 1024 * 1024)
+        num_checkpoints = self.params.get("checkpoints", "/run/checkpoint_incremental/*", 4)
+        dedup_chunk_sizes = self.params.get("dedup_chunk_sizes", "/run/checkpoint_incremental/*")
+        workers = self.params.get("workers", "/run/checkpoint_incremental/*")
+
+        if len(dedup_chunk_sizes) == 0 or len(workers) == 0:
+            self.fail("dedup_chunk_sizes and workers must be provided")
+
+        for dedup_chunk_size in dedup_chunk_sizes:
+            for worker in workers:
+                self.log.info("Incremental checkpoint test: dedup_chunk_size=%s, workers=%s",
+                              dedup_chunk_size, worker)
+                chkp = Checkpoint(pool.identifier, container.identifier,
+                                  incremental=True, dedup_chunk_size=dedup_chunk_size,
+                                  workers=worker)
+
+                state = bytearray(os.urandom(size))
+                saved = {}
+                for idx in range(num_checkpoints):
+                    # Change only a small part of the state between the checkpoints
+                    offset = self.random.randint(0, size - 1)
+                    patch = os.urandom(min(self.random.randint(1, 4096), size - offset))
+                    state[offset:offset + len(patch)] = patch
+
+                    fname = str(uuid.uuid4())
+                    with chkp.writer(fname) as w:
+                        w.write(state)
+                    saved[fname] = bytes(state)
+
+                    if idx == 0:
+                        continue
+                    changed = ((offset + len(patch) - 1) // dedup_chunk_size
+                               - offset // dedup_chunk_size + 1)
+                    if w.written_chunks > changed:
+                        self.fail(
+                            f"incremental checkpoint {fname} wrote {w.written_chunks} chunks, "
+                            f"only {changed} changed, dedup_chunk_size={dedup_chunk_size}, "
+                            f"workers={worker}")
+
+                for fname, expected in saved.items():
+                    actual = chkp.reader(fname)
+                    if expected != actual.getvalue():
+                        self.fail(
+                            f"incremental checkpoint {fname} did not read back the expected "
+                            f"content, dedup_chunk_size={dedup_chunk_size}, workers={worker}")
+                del chkp
+
     def _test_checkpoint(self, pool, cont, writes, chunk_size=0, chunks_limit=0, workers=0):
         """Creates a checkpoint with the given parameters, writes the given data to it,
         then reads written data back from it and compares it with the expected writes.
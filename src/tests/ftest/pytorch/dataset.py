@@ -5,11 +5,13 @@
   SPDX-License-Identifier: BSD-2-Clause-Patent
 """
 import hashlib
+import os
 
 from apricot import TestWithServers
 from dfuse_utils import get_dfuse, start_dfuse
 from io_utilities import DirectoryTreeCommand
 from pydaos.torch import Dataset, IterableDataset
+from pydaos.torch.torch_api import _Dfs
 from run_utils import run_remote
 from torch.utils.data import DataLoader
 
@@ -185,6 +187,68 @@ class PytorchDatasetsTest(TestWithServers):
             for batch_size in batch_sizes:
                 self._test_dataloader(dataset, expected, batch_size, procs)
 
+    def test_parallel_walk(self):
+        """Test the parallel walk of the directory tree.
+
+        Test Description: Ensure that the parallel walk reports every directory once with all its
+        entries.
+
+        :avocado: tags=all,full_regression
+        :avocado: tags=vm
+        :avocado: tags=dfuse,pytorch
+        :avocado: tags=PytorchDatasetsTest,test_parallel_walk
+        """
+        pool = self.get_pool()
+        container = self.get_container(pool)
+        dfuse = get_dfuse(self, self.hostlist_clients)
+        start_dfuse(self, dfuse, pool, container)
+
+        root_dir = dfuse.mount_dir.value
+
+        height = self.params.get("tree_height", "/run/parallel_walk/*")
+        subdirs = self.params.get("subdirs", "/run/parallel_walk/*")
+        files_per_node = self.params.get("files_per_node", "/run/parallel_walk/*")
+        file_min_size = self.params.get("file_min_size", "/run/parallel_walk/*", 1)
+        file_max_size = self.params.get("file_max_size", "/run/parallel_walk/*", 4096)
+        readdir_batch_size = self.params.get("readdir_batch_size", "/run/parallel_walk/*", 5)
+        workers = self.params.get("workers", "/run/parallel_walk/*")
+
+        self._create_test_files(root_dir, height, subdirs, files_per_node,
+                                file_min_size, file_max_size)
+
+        cmd = f'find {root_dir} -mindepth 1 -printf "%h %y %f %s\\n"'
+        result = run_remote(self.log, self.hostlist_clients, cmd)
+        if not result.passed:
+            self.fail(f'"{cmd}" failed on {result.failed_hosts}')
+
+        expected = {os.sep: ([], [])}
+        for line in result.output[0].stdout:
+            parent, kind, name, size = line.split()
+            parent = os.path.normpath(os.path.join(os.sep, os.path.relpath(parent, root_dir)))
+            if kind == "d":
+                expected[parent][0].append(name)
+                expected[os.path.join(parent, name)] = ([], [])
+            else:
+                expected[parent][1].append((name, int(size)))
+
+        dfs = _Dfs(pool=pool.identifier, cont=container.identifier)
+        try:
+            for procs in workers:
+                actual = {}
+                for path, dirs, files in dfs.parallel_walk(readdir_batch_size=readdir_batch_size,
+                                                           workers=procs):
+                    if path in actual:
+                        self.fail(f"parallel walk with {procs} workers reported {path} twice")
+                    actual[path] = (dirs, files)
+
+                for entries in list(actual.values()) + list(expected.values()):
+                    for entry in entries:
+                        entry.sort()
+                if actual != expected:
+                    self.fail(f"parallel walk with {procs} workers did not report all entries")
+        finally:
+            dfs.disconnect()
+
     def _test_dataloader(self, dataset, expected, batch_size, processes):
         """With the given dataset and parameters load all samples using DataLoader
         and check if all expected samples are fetched"""
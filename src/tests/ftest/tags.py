@@ -6,9 +6,11 @@
   SPDX-License-Identifier: BSD-2-Clause-Patent
 """
 import ast
+import json
 import os
 import re
 import sys
+import tempfile
 from argparse import ArgumentParser, ArgumentTypeError, RawDescriptionHelpFormatter
 from collections import defaultdict
 from copy import deepcopy
@@ -22,6 +24,10 @@ MANUAL_TAG = ('manual',)
 STAGE_TYPE_TAGS = ('vm', 'hw', 'hw_vmd')
 STAGE_SIZE_TAGS = ('medium', 'large')
 STAGE_FREQUENCY_TAGS = ('all', 'pr', 'daily_regression', 'full_regression')
+CACHE_VERSION = 1
+DEFAULT_CACHE_FILE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+    'daos', 'ftest_tags.json')
 
 
 class TagSet(set):
@@ -59,15 +65,24 @@ def all_python_files(path):
 class FtestTagMap():
     """Represent tags for ftest/avocado."""
 
-    def __init__(self, paths):
+    def __init__(self, paths, cache_file=None):
         """Initialize the tag mapping.
 
         Args:
             paths (list): the file or dir path(s) to update from
+            cache_file (str, optional): file in which to keep the parsed tags of each file so that
+                only new or modified files are parsed again. Defaults to None, which parses every
+                file.
         """
         self.__mapping = {}  # str(file_name) : str(class_name) : str(test_name) : set(tags)
+        self.__index = defaultdict(set)  # str(tag) : set((file_name, class_name, test_name))
+        self.__tests = set()  # (file_name, class_name, test_name)
+        self.__cache_file = cache_file
+        self.__cache = self.__read_cache()
+        self.__cache_modified = False
         for path in paths:
             self.__update_from_path(path)
+        self.__write_cache()
 
     def __iter__(self):
         """Iterate over the mapping.
@@ -78,17 +93,6 @@ class FtestTagMap():
         for item in self.__mapping.items():
             yield deepcopy(item)
 
-    def __methods(self):
-        """Iterate over each method name and its tags.
-
-        Yields:
-            (str, set): method name and tags
-        """
-        for classes in self.__mapping.values():
-            for methods in classes.values():
-                for method_name, tags in methods.items():
-                    yield (method_name, tags)
-
     def unique_tags(self, exclude=None):
         """Get the set of unique tags, excluding one or more paths.
 
@@ -99,15 +103,14 @@ class FtestTagMap():
         Returns:
             set: the set of unique tags
         """
-        exclude = list(map(self.__norm_path, exclude or []))
+        if isinstance(exclude, str):
+            exclude = [exclude]
+        exclude = set(map(self.__norm_path, exclude or []))
 
         unique_tags = set()
-        for file_path, classes in self.__mapping.items():
-            if file_path in exclude:
-                continue
-            for functions in classes.values():
-                for tags in functions.values():
-                    unique_tags.update(tags)
+        for tag, tests in self.__index.items():
+            if any(test[0] not in exclude for test in tests):
+                unique_tags.add(tag)
         return unique_tags
 
     def minimal_tags(self, path):
@@ -140,7 +143,9 @@ class FtestTagMap():
                 # Try using a set of tags globally unique to this test.
                 # Shouldn't get here since all tests are tagged with their class and method names,
                 # but it could happen if the tag lint check is currently failing.
-                globally_unique_tags = tags - self.unique_tags(exclude=file_path)
+                globally_unique_tags = set(
+                    tag for tag in tags
+                    if all(test[0] == file_path for test in self.__index[tag]))
                 if globally_unique_tags and globally_unique_tags.issubset(tags):
                     recommended.add(','.join(sorted(globally_unique_tags)))
                     continue
@@ -159,25 +164,34 @@ class FtestTagMap():
         Returns:
             bool: whether tags1's tests is a subset of tags2's tests
         """
-        tests1 = set(self.__tags_to_tests(tags1))
-        tests2 = set(self.__tags_to_tests(tags2))
+        tests1 = self.__tags_to_test_keys(tags1)
+        tests2 = self.__tags_to_test_keys(tags2)
         return bool(tests1) and bool(tests2) and tests1.issubset(tests2)
 
-    def __tags_to_tests(self, tags):
-        """Convert a list of tags to the tests they would run.
+    def __tags_to_test_keys(self, tags):
+        """Convert a list of tags to the tests they would run using the tag index.
 
         Args:
             tags (list): list of sets of tags
+
+        Returns:
+            set: the (file_name, class_name, test_name) of each test
         """
-        # Convert to TagSet to handle negative matching
-        for idx, _tags in enumerate(tags):
-            tags[idx] = TagSet(_tags)
-        tests = []
-        for method_name, test_tags in self.__methods():
-            for tag_set in tags:
-                if tag_set.issubset(test_tags):
-                    tests.append(method_name)
-                    break
+        tests = set()
+        for tag_set in tags:
+            include = [tag for tag in tag_set if not tag.startswith('-')]
+            exclude = [tag[1:] for tag in tag_set if tag.startswith('-')]
+            if include:
+                # Start with the least common tag to keep the intersections small
+                include.sort(key=lambda tag: len(self.__index.get(tag, ())))
+                matches = set(self.__index.get(include[0], ()))
+                for tag in include[1:]:
+                    matches.intersection_update(self.__index.get(tag, ()))
+            else:
+                matches = set(self.__tests)
+            for tag in exclude:
+                matches.difference_update(self.__index.get(tag, ()))
+            tests.update(matches)
         return tests
 
     def __update_from_path(self, path):
@@ -205,19 +219,70 @@ class FtestTagMap():
     def __parse_file(self, path):
         """Parse a file and update the internal mapping from avocado tags.
 
+        The tags of a file are read from the cache when the file has not been modified since the
+        tags were cached.
+
         Args:
             path (str): file to parse
         """
-        with open(path, 'r') as file:
-            file_data = file.read()
+        stat = os.stat(path)
+        signature = [stat.st_mtime_ns, stat.st_size]
+        cached = self.__cache.get(path)
+        if cached is None or cached['signature'] != signature:
+            with open(path, 'r') as file:
+                file_data = file.read()
+
+            classes = {}
+            module = ast.parse(file_data)
+            for class_def in filter(lambda val: isinstance(val, ast.ClassDef), module.body):
+                for func_def in filter(
+                        lambda val: isinstance(val, ast.FunctionDef), class_def.body):
+                    if not func_def.name.startswith('test_'):
+                        continue
+                    tags = self.__parse_avocado_tags(ast.get_docstring(func_def))
+                    classes.setdefault(class_def.name, {}).setdefault(func_def.name, [])
+                    classes[class_def.name][func_def.name].extend(sorted(tags))
+            cached = {'signature': signature, 'classes': classes}
+            self.__cache[path] = cached
+            self.__cache_modified = True
+
+        for class_name, functions in cached['classes'].items():
+            for test_name, tags in functions.items():
+                self.__update(path, class_name, test_name, set(tags))
+
+    def __read_cache(self):
+        """Read the cached tags of each file.
 
-        module = ast.parse(file_data)
-        for class_def in filter(lambda val: isinstance(val, ast.ClassDef), module.body):
-            for func_def in filter(lambda val: isinstance(val, ast.FunctionDef), class_def.body):
-                if not func_def.name.startswith('test_'):
-                    continue
-                tags = self.__parse_avocado_tags(ast.get_docstring(func_def))
-                self.__update(path, class_def.name, func_def.name, tags)
+        Returns:
+            dict: the cached tags of each file, or an empty dict if the cache is disabled, does not
+                exist, or is invalid
+        """
+        if not self.__cache_file:
+            return {}
+        try:
+            with open(self.__cache_file, 'r') as file:
+                cache = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(cache, dict) or cache.get('version') != CACHE_VERSION:
+            return {}
+        return cache.get('files', {})
+
+    def __write_cache(self):
+        """Write the cached tags of each file if any file was parsed."""
+        if not self.__cache_file or not self.__cache_modified:
+            return
+        files = {path: info for path, info in self.__cache.items() if os.path.isfile(path)}
+        try:
+            os.makedirs(os.path.dirname(self.__cache_file), exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                    'w', dir=os.path.dirname(self.__cache_file), delete=False) as file:
+                json.dump({'version': CACHE_VERSION, 'files': files}, file)
+            os.replace(file.name, self.__cache_file)
+        except OSError:
+            # The cache is only an optimization
+            pass
+        self.__cache_modified = False
 
     @staticmethod
     def __norm_path(path):
@@ -250,6 +315,10 @@ class FtestTagMap():
         if test_name not in self.__mapping[file_name][class_name]:
             self.__mapping[file_name][class_name][test_name] = set()
         self.__mapping[file_name][class_name][test_name].update(tags)
+        key = (file_name, class_name, test_name)
+        self.__tests.add(key)
+        for tag in tags:
+            self.__index[tag].add(key)
 
     @staticmethod
     def __parse_avocado_tags(text):
@@ -286,11 +355,14 @@ def sorted_tags(tags):
     return new_tags
 
 
-def run_linter(paths=None, verbose=False):
+def run_linter(paths=None, verbose=False, cache_file=DEFAULT_CACHE_FILE):
     """Run the ftest tag linter.
 
     Args:
         paths (list, optional): paths to lint. Defaults to all ftest python files
+        verbose (bool, optional): whether to print verbose output. Defaults to False
+        cache_file (str, optional): file in which to cache the parsed tags. Defaults to
+            DEFAULT_CACHE_FILE
 
     Raises:
         LintFailure: if linting fails
@@ -308,7 +380,7 @@ def run_linter(paths=None, verbose=False):
     tests_w_empty_tag = []
     tests_wo_a_feature_tag = []
     non_feature_tags = set(STAGE_TYPE_TAGS + STAGE_SIZE_TAGS + STAGE_FREQUENCY_TAGS)
-    ftest_tag_map = FtestTagMap(paths)
+    ftest_tag_map = FtestTagMap(paths, cache_file)
     for file_path, classes in iter(ftest_tag_map):
         all_files.append(file_path)
         for class_name, functions in classes.items():
@@ -374,7 +446,7 @@ def run_linter(paths=None, verbose=False):
         raise errors[0]
 
 
-def run_dump(paths=None, tags=None):
+def run_dump(paths=None, tags=None, cache_file=DEFAULT_CACHE_FILE):
     """Dump the tags per test.
 
     Formatted as
@@ -386,6 +458,8 @@ def run_dump(paths=None, tags=None):
         paths (list, optional): path(s) to get tags for. Defaults to all ftest python files
         tags2 (list, optional): list of sets of tags to filter.
             Default is None, which does not filter
+        cache_file (str, optional): file in which to cache the parsed tags. Defaults to
+            DEFAULT_CACHE_FILE
 
     Returns:
         int: 0 on success; 1 if no matches found
@@ -396,7 +470,7 @@ def run_dump(paths=None, tags=None):
     # Store output as {path: {class: {test: tags}}}
     output = defaultdict(lambda: defaultdict(dict))
 
-    tag_map = FtestTagMap(paths)
+    tag_map = FtestTagMap(paths, cache_file)
     for file_path, classes in iter(tag_map):
         short_file_path = re.findall(r'ftest/(.*$)', file_path)[0]
         for class_name, functions in classes.items():
@@ -419,17 +493,19 @@ def run_dump(paths=None, tags=None):
     return 0 if output else 1
 
 
-def files_to_tags(paths):
+def files_to_tags(paths, cache_file=DEFAULT_CACHE_FILE):
     """Get the unique tags for paths.
 
     Args:
         paths (list): paths to get tags for
+        cache_file (str, optional): file in which to cache the parsed tags. Defaults to
+            DEFAULT_CACHE_FILE
 
     Returns:
         set: set of test tags representing paths
     """
     # Get tags for ftest paths
-    ftest_tag_map = FtestTagMap(all_python_files(FTEST_DIR))
+    ftest_tag_map = FtestTagMap(all_python_files(FTEST_DIR), cache_file)
 
     tag_config = read_tag_config()
     all_tags = set()
@@ -506,11 +582,13 @@ def read_tag_config():
     return config
 
 
-def run_list(paths=None):
+def run_list(paths=None, cache_file=DEFAULT_CACHE_FILE):
     """List unique tags for paths.
 
     Args:
         paths (list, optional): paths to list tags of. Defaults to all ftest python files
+        cache_file (str, optional): file in which to cache the parsed tags. Defaults to
+            DEFAULT_CACHE_FILE
 
     Returns:
         int: 0 on success; 1 if no matches found
@@ -520,7 +598,7 @@ def run_list(paths=None):
     """
     if not paths:
         paths = all_python_files(FTEST_DIR)
-    tags = files_to_tags(paths)
+    tags = files_to_tags(paths, cache_file)
     if tags:
         print(' '.join(sorted(tags)))
         return 0
@@ -611,14 +689,12 @@ def test_tags_util(verbose=False):
         ('/foo2', {'class_2': {'test_2': {'class_2', 'test_2', 'foo2'}}})
     ]
 
-    print_step('__tags_to_tests')
-    assert tag_map._FtestTagMap__tags_to_tests(
-        [set(['foo1']), set(['foo2'])]) == ['test_1', 'test_2']
-    assert tag_map._FtestTagMap__tags_to_tests([set(['foo1', 'class_1'])]) == ['test_1']
-
-    print_step('__methods')
-    assert list(tag_map._FtestTagMap__methods()) == [
-        ('test_1', {'class_1', 'test_1', 'foo1'}), ('test_2', {'class_2', 'test_2', 'foo2'})]
+    print_step('__tags_to_test_keys')
+    test_1 = ('/foo1', 'class_1', 'test_1')
+    test_2 = ('/foo2', 'class_2', 'test_2')
+    assert tag_map._FtestTagMap__tags_to_test_keys(
+        [set(['foo1']), set(['foo2'])]) == set([test_1, test_2])
+    assert tag_map._FtestTagMap__tags_to_test_keys([set(['foo1', 'class_1'])]) == set([test_1])
 
     print_step('unique_tags')
     assert tag_map.unique_tags() == set(['class_1', 'test_1', 'foo1', 'class_2', 'test_2', 'foo2'])
@@ -641,12 +717,37 @@ def test_tags_util(verbose=False):
     assert tag_map.is_test_subset([set(['class_2'])], [set(['test_1']), set(['test_2'])])
     assert not tag_map.is_test_subset([set(['fake'])], [set(['class_2'])])
 
+    print_step('__tags_to_test_keys with negative tags')
+    assert tag_map._FtestTagMap__tags_to_test_keys([set(['-foo1'])]) == set([test_2])
+    assert tag_map._FtestTagMap__tags_to_test_keys([set(['class_1', '-foo1'])]) == set()
+    assert tag_map._FtestTagMap__tags_to_test_keys([set(['fake'])]) == set()
+    assert tag_map.is_test_subset([set(['-foo1'])], [set(['class_2'])])
+    assert not tag_map.is_test_subset([set(['class_1', '-foo1'])], [set(['class_1'])])
+
     print_step('__init__')
     # Just a smoke test to verify the map can parse real files
     tag_map = FtestTagMap(all_python_files(FTEST_DIR))
     expected_tags = set(['test_harness_config', 'test_ior_small', 'test_dfuse_mu_perms'])
     assert len(tag_map.unique_tags().intersection(expected_tags)) == len(expected_tags)
 
+    print_step('cache_file')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        test_file = os.path.join(temp_dir, 'test_cache.py')
+        cache_file = os.path.join(temp_dir, 'cache', 'tags.json')
+        with open(test_file, 'w') as file:
+            file.write('class Cache():\n    def test_cache(self):\n'
+                       '        """:avocado: tags=Cache,test_cache"""\n')
+        tag_map = FtestTagMap([test_file], cache_file)
+        assert tag_map.unique_tags() == set(['Cache', 'test_cache'])
+        assert os.path.isfile(cache_file)
+        tag_map = FtestTagMap([test_file], cache_file)
+        assert tag_map.unique_tags() == set(['Cache', 'test_cache'])
+        with open(test_file, 'a') as file:
+            file.write('    def test_cache_2(self):\n'
+                       '        """:avocado: tags=Cache,test_cache_2"""\n')
+        tag_map = FtestTagMap([test_file], cache_file)
+        assert tag_map.unique_tags() == set(['Cache', 'test_cache', 'test_cache_2'])
+
     print('PASS  Ftest Tags Utility Unit Tests')
 
 
@@ -699,8 +800,17 @@ def main():
         nargs="+",
         type=__arg_type_tags,
         help="tags")
+    parser.add_argument(
+        "--cache_file",
+        default=DEFAULT_CACHE_FILE,
+        help=f"file in which to cache the parsed tags of each file (default: {DEFAULT_CACHE_FILE})")
+    parser.add_argument(
+        "--no_cache",
+        action='store_true',
+        help="parse every file instead of using the cached tags")
     args = parser.parse_args()
     args.paths = list(map(os.path.realpath, args.paths))
+    cache_file = None if args.no_cache else args.cache_file
 
     # Check for incompatible arguments
     rc = 0
@@ -721,15 +831,15 @@ def main():
 
     if args.command == "lint":
         try:
-            run_linter(args.paths, args.verbose)
+            run_linter(args.paths, args.verbose, cache_file)
             rc = 0
         except LintFailure as err:
             print(err)
             rc = 1
     elif args.command == "dump":
-        rc = run_dump(args.paths, args.tags)
+        rc = run_dump(args.paths, args.tags, cache_file)
     elif args.command == "list":
-        rc = run_list(args.paths)
+        rc = run_list(args.paths, cache_file)
     elif args.command == "unit":
         test_tag_set()
         test_tags_util(args.verbose)
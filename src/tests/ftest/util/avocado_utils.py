@@ -17,6 +17,7 @@ class AvocadoInfo():
         """Initialize an AvocadoInfo object."""
         self.major = 0
         self.minor = 0
+        self.logs_dir = None
 
     def __str__(self):
         """Get the avocado version as a string.
@@ -144,6 +145,8 @@ class AvocadoInfo():
         Returns:
             str: the directory used by avocado to log test results
         """
+        if self.logs_dir:
+            return self.logs_dir
         default_base_dir = os.path.join("~", "avocado", "job-results")
         return os.path.expanduser(
             self.get_setting("datadir.paths", "logs_dir", default_base_dir))
@@ -197,6 +200,8 @@ class AvocadoInfo():
             command.append("--show=test")
         command.append("run")
         command.append("--ignore-missing-references")
+        if self.logs_dir:
+            command.extend(["--job-results-dir", self.logs_dir])
         if self.major >= 83:
             command.append("--disable-tap-job-result")
         else:
@@ -7,8 +7,11 @@
 import glob
 import os
 import re
+import shlex
 import sys
+import tempfile
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from difflib import unified_diff
 
 from ClusterShell.NodeSet import NodeSet
@@ -16,7 +19,7 @@ from process_core_files import CoreFileException, CoreFileProcessing
 # pylint: disable=import-error,no-name-in-module
 from util.environment_utils import TestEnvironment
 from util.host_utils import get_local_host
-from util.run_utils import find_command, run_local, run_remote, stop_processes
+from util.run_utils import find_command, get_ssh_options, run_local, run_remote, stop_processes
 from util.systemctl_utils import stop_service
 from util.user_utils import get_chown_command
 from util.yaml_utils import get_test_category
@@ -155,7 +158,7 @@ def cleanup_processes(logger, test, result):
 
 
 def archive_files(logger, summary, hosts, source, pattern, destination, depth, threshold, timeout,
-                  test_result, test=None):
+                  test_result, test=None, stream=False):
     # pylint: disable=too-many-arguments
     """Archive the files from the source to the destination.
 
@@ -171,11 +174,18 @@ def archive_files(logger, summary, hosts, source, pattern, destination, depth, t
         timeout (int): number of seconds to wait for the command to complete.
         test_result (TestResult): the test result used to update the status of the test
         test (TestInfo, optional): the test information. Defaults to None.
+        stream (bool, optional): whether to check, compress, and copy the files in a single
+            parallel pass on each host with stream_files(). Defaults to False.
 
     Returns:
         int: status code: 0 = success, 16 = failure
 
     """
+    # Core and dump files require a file ownership change and the configuration files require
+    # sudo to be moved, so these files are always moved with move_files()
+    stream = stream and source != os.path.join(os.sep, "etc", "daos") and not any(
+        name in destination for name in ("stacktrace", "daos_dumps"))
+
     logger.debug("=" * 80)
     logger.info(
         "Archiving %s from %s:%s to %s%s,",
@@ -201,17 +211,24 @@ def archive_files(logger, summary, hosts, source, pattern, destination, depth, t
                 logger, file_hosts, source, pattern, depth, threshold, test_result)
 
         # Run cart_logtest on log files
-        return_code |= cart_log_test(logger, file_hosts, source, pattern, depth, test_result)
+        if not stream:
+            return_code |= cart_log_test(logger, file_hosts, source, pattern, depth, test_result)
 
     # Remove any empty files
     return_code |= remove_empty_files(logger, file_hosts, source, pattern, depth, test_result)
 
-    # Compress any files larger than 1 MB
-    return_code |= compress_files(logger, file_hosts, source, pattern, depth, test_result)
+    if stream:
+        # Check and compress the files on each host while they are copied to this host
+        return_code |= stream_files(
+            logger, file_hosts, source, pattern, destination, depth, timeout, test_result,
+            "log" in pattern)
+    else:
+        # Compress any files larger than 1 MB
+        return_code |= compress_files(logger, file_hosts, source, pattern, depth, test_result)
 
-    # Move the test files to the test-results directory on this host
-    return_code |= move_files(
-        logger, file_hosts, source, pattern, destination, depth, timeout, test_result)
+        # Move the test files to the test-results directory on this host
+        return_code |= move_files(
+            logger, file_hosts, source, pattern, destination, depth, timeout, test_result)
 
     if test and "core files" in summary:
         # Process the core files
@@ -220,6 +237,70 @@ def archive_files(logger, summary, hosts, source, pattern, destination, depth, t
     return return_code
 
 
+def stage_files(logger, hosts, source, pattern, depth, staging_dir, test_result):
+    """Move the files matching the pattern into a staging directory on each host.
+
+    Staging the files frees the source directory for the next test while the staged files are
+    archived by archive_staged_files().
+
+    Args:
+        logger (Logger): logger for the messages produced by this method
+        hosts (NodSet): hosts on which the files are located
+        source (str): where the files are currently located
+        pattern (str): pattern used to limit which files are processed
+        depth (int): max depth for find command
+        staging_dir (str): directory on each host in which to place the files
+        test_result (TestResult): the test result used to update the status of the test
+
+    Returns:
+        int: status code: 0 = success, 16 = failure
+
+    """
+    logger.debug("-" * 80)
+    logger.debug(
+        "Staging any %s files in %s on %s", os.path.join(source, pattern), staging_dir, hosts)
+    other = f"-print0 | xargs -0 -r0 -I '{{}}' mv '{{}}' '{staging_dir}'/"
+    command = f"mkdir -p '{staging_dir}' && {find_command(source, pattern, depth, other)}"
+    result = run_remote(logger, hosts, command)
+    if not result.passed:
+        message = (f"Error staging {os.path.join(source, pattern)} files in '{staging_dir}' on "
+                   f"{result.failed_hosts}")
+        test_result.fail_test(logger, "Process", message)
+        return 16
+    return 0
+
+
+def archive_staged_files(logger, test, test_result, staged):
+    """Archive the files staged by collect_test_result().
+
+    Args:
+        logger (Logger): logger for the messages produced by this method
+        test (TestInfo): the test information
+        test_result (TestResult): the test result used to update the status of the test
+        staged (dict): the staged files information provided by collect_test_result()
+
+    Returns:
+        int: status code: 0 = success, >0 = failure
+
+    """
+    return_code = 0
+    for summary, data in staged["files"].items():
+        return_code |= archive_files(
+            logger, summary, data["hosts"].copy(), data["source"], data["pattern"],
+            data["destination"], data["depth"], staged["threshold"], data["timeout"],
+            test_result, test, staged["stream"])
+
+    # Remove the staging directory on each host
+    command = f"rm -fr '{staged['directory']}'"
+    result = run_remote(logger, staged["hosts"], command)
+    if not result.passed:
+        message = f"Error removing the '{staged['directory']}' staging directory"
+        test_result.fail_test(logger, "Process", message)
+        return_code |= 16
+
+    return return_code
+
+
 def list_files(logger, hosts, source, pattern, depth, test_result):
     """List the files in source with that match the pattern.
 
@@ -487,6 +568,82 @@ def move_files(logger, hosts, source, pattern, destination, depth, timeout, test
     return return_code
 
 
+def stream_files(logger, hosts, source, pattern, destination, depth, timeout, test_result,
+                 check=False):
+    # pylint: disable=too-many-arguments
+    """Stream the files from the source on each host to the destination on this host.
+
+    Each host processes its files in parallel, running cart_logtest on each file when requested
+    and compressing any file larger than 1M, and adds each file to a tar stream, read by this
+    host, as soon as it has been processed. Each file is removed from its host once it has been
+    added to the stream. As with move_files(), the files of each host are placed in the
+    destination directory plus the name of the host.
+
+    Args:
+        logger (Logger): logger for the messages produced by this method
+        hosts (NodSet): hosts on which the files are located
+        source (str): where the files are currently located
+        pattern (str): pattern used to limit which files are processed
+        destination (str): where the files should be copied to on this host
+        depth (int): max depth for find command
+        timeout (int): number of seconds to wait for the files of each host to be copied
+        test_result (TestResult): the test result used to update the status of the test
+        check (bool, optional): whether to run cart_logtest on each file. Defaults to False.
+
+    Returns:
+        int: status code: 0 = success, 16 = failure
+
+    """
+    source_files = os.path.join(source, pattern)
+    logger.debug("-" * 80)
+    logger.debug("Streaming %s files from %s to %s", source_files, hosts, destination)
+
+    # Script run on each host to process each file and print its name, once processed, for tar
+    other = [
+        "-print0", "|", "xargs", "-0", "-r", "-n1", "-P", '"$(nproc)"', "bash", "-c",
+        "'process_file \"$1\"'", "bash", "|", "tar", "--null", "-T", "-", "--transform",
+        "'s,.*/,,'", "--remove-files", "-cf", "-"]
+    script = ["set -o pipefail", "process_file() {", '    file="$1"', "    rc=0"]
+    if check:
+        cart_logtest = os.path.abspath(os.path.join("cart", "cart_logtest.py"))
+        script.append(f'    {cart_logtest} --ftest-mode "$file" 1>&2 || rc=1')
+    script.extend([
+        '    if [ "$(stat -c %s "$file")" -gt 1048576 ]; then',
+        '        sudo -n lbzip2 "$file" && file="$file.bz2"',
+        "    fi",
+        "    printf '%s\\0' \"$file\"",
+        "    return $rc",
+        "}",
+        "export -f process_file",
+        find_command(source, pattern, depth, other)])
+    logger.debug("  Script run on each host:")
+    for line in script:
+        logger.debug("    %s", line)
+
+    def _stream_host(host):
+        host_destination = shlex.quote(f"{destination}.{host}")
+        command = (f"mkdir -p {host_destination} && ssh {get_ssh_options()} {host} bash -s "
+                   f"< {script_file.name} | tar -C {host_destination} -xf -")
+        return host, run_local(
+            logger, f"bash -o pipefail -c {shlex.quote(command)}", timeout=timeout)
+
+    # Stream the files from each host at the same time
+    failed_hosts = NodeSet()
+    with tempfile.NamedTemporaryFile("w", prefix="stream_files_", suffix=".sh") as script_file:
+        script_file.write("\n".join(script + [""]))
+        script_file.flush()
+        with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
+            for host, result in executor.map(_stream_host, hosts):
+                if not result.passed:
+                    failed_hosts.add(host)
+    if failed_hosts:
+        message = (f"Error checking, compressing, or copying {source_files} files from "
+                   f"{failed_hosts}")
+        test_result.fail_test(logger, "Process", message)
+        return 16
+    return 0
+
+
 def process_core_files(logger, test_job_results, test, test_result):
     """Generate a stacktrace for each core file detected.
 
@@ -565,6 +722,30 @@ def create_steps_log(logger, job_results_dir, test_result):
     return 0
 
 
+def get_renamed_test_dir(test, job_results_dir, test_logs_dir, jenkins_xml, total_repeats):
+    """Get the name of the avocado job-results directory once it includes the test name.
+
+    Args:
+        test (TestInfo): the test information
+        job_results_dir (str): path to the avocado job results
+        test_logs_dir (str): path to the avocado job-results directory of the test
+        jenkins_xml (bool): whether to use the Jenkins test names
+        total_repeats (int): total number of times the test will be repeated
+
+    Returns:
+        str: the renamed avocado job-results directory of the test
+
+    """
+    if not jenkins_xml:
+        return "-".join([test_logs_dir, get_test_category(test.test_file)])
+    if total_repeats > 1:
+        # When repeating tests ensure Jenkins-style avocado log directories
+        # are unique by including the repeat count in the path
+        return os.path.join(
+            job_results_dir, test.directory, test.python_file, test.name.repeat_str)
+    return os.path.join(job_results_dir, test.directory, test.python_file)
+
+
 def rename_avocado_test_dir(logger, test, job_results_dir, test_result, jenkins_xml, total_repeats):
     """Append the test name to its avocado job-results directory name.
 
@@ -587,14 +768,9 @@ def rename_avocado_test_dir(logger, test, job_results_dir, test_result, jenkins_
     test_logs_dir = os.path.realpath(test_logs_lnk)
 
     # Create the new avocado job-results test directory name
-    new_test_logs_dir = "-".join([test_logs_dir, get_test_category(test.test_file)])
+    new_test_logs_dir = get_renamed_test_dir(
+        test, job_results_dir, test_logs_dir, jenkins_xml, total_repeats)
     if jenkins_xml:
-        new_test_logs_dir = os.path.join(job_results_dir, test.directory, test.python_file)
-        if total_repeats > 1:
-            # When repeating tests ensure Jenkins-style avocado log directories
-            # are unique by including the repeat count in the path
-            new_test_logs_dir = os.path.join(
-                job_results_dir, test.directory, test.python_file, test.name.repeat_str)
         try:
             os.makedirs(new_test_logs_dir)
         except OSError:
@@ -827,8 +1003,9 @@ def replace_xml(logger, xml_file, pattern, replacement, xml_data, test_result):
 
 
 def collect_test_result(logger, test, test_result, job_results_dir, stop_daos, archive, rename,
-                        jenkins_xml, core_files, threshold, total_repeats):
-    # pylint: disable=too-many-arguments
+                        jenkins_xml, core_files, threshold, total_repeats, staged=None,
+                        stream=False):
+    # pylint: disable=too-many-arguments,too-many-branches
     """Process the test results.
 
     This may include (depending upon argument values):
@@ -851,6 +1028,11 @@ def collect_test_result(logger, test, test_result, job_results_dir, stop_daos, a
         core_files (dict): location and pattern defining where core files may be written
         threshold (str): optional upper size limit for test log files
         total_repeats (int): total number of times the test will be repeated
+        staged (dict, optional): if specified, the test log files are moved into a staging
+            directory on each host instead of being archived and this dict is updated with the
+            information needed to archive them with archive_staged_files(). Defaults to None.
+        stream (bool, optional): whether to stream the files to this host while they are
+            processed on each host. Defaults to False.
 
     Returns:
         int: status code: 0 = success, >0 = failure
@@ -907,6 +1089,7 @@ def collect_test_result(logger, test, test_result, job_results_dir, stop_daos, a
             "hosts": test.host_info.all_hosts,
             "depth": 1,
             "timeout": 900,
+            "stage": True,
         }
         remote_files["cart log files"] = {
             "source": test_env.log_dir,
@@ -915,6 +1098,7 @@ def collect_test_result(logger, test, test_result, job_results_dir, stop_daos, a
             "hosts": test.host_info.all_hosts,
             "depth": 2,
             "timeout": 900,
+            "stage": True,
         }
         remote_files["ULTs stacks dump files"] = {
             "source": os.path.join(os.sep, "tmp"),
@@ -941,13 +1125,26 @@ def collect_test_result(logger, test, test_result, job_results_dir, stop_daos, a
                 "depth": 1,
                 "timeout": 1800,
             }
+        staged_files = OrderedDict()
+        staging_dir = os.path.join(
+            f"{test_env.log_dir}_staged", f"{test.name.order_str}-{test.name.repeat_str}")
         for summary, data in remote_files.items():
             if not data["hosts"]:
                 continue
+            if staged is not None and data.get("stage"):
+                # Move the files out of the way of the next test and archive them later
+                source = os.path.join(staging_dir, os.path.basename(data["destination"]))
+                return_code |= stage_files(
+                    logger, data["hosts"], data["source"], data["pattern"], data["depth"],
+                    source, test_result)
+                staged_files[summary] = dict(
+                    data, source=source, depth=1, destination=os.path.join(
+                        test_logs_dir, os.path.basename(data["destination"])))
+                continue
             return_code |= archive_files(
                 logger, summary, data["hosts"].copy(), data["source"], data["pattern"],
                 data["destination"], data["depth"], threshold, data["timeout"],
-                test_result, test)
+                test_result, test, stream)
 
     # Generate a steps.log file
     return_code |= create_steps_log(logger, job_results_dir, test_result)
@@ -957,4 +1154,20 @@ def collect_test_result(logger, test, test_result, job_results_dir, stop_daos, a
         return_code |= rename_avocado_test_dir(
             logger, test, job_results_dir, test_result, jenkins_xml, total_repeats)
 
+    if staged is not None and archive and staged_files:
+        # The staged files are archived in the test results directory once it has been renamed
+        if rename:
+            renamed_dir = get_renamed_test_dir(
+                test, job_results_dir, test_logs_dir, jenkins_xml, total_repeats)
+            for data in staged_files.values():
+                data["destination"] = os.path.join(
+                    renamed_dir, os.path.basename(data["destination"]))
+        staged.update({
+            "directory": staging_dir,
+            "hosts": test.host_info.all_hosts,
+            "threshold": threshold,
+            "stream": stream,
+            "files": staged_files,
+        })
+
     return return_code
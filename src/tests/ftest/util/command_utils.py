@@ -21,8 +21,9 @@ from command_utils_base import (BasicParameter, CommandWithParameters, Environme
                                 FormattedParameter, LogParameter, ObjectWithParameters)
 from exception_utils import CommandFailure
 from file_utils import change_file_owner, create_directory, distribute_files
-from general_utils import (DaosTestError, check_file_exists, get_file_listing,
-                           get_job_manager_class, get_subprocess_stdout, run_command)
+from general_utils import (DaosTestError, SubprocessPatternCounter, check_file_exists,
+                           get_file_listing, get_job_manager_class, get_subprocess_stdout,
+                           run_command)
 from run_utils import command_as_user, run_remote
 from user_utils import get_primary_group
 from yaml_utils import get_yaml_data
@@ -781,10 +782,10 @@ class SubProcessCommand(CommandWithSubCommand):
     def check_subprocess_status(self, sub_process):
         """Verify the status of the command started as a subprocess.
 
-        Continually search the subprocess output for a pattern (self.pattern)
-        until the expected number of patterns (self.pattern_count) have been
-        found (typically one per host) or the timeout (self.pattern_timeout)
-        is reached or the process has stopped.
+        Search the subprocess output for a pattern (self.pattern) as it is
+        produced until the expected number of patterns (self.pattern_count)
+        have been found (typically one per host) or the timeout
+        (self.pattern_timeout) is reached or the process has stopped.
 
         Args:
             sub_process (process.SubProcess): subprocess used to run the command
@@ -804,16 +805,20 @@ class SubProcessCommand(CommandWithSubCommand):
             timed_out = False
             start = time.time()
             elapsed = 0.0
+            counter = SubprocessPatternCounter(sub_process, self.pattern)
+            counter.update()
 
-            # Search for patterns in the subprocess output until:
+            # Search for patterns in the new subprocess output until:
             #   - the expected number of pattern matches are detected (success)
             #   - the time out is reached (failure)
             #   - the subprocess is no longer running (failure)
             while not complete and not timed_out and sub_process.poll() is None:
-                detected = len(re.findall(self.pattern, get_subprocess_stdout(sub_process)))
+                detected = counter.count
                 complete = detected == self.pattern_count
                 elapsed = time.time() - start
                 timed_out = elapsed > self.pattern_timeout.value
+                if not complete and not timed_out:
+                    counter.wait(self.pattern_timeout.value - elapsed)
 
             # Summarize results
             self.report_subprocess_status(elapsed, detected, complete, timed_out, sub_process)
@@ -6,6 +6,7 @@
 """
 # pylint: disable=too-many-lines
 
+import codecs
 import ctypes
 import math
 import os
@@ -924,6 +925,92 @@ def get_subprocess_stdout(subprocess):
     return output
 
 
+class SubprocessPatternCounter():
+    """Count the matches of a pattern in the output of a running subprocess.
+
+    Each update only decodes and searches the output added since the previous update, so waiting
+    for a pattern costs O(output) instead of searching the whole output on every check, and checks
+    without new output compare the buffer size instead of copying the output.  The
+    complete lines are searched once and discarded, the last partial line is searched again until
+    it is complete, so the count matches re.findall() on the whole output for patterns which do not
+    span lines.
+    """
+
+    def __init__(self, subprocess, pattern):
+        """Create a SubprocessPatternCounter object.
+
+        Args:
+            subprocess (process.SubProcess): subprocess from which to search the stdout
+            pattern (str): regular expression to count
+        """
+        self._subprocess = subprocess
+        self._regex = re.compile(pattern)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._size = 0
+        self._partial = ""
+        self._lines_count = 0
+
+    @property
+    def count(self):
+        """int: number of pattern matches in the output searched so far."""
+        return self._lines_count + len(self._regex.findall(self._partial))
+
+    def _get_stdout_size(self):
+        """Get the size of the subprocess stdout without copying it.
+
+        SubProcess.get_stdout() returns a copy of the whole output, so read the position of the
+        avocado drainer buffer collecting it instead.
+
+        Returns:
+            int: the number of bytes of output so far, or None if the buffer is not available
+        """
+        try:
+            # pylint: disable=protected-access
+            drainer = self._subprocess._combined_drainer or self._subprocess._stdout_drainer
+            return drainer.data.tell()
+        except AttributeError:
+            return None
+
+    def update(self):
+        """Search the output added to the subprocess stdout since the last update.
+
+        Returns:
+            bool: whether or not there was new output
+        """
+        if self._get_stdout_size() == self._size:
+            return False
+        output = self._subprocess.get_stdout()
+        if len(output) == self._size:
+            return False
+        new_output = output[self._size:]
+        self._size = len(output)
+        if isinstance(new_output, bytes):
+            new_output = self._decoder.decode(new_output)
+        text = self._partial + new_output
+        end = text.rfind("\n") + 1
+        self._lines_count += len(self._regex.findall(text, 0, end))
+        self._partial = text[end:]
+        return True
+
+    def wait(self, timeout, delay=0.05):
+        """Wait for new output from the subprocess and search it.
+
+        Args:
+            timeout (float): maximum number of seconds to wait for new output
+            delay (float, optional): number of seconds between checks for new output. Defaults to
+                0.05.
+
+        Returns:
+            bool: whether or not there was new output
+        """
+        start = time.time()
+        while not self.update():
+            if self._subprocess.poll() is not None or time.time() - start >= timeout:
+                return False
+            time.sleep(delay)
+        return True
+
+
 def create_string_buffer(value, size=None):
     """Create a ctypes string buffer.
 
@@ -5,22 +5,26 @@
   SPDX-License-Identifier: BSD-2-Clause-Patent
 """
 # pylint: disable=too-many-lines
+import glob
+import json
 import logging
 import os
 import re
+import subprocess  # nosec
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from ClusterShell.NodeSet import NodeSet
 from slurm_setup import SlurmSetup, SlurmSetupException
 # pylint: disable=import-error,no-name-in-module
-from util.collection_utils import TEST_RESULTS_DIRS, collect_test_result
+from util.collection_utils import TEST_RESULTS_DIRS, archive_staged_files, collect_test_result
 from util.data_utils import dict_extract_values, list_flatten, list_unique
 from util.environment_utils import TestEnvironment
 from util.host_utils import HostException, HostInfo, get_local_host, get_node_set
 from util.logger_utils import LOG_FILE_FORMAT, get_file_handler
-from util.results_utils import LaunchTestName
+from util.results_utils import LaunchTestName, TestResult, read_json
 from util.run_utils import RunException, command_as_user, run_local, run_remote
 from util.slurm_utils import create_partition, delete_partition, show_partition
 from util.storage_utils import StorageException, StorageInfo
@@ -476,7 +480,7 @@ class TestRunner():
         return return_code
 
     def process(self, logger, job_results_dir, test, repeat, stop_daos, archive, rename,
-                jenkins_xml, core_files, threshold):
+                jenkins_xml, core_files, threshold, staged=None, stream=False):
         # pylint: disable=too-many-arguments
         """Process the test results.
 
@@ -497,6 +501,11 @@ class TestRunner():
             jenkins_xml (bool): whether or not to update the results.xml to use Jenkins-style names
             core_files (dict): location and pattern defining where core files may be written
             threshold (str): optional upper size limit for test log files
+            staged (dict, optional): if specified, only stage the test log files on each host
+                and update this dict with the information needed by complete() to archive them.
+                Defaults to None.
+            stream (bool, optional): whether to stream the archived files to this host while they
+                are processed on each host. Defaults to False.
 
         Returns:
             int: status code: 0 = success, >0 = failure
@@ -510,14 +519,42 @@ class TestRunner():
             test, repeat, self.total_repeats)
         status = collect_test_result(
             logger, test, self.test_result, job_results_dir, stop_daos, archive, rename,
-            jenkins_xml, core_files, threshold, self.total_repeats)
+            jenkins_xml, core_files, threshold, self.total_repeats, staged, stream)
+        if staged:
+            # Pause the processing of this test until its staged files are archived
+            self.test_result.end()
+            return status
+
+        return status | self.complete(logger, test, self.test_result)
+
+    @staticmethod
+    def complete(logger, test, test_result, staged=None):
+        """Complete the processing of the test results.
+
+        Args:
+            logger (Logger): logger for the messages produced by this method
+            test (TestInfo): the test information
+            test_result (TestResult): the test result used to update the status of the test
+            staged (dict, optional): the test log files staged by process() to archive. Defaults
+                to None.
+
+        Returns:
+            int: status code: 0 = success, >0 = failure
+        """
+        status = 0
+        if staged:
+            # Mark the continuation of the processing of this test
+            test_result.start()
+            logger.debug("=" * 80)
+            logger.info("Archiving the staged files of the %s test", test)
+            status = archive_staged_files(logger, test, test_result, staged)
 
         # Mark the execution of the test as passed if nothing went wrong
-        if self.test_result.status is None:
-            self.test_result.pass_test(logger)
+        if test_result.status is None:
+            test_result.pass_test(logger)
 
         # Mark the end of the processing of this test
-        self.test_result.end()
+        test_result.end()
 
         return status
 
@@ -1224,8 +1261,9 @@ class TestGroup():
 
     def run_tests(self, logger, result, repeat, slurm_setup, sparse, fail_fast, stop_daos, archive,
                   rename, jenkins_log, core_files, threshold, user_create, code_coverage,
-                  job_results_dir, logdir, clear_mounts, cleanup_files):
-        # pylint: disable=too-many-arguments
+                  job_results_dir, logdir, clear_mounts, cleanup_files, pipeline=0,
+                  stream=False):
+        # pylint: disable=too-many-arguments,too-many-locals
         """Run all the tests.
 
         Args:
@@ -1247,6 +1285,11 @@ class TestGroup():
             logdir (str): base directory in which to place the log file
             clear_mounts (list): mount points to remove before each test
             cleanup_files (dict): files to remove on specific hosts at the end of testing
+            pipeline (int, optional): maximum number of tests whose log files may be archived in
+                the background while the next tests run. Defaults to 0, which archives the log
+                files of each test before running the next test.
+            stream (bool, optional): whether to stream the archived files to this host while they
+                are processed on each host. Defaults to False.
 
         Returns:
             int: status code indicating any issues running tests
@@ -1254,6 +1297,12 @@ class TestGroup():
         return_code = 0
         runner = TestRunner(self._avocado, result, len(self.tests), repeat, self.tag_filters)
 
+        # Archive the staged log files of the previous tests with a single background thread
+        executor = ThreadPoolExecutor(max_workers=1) if pipeline > 0 else None
+        pipeline_logger = logging.getLogger(f"{logger.name}.pipeline")
+        pipeline_logger.propagate = False
+        pending = []
+
         # Display the location of the avocado logs
         logger.info("Avocado job results directory: %s", job_results_dir)
 
@@ -1286,10 +1335,20 @@ class TestGroup():
                 # Run the test with avocado
                 return_code |= runner.execute(logger, test, loop, index + 1, sparse, fail_fast)
 
-                # Archive the test results
+                # Limit the number of tests whose staged log files are waiting to be archived
+                while executor and len(pending) >= pipeline:
+                    return_code |= pending.pop(0).result()
+
+                # Archive the test results, optionally staging the log files to archive them in
+                # the background while the next test runs
+                staged = {} if executor else None
                 return_code |= runner.process(
                     logger, job_results_dir, test, loop, stop_daos, archive, rename,
-                    jenkins_log, core_files, threshold)
+                    jenkins_log, core_files, threshold, staged, stream)
+                if staged:
+                    pending.append(executor.submit(
+                        self._complete_staged_test, pipeline_logger, list(logger.handlers), test,
+                        runner.test_result, staged))
 
                 # Display disk usage after the test is complete
                 display_disk_space(logger, logdir)
@@ -1297,11 +1356,14 @@ class TestGroup():
                 # Stop logging to the test log file
                 logger.removeHandler(test_file_handler)
 
+        # Wait for the staged log files of any remaining tests to be archived
+        for future in pending:
+            return_code |= future.result()
+        if executor:
+            executor.shutdown()
+
         # Cleanup any specified files at the end of testing
-        for file, info in cleanup_files.items():
-            command = command_as_user(f"rm -fr {file}", info['user'])
-            if not run_remote(logger, info['hosts'], command).passed:
-                return_code |= 16
+        return_code |= self._remove_cleanup_files(logger, cleanup_files)
 
         # Collect code coverage files after all test have completed
         if not code_coverage.finalize(logger, job_results_dir, result.tests[0]):
@@ -1309,3 +1371,198 @@ class TestGroup():
 
         # Summarize the run
         return return_code
+
+    def run_tests_concurrently(self, logger, result, jobs, get_command, logdir, environment,
+                               override, cleanup_files):
+        # pylint: disable=too-many-arguments,too-many-locals
+        """Run the tests at the same time on disjoint subsets of the test hosts.
+
+        Each test is run by its own launch.py command using only the hosts assigned to the test,
+        its own avocado job-results directory, and its own local test log directory. Tests using
+        slurm partitions or reservations, or requiring more hosts than are available, are run by
+        themselves with all of the hosts once the running tests have completed. The results of
+        each launch.py command are merged into the specified results.
+
+        Args:
+            logger (Logger): logger for the messages produced by this method
+            result (Results): object tracking the result of the tests
+            jobs (int): maximum number of tests to run at the same time
+            get_command (callable): function returning the launch.py command, as a list, used to
+                run a test given the TestInfo, servers, clients, and avocado job-results directory
+            logdir (str): directory in which to place the results of each launch.py command
+            environment (dict): environment to use with each launch.py command
+            override (bool): whether or not the tests use all of the hosts regardless of the
+                quantity of replacement values used in the test yaml file
+            cleanup_files (dict): files to remove on specific hosts at the end of testing
+
+        Returns:
+            int: status code indicating any issues running tests
+        """
+        return_code = 0
+        pending = list(self.tests)
+        running = {}
+        free_servers = NodeSet(self._servers)
+        free_clients = NodeSet(self._clients)
+        free_slots = list(range(jobs, 0, -1))
+
+        logger.info("-" * 80)
+        logger.info("Running up to %s tests at the same time on %s", jobs, self._partition_hosts)
+        while pending or running:
+            # Start the pending tests, in order, that fit on the free hosts
+            for test in list(pending):
+                if not free_slots:
+                    break
+                quantities = None if override else self._get_host_quantities(test)
+                if quantities is None:
+                    # Run this test with all of the hosts once the running tests complete
+                    if running:
+                        break
+                    servers = NodeSet(self._servers)
+                    clients = NodeSet(self._clients)
+                elif len(free_servers) < quantities[0] or len(free_clients) < quantities[1]:
+                    continue
+                else:
+                    servers = NodeSet.fromlist(list(free_servers)[:quantities[0]])
+                    clients = NodeSet.fromlist(list(free_clients)[:quantities[1]])
+                free_servers.difference_update(servers)
+                free_clients.difference_update(clients)
+                pending.remove(test)
+
+                slot = free_slots.pop()
+                job_results_dir = os.path.join(logdir, "jobs", test.name.order_str)
+                os.makedirs(job_results_dir, exist_ok=True)
+                command = get_command(test, servers, clients, job_results_dir)
+                env = environment.copy()
+                env["DAOS_TEST_LOG_DIR"] = f"{self._test_env.log_dir}_{slot}"
+                env["DAOS_TEST_USER_DIR"] = f"{self._test_env.user_dir}_{slot}"
+                output = os.path.join(job_results_dir, "launch.log")
+                logger.info(
+                    "Starting %s on %s (output: %s)", test, servers | clients, output)
+                logger.debug("  Running: %s", " ".join(command))
+                with open(output, "w", encoding="utf-8") as output_file:
+                    # pylint: disable-next=consider-using-with
+                    process = subprocess.Popen(     # nosec
+                        command, stdout=output_file, stderr=subprocess.STDOUT, env=env)
+                running[process] = (test, slot, servers, clients, job_results_dir)
+                if quantities is None:
+                    break
+
+            # Wait for a running test to complete
+            time.sleep(1)
+            for process in [process for process in running if process.poll() is not None]:
+                test, slot, servers, clients, job_results_dir = running.pop(process)
+                logger.info(
+                    "Completed %s on %s with return code %s",
+                    test, servers | clients, process.returncode)
+                return_code |= self._merge_concurrent_results(
+                    logger, result, test, job_results_dir, process.returncode)
+                free_servers.update(servers)
+                free_clients.update(clients)
+                free_slots.append(slot)
+
+        # Cleanup any specified files at the end of testing
+        return_code |= self._remove_cleanup_files(logger, cleanup_files)
+
+        return return_code
+
+    def _get_host_quantities(self, test):
+        """Get the number of servers and clients required to run the test with other tests.
+
+        Args:
+            test (TestInfo): the test information
+
+        Returns:
+            tuple: the number of server and client hosts required by the test or None if the test
+                must be run with all of the hosts
+        """
+        for key in ("server_partition", "server_reservation", "client_partition",
+                    "client_reservation"):
+            if test.yaml_info[key]:
+                return None
+        servers = len(test.yaml_info["test_servers"])
+        clients = len(test.yaml_info["test_clients"])
+        if not self._clients:
+            # Client placeholders are replaced with the remaining server hosts
+            servers, clients = servers + clients, 0
+        if not servers or servers > len(self._servers) or clients > len(self._clients):
+            return None
+        return servers, clients
+
+    @staticmethod
+    def _merge_concurrent_results(logger, result, test, job_results_dir, return_code):
+        """Merge the results of a test run by its own launch.py command.
+
+        Args:
+            logger (Logger): logger for the messages produced by this method
+            result (Results): object tracking the result of the tests
+            test (TestInfo): the test information
+            job_results_dir (str): avocado job-results directory used by the launch.py command
+            return_code (int): the launch.py command return code
+
+        Returns:
+            int: status code indicating any issues running the test
+        """
+        try:
+            launch_dir = glob.glob(os.path.join(job_results_dir, "launch", "*"))[0]
+            tests = read_json(os.path.join(launch_dir, "results.json"))
+            with open(os.path.join(launch_dir, "details.json"), "r", encoding="utf-8") as file:
+                details = json.load(file)
+        except (IndexError, OSError, ValueError):
+            test_result = result.add_test(
+                test.class_name, LaunchTestName(test.name.name, test.name.order, 0),
+                os.path.join(job_results_dir, "launch.log"))
+            test_result.start()
+            message = f"Error reading the results of {test} (launch.py rc={return_code})"
+            test_result.fail_test(logger, "Execute", message, sys.exc_info())
+            test_result.end()
+            return 2
+
+        for test_result in tests:
+            # Include the launch.py step results only when they report an issue
+            if test_result.name.name == "./launch.py" and test_result.status == TestResult.PASS:
+                continue
+            test_result.name.order = test.name.order
+            result.tests.append(test_result)
+        return details.get("test status", 128 if return_code else 0)
+
+    @staticmethod
+    def _remove_cleanup_files(logger, cleanup_files):
+        """Remove the specified files at the end of testing.
+
+        Args:
+            logger (Logger): logger for the messages produced by this method
+            cleanup_files (dict): files to remove on specific hosts
+
+        Returns:
+            int: status code: 0 = success, 16 = failure
+        """
+        status = 0
+        for file, info in cleanup_files.items():
+            command = command_as_user(f"rm -fr {file}", info['user'])
+            if not run_remote(logger, info['hosts'], command).passed:
+                status |= 16
+        return status
+
+    @staticmethod
+    def _complete_staged_test(logger, handlers, test, test_result, staged):
+        """Archive the staged log files of a test in the background.
+
+        Args:
+            logger (Logger): logger for the messages produced by this method
+            handlers (list): the handlers, including the test log file handler, to use with the
+                logger while processing this test
+            test (TestInfo): the test information
+            test_result (TestResult): the test result used to update the status of the test
+            staged (dict): the test log files staged by TestRunner.process()
+
+        Returns:
+            int: status code: 0 = success, >0 = failure
+        """
+        logger.handlers = handlers
+        try:
+            return TestRunner.complete(logger, test, test_result, staged)
+        except Exception:       # pylint: disable=broad-except
+            message = "Unhandled error archiving the staged test files"
+            test_result.fail_test(logger, "Process", message, sys.exc_info())
+            test_result.end()
+            return 16
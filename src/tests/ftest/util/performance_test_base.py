@@ -4,6 +4,7 @@
 
   SPDX-License-Identifier: BSD-2-Clause-Patent
 """
+import contextlib
 import os
 import time
 
@@ -14,6 +15,7 @@ from ior_test_base import IorTestBase
 from ior_utils import IorMetrics
 from mdtest_test_base import MdtestBase
 from mdtest_utils import MdtestMetrics
+from telemetry_utils import TelemetrySampler, TelemetryUtils
 
 
 class PerformanceTestBase(IorTestBase, MdtestBase):
@@ -22,10 +24,15 @@ class PerformanceTestBase(IorTestBase, MdtestBase):
     Optional yaml config values:
         performance/phase_barrier_s (int): seconds to wait between IOR write/read phases.
         performance/env (list): list of env vars to set for IOR/MDTest.
+        performance/telemetry_interval (int): seconds between the telemetry samples collected
+            during each IOR/MDTest phase. Defaults to 0, which disables sampling.
+        performance/telemetry_metrics (list): telemetry metrics to sample. Defaults to the engine
+            pool ops metrics.
 
     Outputs:
         */data/performance.log: Contains input parameters and output metrics.
         */data/daos_metrics/<host>_engine<idx>.csv: daos_metrics output for each host/engine
+        */data/telemetry/<phase>.jsonl: telemetry samples collected during each phase
     """
 
     class PerfParams():
@@ -54,6 +61,8 @@ class PerformanceTestBase(IorTestBase, MdtestBase):
         self._performance_log_name = os.path.join(self._performance_log_dir, "performance.log")
         self.phase_barrier_s = 0
         self.daos_metrics_num = 0
+        self.telemetry_interval = 0
+        self.telemetry_metrics = None
 
         # For tracking various configuration params
         self.perf_params = PerformanceTestBase.PerfParams()
@@ -72,6 +81,10 @@ class PerformanceTestBase(IorTestBase, MdtestBase):
         self.perf_params.num_clients = len(self.hostlist_clients)
         self.perf_params.provider = self.server_managers[0].get_config_value("provider")
         self.phase_barrier_s = self.params.get("phase_barrier_s", '/run/performance/*', 0)
+        self.telemetry_interval = self.params.get(
+            "telemetry_interval", '/run/performance/*', 0)
+        self.telemetry_metrics = self.params.get(
+            "telemetry_metrics", '/run/performance/*', TelemetryUtils.ENGINE_POOL_OPS_METRICS)
 
     def log_performance(self, msg, log_to_info=True, file_path=None):
         """Log a performance-related message to self.log.info and self._performance_log_name.
@@ -117,6 +130,49 @@ class PerformanceTestBase(IorTestBase, MdtestBase):
                 log_path = os.path.join(metrics_dir, log_name)
                 self.log_performance(stdout, False, log_path)
 
+    @contextlib.contextmanager
+    def _sample_telemetry(self, phase):
+        """Sample the telemetry metrics during a phase, if performance/telemetry_interval is set.
+
+        The samples are written to */data/telemetry/<phase>.jsonl and summarized in the
+        performance log when the phase completes.
+
+        Args:
+            phase (str): name of the phase
+
+        Yields:
+            TelemetrySampler: the sampler, or None if sampling is not enabled
+
+        """
+        if not self.telemetry_interval:
+            yield None
+            return
+        telemetry_dir = os.path.join(self._performance_log_dir, "telemetry")
+        os.makedirs(telemetry_dir, exist_ok=True)
+        with TelemetrySampler(
+                self.log, self.dmg_cmd, self.hostlist_servers, self.telemetry_metrics,
+                self.telemetry_interval,
+                os.path.join(telemetry_dir, "{}.jsonl".format(phase))) as sampler:
+            yield sampler
+        self._log_telemetry(phase, sampler.recorder)
+
+    def _log_telemetry(self, phase, recorder):
+        """Log the change and rate of each sampled telemetry metric during a phase.
+
+        Args:
+            phase (str): name of the phase
+            recorder (TelemetryRecorder): the samples collected during the phase
+
+        """
+        msg = []
+        for metric in recorder.get_metrics():
+            summary = recorder.summarize(metric)
+            if summary["delta"]:
+                msg.append("Telemetry {} {}: delta={} rate={:.2f}/s max={}".format(
+                    phase, metric, summary["delta"], summary["rate"], summary["max"]))
+        if msg:
+            self.log_performance(msg)
+
     @property
     def unique_id(self):
         """A unique id for each test case ran."""
@@ -252,21 +308,23 @@ class PerformanceTestBase(IorTestBase, MdtestBase):
             return False
         return True
 
-    def _run_performance_ior_single(self, intercept=None):
+    def _run_performance_ior_single(self, intercept=None, phase="ior"):
         """Run a single IOR execution.
 
         Args:
             intercept (str, optional): path to interception library.
+            phase (str, optional): name of the phase for the telemetry samples. Defaults to "ior".
 
         """
         try:
-            ior_output = self.run_ior_with_pool(
-                create_pool=False,
-                create_cont=False,
-                intercept=intercept,
-                display_space=False,
-                stop_dfuse=False
-            )
+            with self._sample_telemetry(phase):
+                ior_output = self.run_ior_with_pool(
+                    create_pool=False,
+                    create_cont=False,
+                    intercept=intercept,
+                    display_space=False,
+                    stop_dfuse=False
+                )
             ior_metrics = self.ior_cmd.get_ior_metrics(ior_output)
             for metrics in ior_metrics:
                 if metrics[0] == "write":
@@ -342,7 +400,7 @@ class PerformanceTestBase(IorTestBase, MdtestBase):
 
         self.log_step("Running IOR write")
         self.ior_cmd.flags.update(write_flags)
-        self._run_performance_ior_single(intercept)
+        self._run_performance_ior_single(intercept, "ior_write")
 
         # Manually stop dfuse after ior write completes
         if self.dfuse:
@@ -354,7 +412,7 @@ class PerformanceTestBase(IorTestBase, MdtestBase):
 
         self.log_step("Running IOR read")
         self.ior_cmd.flags.update(read_flags)
-        self._run_performance_ior_single(intercept)
+        self._run_performance_ior_single(intercept, "ior_read")
 
         # Manually stop dfuse after ior read completes
         if self.dfuse:
@@ -422,7 +480,8 @@ class PerformanceTestBase(IorTestBase, MdtestBase):
 
         self.log.info("Running MDTEST")
         try:
-            mdtest_result = self.execute_mdtest(display_space=False)
+            with self._sample_telemetry("mdtest"):
+                mdtest_result = self.execute_mdtest(display_space=False)
             mdtest_metrics = MdtestMetrics(mdtest_result.stdout_text)
             if not mdtest_metrics:
                 self.fail("Failed to get mdtest metrics")
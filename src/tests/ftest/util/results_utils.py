@@ -3,6 +3,7 @@
 
   SPDX-License-Identifier: BSD-2-Clause-Patent
 """
+import json
 import os
 import time
 from argparse import Namespace
@@ -420,7 +421,9 @@ class Job():
             logger (Logger): logger for the messages produced by this method
             results (Results): the test results to use to generate the files
         """
-        for key, create_method in {"results.xml": create_xml, "results.html": create_html}.items():
+        create_methods = {
+            "results.xml": create_xml, "results.html": create_html, "results.json": create_json}
+        for key, create_method in create_methods.items():
             output = os.path.join(self.logdir, key)
             try:
                 logger.debug("Creating %s: %s", key, output)
@@ -467,6 +470,65 @@ def create_xml(job, results):
     result_xml.render(sanitize_results(results), job)
 
 
+def create_json(job, results):
+    """Create a json file for the specified test results.
+
+    The json file can be read with read_json() to include the test results in other results.
+
+    Args:
+        job (Job): information about the job producing the results
+        results (Results): the test results to include in the json file
+    """
+    data = []
+    for test in results.tests:
+        data.append({
+            "class_name": test.class_name,
+            "name": {"name": test.name.name, "order": test.name.order, "repeat": test.name.repeat},
+            "log_file": test.logfile,
+            "log_dir": test.logdir,
+            "time_start": test.time_start,
+            "time_end": test.time_end,
+            "time_elapsed": test.time_elapsed,
+            "status": test.status,
+            "fail_class": test.fail_class,
+            "fail_reason": test.fail_reason,
+            "fail_count": test.fail_count,
+            "traceback": test.traceback,
+        })
+    with open(os.path.join(job.logdir, "results.json"), "w", encoding="utf-8") as json_file:
+        json.dump(data, json_file, indent=4)
+
+
+def read_json(json_file):
+    """Read the test results from a json file created by create_json().
+
+    Args:
+        json_file (str): the json file to read
+
+    Raises:
+        OSError: if there is an error reading the json file
+        ValueError: if the json file contents are invalid
+
+    Returns:
+        list: the TestResult objects read from the json file
+    """
+    with open(json_file, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    tests = []
+    try:
+        for entry in data:
+            test = TestResult(
+                entry["class_name"], LaunchTestName(**entry["name"]), entry["log_file"],
+                entry["log_dir"])
+            for key in ("time_start", "time_end", "time_elapsed", "status", "fail_class",
+                        "fail_reason", "fail_count", "traceback"):
+                setattr(test, key, entry[key])
+            tests.append(test)
+    except (KeyError, TypeError) as error:
+        raise ValueError(f"Invalid test results in {json_file}") from error
+    return tests
+
+
 def create_html(job, results):
     """Create a html file for the specified test results.
 
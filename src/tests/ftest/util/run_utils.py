@@ -7,6 +7,8 @@
 import os
 import re
 import subprocess  # nosec
+import tempfile
+import threading
 import time
 from getpass import getuser
 from socket import gethostname
@@ -14,6 +16,14 @@ from socket import gethostname
 from ClusterShell.NodeSet import NodeSet
 from ClusterShell.Task import task_self
 
+# Number of seconds an idle ssh connection to a host is kept open for reuse by the next run_remote()
+# call, from any process of this user.  Set DAOS_TEST_SSH_PERSIST to override it, 0 disables it.
+SSH_CONTROL_PERSIST = 60
+
+# Accumulated timing of the run_remote() calls of this process
+_RUN_REMOTE_TIMES = {"calls": 0, "total": 0.0, "max": 0.0}
+_RUN_REMOTE_TIMES_LOCK = threading.Lock()
+
 
 class RunException(Exception):
     """Base exception for this module."""
@@ -149,6 +159,9 @@ class CommandResult():
         """
         self.output = []
 
+        # Number of seconds taken to run the command, set by run_remote()
+        self.duration = None
+
         # Get a dictionary of host list values for each unique return code key
         return_codes = dict(task.iter_retcodes())
 
@@ -472,16 +485,24 @@ def run_remote(log, hosts, command, verbose=True, timeout=120, task_debug=False,
     if fanout is None:
         fanout = max(task.info('fanout'), len(os.sched_getaffinity(0)))
     task.set_info('fanout', fanout)
-    # Enable forwarding of the ssh authentication agent connection
-    task.set_info("ssh_options", "-oForwardAgent=yes")
+    # Enable forwarding of the ssh authentication agent connection and connection sharing
+    task.set_info("ssh_options", get_ssh_options())
     if verbose:
         if timeout is None:
             log.debug("Running on %s without a timeout: %s", hosts, command)
         else:
             log.debug("Running on %s with a %s second timeout: %s", hosts, timeout, command)
+    start = time.time()
     task.run(command=command, nodes=hosts, timeout=timeout)
+    duration = time.time() - start
     results = CommandResult(command, task)
+    results.duration = duration
+    with _RUN_REMOTE_TIMES_LOCK:
+        _RUN_REMOTE_TIMES["calls"] += 1
+        _RUN_REMOTE_TIMES["total"] += duration
+        _RUN_REMOTE_TIMES["max"] = max(_RUN_REMOTE_TIMES["max"], duration)
     if verbose:
+        log.debug("Command completed on %s in %.3f seconds", hosts, duration)
         results.log_output(log)
     else:
         # Always log any failed commands
@@ -491,6 +512,45 @@ def run_remote(log, hosts, command, verbose=True, timeout=120, task_debug=False,
     return results
 
 
+def get_ssh_options():
+    """Get the ssh options used by run_remote().
+
+    Unless disabled with DAOS_TEST_SSH_PERSIST=0, the first command run on a host opens a master
+    connection, shared through a socket in a private temporary directory, which the following
+    commands reuse instead of opening a new connection to the host.
+
+    Returns:
+        str: the ssh options
+    """
+    options = ["-oForwardAgent=yes"]
+    try:
+        persist = int(os.environ.get("DAOS_TEST_SSH_PERSIST", SSH_CONTROL_PERSIST))
+    except ValueError:
+        persist = SSH_CONTROL_PERSIST
+    if persist > 0:
+        control_dir = os.path.join(tempfile.gettempdir(), f"daos_ssh_{getuser()}")
+        try:
+            os.makedirs(control_dir, mode=0o700, exist_ok=True)
+            if os.stat(control_dir).st_uid != os.getuid():
+                return " ".join(options)
+        except OSError:
+            return " ".join(options)
+        options.extend([
+            "-oControlMaster=auto", f"-oControlPath={control_dir}/%C",
+            f"-oControlPersist={persist}"])
+    return " ".join(options)
+
+
+def get_run_remote_times():
+    """Get the accumulated timing of the run_remote() calls of this process.
+
+    Returns:
+        dict: the number of calls, and the total and maximum number of seconds of a call
+    """
+    with _RUN_REMOTE_TIMES_LOCK:
+        return dict(_RUN_REMOTE_TIMES)
+
+
 def command_as_user(command, user, env=None):
     """Adjust a command to be ran as another user.
 
@@ -8,6 +8,7 @@
 
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from getpass import getuser
 
 from avocado import fail_on
@@ -1151,10 +1152,12 @@ class DaosServerManager(SubprocessManager):
 
         """
         engines_per_host = self.get_config_value("engines_per_host") or 1
-        engines = []
         daos_metrics_exe = os.path.join(self.manager.job.command_path, "daos_metrics")
-        for engine in range(engines_per_host):
+
+        def _get_engine_metrics(engine):
             command = command_as_user(f"{daos_metrics_exe} -S {engine} --csv", "root")
-            result = run_remote(self.log, self._hosts, command, verbose=verbose, timeout=timeout)
-            engines.append(result)
-        return engines
+            return run_remote(self.log, self._hosts, command, verbose=verbose, timeout=timeout)
+
+        # Each engine index is collected from all the hosts at once, so run the engines in parallel
+        with ThreadPoolExecutor(max_workers=engines_per_host) as executor:
+            return list(executor.map(_get_engine_metrics, range(engines_per_host)))
@@ -6,13 +6,72 @@
 SPDX-License-Identifier: BSD-2-Clause-Patent
 """
 # pylint: disable=too-many-lines
+import bisect
 import copy
+import csv
+import json
 import re
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from logging import getLogger
 
 from ClusterShell.NodeSet import NodeSet
 from exception_utils import CommandFailure
 
+# Maximum number of hosts queried for telemetry metrics at the same time
+MAX_QUERY_THREADS = 16
+
+
+def get_metric_sets(log, dmg, hosts, names, raise_exception=True, threads=MAX_QUERY_THREADS):
+    """Query the specified telemetry metrics from each host in parallel.
+
+    Each query uses its own copy of the dmg command, as running a command updates its parameters.
+
+    Args:
+        log (logger): logger for the messages produced by this method
+        dmg (DmgCommand): the DmgCommand object configured to communicate with the servers
+        hosts (NodeSet): set of servers from which to collect the telemetry metrics
+        names (str): Comma-separated list of metric names to query.
+        raise_exception (bool, optional): whether to raise the first query failure or only log
+            the failures. Defaults to True.
+        threads (int, optional): maximum number of hosts to query at the same time. Defaults to
+            MAX_QUERY_THREADS.
+
+    Raises:
+        CommandFailure: if a query fails and raise_exception is set
+
+    Returns:
+        dict: a dictionary of host keys linked to metric data for each metric name specified
+    """
+    info = {host: {} for host in hosts}
+    if not info:
+        return info
+
+    def _query(host):
+        return dmg.copy().telemetry_metrics_query(host=host, metrics=names)
+
+    with ThreadPoolExecutor(max_workers=min(threads, len(info))) as executor:
+        futures = {executor.submit(_query, host): host for host in info}
+        for future in as_completed(futures):
+            host = futures[future]
+            try:
+                data = future.result()
+            except CommandFailure as err:
+                if raise_exception:
+                    raise
+                log.error("Failed to get metrics for %s: %s", host, err)
+                continue
+            if "response" in data:
+                if "metric_sets" in data["response"]:
+                    for entry in data["response"]["metric_sets"]:
+                        info[host][entry["name"]] = {
+                            "description": entry["description"],
+                            "metrics": entry["metrics"]
+                        }
+    return info
+
 
 def _gen_stats_metrics(basename):
     """Return a list of stats metrics for a given basename."""
@@ -581,24 +640,9 @@ class TelemetryUtils():
                 metric name specified
 
         """
-        info = {}
         host_list = hosts or self.hosts
         self.log.info("Querying telemetry metric %s from %s", name, host_list)
-        for host in host_list:
-            info[host] = {}
-            try:
-                data = self.dmg.telemetry_metrics_query(host=host, metrics=name)
-            except CommandFailure as err:
-                self.log.error("Failed to get metrics for %s: %s", host, err)
-                continue
-            if "response" in data:
-                if "metric_sets" in data["response"]:
-                    for entry in data["response"]["metric_sets"]:
-                        info[host][entry["name"]] = {
-                            "description": entry["description"],
-                            "metrics": entry["metrics"]
-                        }
-        return info
+        return get_metric_sets(self.log, self.dmg, host_list, name, raise_exception=False)
 
     def get_container_metrics(self):
         """Get the container telemetry metrics.
@@ -1234,19 +1278,8 @@ class MetricData():
         Returns:
             dict: a dictionary of host keys linked to metric data for each metric name specified
         """
-        info = {}
         log.info('Querying telemetry metric %s from %s', names, hosts)
-        for host in hosts:
-            data = dmg.telemetry_metrics_query(host=host, metrics=names)
-            info[host] = {}
-            if 'response' in data:
-                if 'metric_sets' in data['response']:
-                    for entry in data['response']['metric_sets']:
-                        info[host][entry['name']] = {
-                            'description': entry['description'],
-                            'metrics': entry['metrics']
-                        }
-        return info
+        return get_metric_sets(log, dmg, hosts, names)
 
     def _get_data(self, names, info):
         """Get the telemetry metric data values.
@@ -1395,3 +1428,331 @@ class MetricData():
         if label not in compare[metric]:
             return label + f',check:{_validate_range(value, compare[metric])}'
         return label + f',check:{_validate_range(value, compare[metric][label])}'
+
+
+class TelemetryRecorder():
+    """Defines an object used to record telemetry metric samples as time series.
+
+    Each combination of a metric name and its labels is a series with an id, and the sample times
+    and values of each series are stored in array columns.  Histogram metrics are recorded as two
+    series, <metric>_sample_count and <metric>_sample_sum.
+    """
+
+    def __init__(self):
+        """Initialize a TelemetryRecorder object."""
+        self._ids = {}
+        self._metrics = []
+        self._labels = []
+        self._times = []
+        self._values = []
+
+    @property
+    def series_count(self):
+        """int: number of recorded series."""
+        return len(self._metrics)
+
+    def add(self, timestamp, data):
+        """Record a sample of telemetry metric data.
+
+        Args:
+            timestamp (float): time of the sample in seconds since the epoch
+            data (dict): dictionary of metric values keyed by the metric name and combination of
+                metric labels and values, as returned by MetricData.collect()
+        """
+        for metric, values in data.items():
+            for label_key, value in values.items():
+                if isinstance(value, dict):
+                    self._add_value(
+                        timestamp, f'{metric}_sample_count', label_key, value['sample_count'])
+                    self._add_value(
+                        timestamp, f'{metric}_sample_sum', label_key, value['sample_sum'])
+                else:
+                    self._add_value(timestamp, metric, label_key, value)
+
+    def _add_value(self, timestamp, metric, label_key, value):
+        """Record one value of a series, creating the series on its first value."""
+        series_id = self._ids.get((metric, label_key))
+        if series_id is None:
+            series_id = len(self._metrics)
+            self._ids[(metric, label_key)] = series_id
+            self._metrics.append(metric)
+            self._labels.append(label_key)
+            self._times.append(array('d'))
+            self._values.append(array('d'))
+        self._times[series_id].append(timestamp)
+        self._values[series_id].append(value)
+
+    def get_metrics(self):
+        """Get the names of the recorded metrics.
+
+        Returns:
+            list: sorted list of metric names
+        """
+        return sorted(set(self._metrics))
+
+    def get_ids(self, metric=None, labels=None):
+        """Get the ids of the recorded series.
+
+        Args:
+            metric (str, optional): only include the series of this metric. Defaults to None.
+            labels (dict, optional): only include the series with these label values, e.g.
+                {'host': 'server-1', 'rank': '0'}. Defaults to None.
+
+        Returns:
+            list: list of series ids
+        """
+        ids = []
+        for series_id, series_metric in enumerate(self._metrics):
+            if metric is not None and series_metric != metric:
+                continue
+            if labels:
+                series_labels = self.get_labels(series_id)
+                if any(series_labels.get(name) != str(value) for name, value in labels.items()):
+                    continue
+            ids.append(series_id)
+        return ids
+
+    def get_metric(self, series_id):
+        """Get the metric name of a series.
+
+        Args:
+            series_id (int): the series id
+
+        Returns:
+            str: the metric name
+        """
+        return self._metrics[series_id]
+
+    def get_labels(self, series_id):
+        """Get the labels of a series.
+
+        Args:
+            series_id (int): the series id
+
+        Returns:
+            dict: the label names and values
+        """
+        if not self._labels[series_id]:
+            return {}
+        return dict(entry.split(':', 1) for entry in self._labels[series_id].split(','))
+
+    def get_samples(self, series_id, start=None, end=None):
+        """Get the samples of a series within a time window.
+
+        Args:
+            series_id (int): the series id
+            start (float, optional): start time of the window. Defaults to None, the first sample.
+            end (float, optional): end time of the window. Defaults to None, the last sample.
+
+        Returns:
+            tuple: the arrays of the sample times and values within the window
+        """
+        times = self._times[series_id]
+        first = 0 if start is None else bisect.bisect_left(times, start)
+        last = len(times) if end is None else bisect.bisect_right(times, end)
+        return times[first:last], self._values[series_id][first:last]
+
+    def delta(self, series_id, start=None, end=None):
+        """Get the change of the value of a series within a time window.
+
+        Args:
+            series_id (int): the series id
+            start (float, optional): start time of the window. Defaults to None.
+            end (float, optional): end time of the window. Defaults to None.
+
+        Returns:
+            float: the last value minus the first value, 0 with less than two samples
+        """
+        _, values = self.get_samples(series_id, start, end)
+        if len(values) < 2:
+            return 0
+        return values[-1] - values[0]
+
+    def rate(self, series_id, start=None, end=None):
+        """Get the average rate of change of the value of a series within a time window.
+
+        Args:
+            series_id (int): the series id
+            start (float, optional): start time of the window. Defaults to None.
+            end (float, optional): end time of the window. Defaults to None.
+
+        Returns:
+            float: the change of the value per second, 0 with less than two samples
+        """
+        times, values = self.get_samples(series_id, start, end)
+        if len(values) < 2 or times[-1] == times[0]:
+            return 0
+        return (values[-1] - values[0]) / (times[-1] - times[0])
+
+    def percentile(self, series_id, percent, start=None, end=None):
+        """Get a percentile of the values of a series within a time window.
+
+        Args:
+            series_id (int): the series id
+            percent (float): the percentile, from 0 to 100
+            start (float, optional): start time of the window. Defaults to None.
+            end (float, optional): end time of the window. Defaults to None.
+
+        Returns:
+            float: the percentile, interpolated between the closest values, or None without samples
+        """
+        _, values = self.get_samples(series_id, start, end)
+        return _percentile(sorted(values), percent)
+
+    def summarize(self, metric, start=None, end=None, labels=None):
+        """Summarize all the series of a metric within a time window.
+
+        Args:
+            metric (str): the metric name
+            start (float, optional): start time of the window. Defaults to None.
+            end (float, optional): end time of the window. Defaults to None.
+            labels (dict, optional): only include the series with these label values. Defaults to
+                None.
+
+        Returns:
+            dict: the number of series, the sum of their deltas and rates, and the minimum, median,
+                99th percentile and maximum of their values
+        """
+        series_ids = self.get_ids(metric, labels)
+        values = []
+        for series_id in series_ids:
+            values.extend(self.get_samples(series_id, start, end)[1])
+        values.sort()
+        return {
+            'series': len(series_ids),
+            'delta': sum(self.delta(series_id, start, end) for series_id in series_ids),
+            'rate': sum(self.rate(series_id, start, end) for series_id in series_ids),
+            'min': _percentile(values, 0),
+            'p50': _percentile(values, 50),
+            'p99': _percentile(values, 99),
+            'max': _percentile(values, 100),
+        }
+
+    def write_csv(self, path):
+        """Write all the samples to a csv file with a time, metric, labels and value column.
+
+        Args:
+            path (str): the csv file to write
+        """
+        with open(path, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['time', 'metric', 'labels', 'value'])
+            for series_id, metric in enumerate(self._metrics):
+                for timestamp, value in zip(self._times[series_id], self._values[series_id]):
+                    writer.writerow([timestamp, metric, self._labels[series_id], value])
+
+    def read_samples(self, path):
+        """Record the samples of a json lines file written by a TelemetrySampler.
+
+        Args:
+            path (str): the json lines file to read
+        """
+        with open(path, 'r') as sample_file:
+            for line in sample_file:
+                sample = json.loads(line)
+                self.add(sample['time'], sample['metrics'])
+
+
+def _percentile(values, percent):
+    """Get a percentile of sorted values, interpolated between the closest values.
+
+    Args:
+        values (list): sorted list of values
+        percent (float): the percentile, from 0 to 100
+
+    Returns:
+        float: the percentile or None if there are no values
+    """
+    if not values:
+        return None
+    index = (len(values) - 1) * percent / 100
+    lower = int(index)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (index - lower)
+
+
+class TelemetrySampler():
+    """Defines an object used to periodically collect telemetry metric data in the background.
+
+    The samples are recorded in a TelemetryRecorder.
+
+    Example:
+        with TelemetrySampler(self.log, dmg, hosts, names, 10, path) as sampler:
+            <run the IOR or mdtest phase>
+        <use sampler.recorder>
+    """
+
+    def __init__(self, log, dmg, hosts, names, interval, path=None):
+        """Initialize a TelemetrySampler object.
+
+        Args:
+            log (logger): logger for the messages produced by this object
+            dmg (DmgCommand): the DmgCommand object configured to communicate with the servers
+            hosts (NodeSet): set of servers from which to collect the telemetry metrics
+            names (list): list of metric names
+            interval (float): number of seconds between the start of each sample
+            path (str, optional): file to which each sample is appended as a json line. Defaults
+                to None.
+        """
+        self.log = log
+        self._dmg = dmg
+        self._hosts = hosts
+        self._names = names
+        self._interval = interval
+        self._path = path
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.samples = 0
+        self.recorder = TelemetryRecorder()
+
+    def __enter__(self):
+        """Start sampling when entering the context."""
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        """Stop sampling when leaving the context."""
+        self.stop()
+
+    def start(self):
+        """Start collecting samples in a background thread."""
+        if self._thread is not None:
+            return
+        self.log.info(
+            "Sampling %d telemetry metrics from %s every %s seconds",
+            len(self._names), self._hosts, self._interval)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry_sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop collecting samples, after collecting a final sample."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self.log.info("Collected %d telemetry samples", self.samples)
+
+    def _run(self):
+        """Collect a sample every interval until stopped, and once more when stopped."""
+        while True:
+            start = time.time()
+            self._sample()
+            if self._stop_event.wait(max(0, self._interval - (time.time() - start))):
+                break
+        self._sample()
+
+    def _sample(self):
+        """Collect and save one sample of the telemetry metrics."""
+        timestamp = time.time()
+        try:
+            data = MetricData().collect(self.log, self._names, self._hosts, self._dmg)
+        except CommandFailure as error:
+            self.log.error("Failed to collect a telemetry sample: %s", error)
+            return
+        self.samples += 1
+        self.recorder.add(timestamp, data)
+        if self._path:
+            with open(self._path, "a") as sample_file:
+                sample_file.write(json.dumps({"time": timestamp, "metrics": data}) + "\n")
@@ -7,6 +7,7 @@ __all__ = [
     'dfs_sb',
     'explorer',
     'parse_csv',
+    'sweep',
     'vos_size',
     'vos_structures',
     'util']
@@ -5,13 +5,27 @@
 '''
 
 import copy
+import math
 import os
+import pickle  # nosec
+import random
 import sys
+import time
+from collections import deque
+from multiprocessing import Process, Queue
+from queue import Empty
 
 from storage_estimator.util import CommonBase, ObjectClass
 from storage_estimator.vos_structures import (AKey, Container, DKey, KeyType, Overhead, ValType,
                                               VosObject, VosValue)
 
+# Seconds to wait for the results of the scan workers before checking they are still running
+RESULTS_POLL_INTERVAL = 1
+
+
+class WorkerError(Exception):
+    pass
+
 
 class FileInfo():
     def __init__(self, size):
@@ -225,6 +239,20 @@ class DFS(CommonBase):
 
     def reset(self):
         self._objects = []
+        self._all_ec_stats = CellStats(self._verbose)
+
+    def get_layout(self):
+        return (self._oclass.get_dir_oclass(), self._oclass.get_file_oclass(),
+                self._io_size, self._chunk_size, self._ec_cell_size,
+                self._assume_aggregation)
+
+    def get_state(self):
+        return (self._objects, self._all_ec_stats)
+
+    def merge(self, state):
+        objects, ec_stats = state
+        self._objects.extend(objects)
+        self._all_ec_stats.add(ec_stats)
 
     def add_obj(self):
         oid = len(self._objects)
@@ -476,8 +504,173 @@ class DFS(CommonBase):
         file_object.add_value(dkey)
 
 
+def get_size_class(size, sub_classes_bits=2):
+    """Return the size class of size.
+
+    The size classes are the powers of two, each one split in
+    2^sub_classes_bits classes of the same width.
+    """
+    shift = max(size.bit_length() - sub_classes_bits - 1, 0)
+    return size >> shift << shift
+
+
+class HistogramDFS(DFS):
+    """DFS model keeping histograms of the files and directories.
+
+    Instead of one VOS object per file and per directory, the files are
+    bucketed by size class and the directories by number of entries.
+    One VOS object per bucket, with the number of files or directories
+    of the bucket as count, is created when the container is requested.
+    The size of the files, the names and the symbolic links of a bucket
+    are approximated by their average, so the memory used does not depend
+    on the number of files and directories.
+    """
+
+    def __init__(self, oclass):
+        super().__init__(oclass)
+        # size class: [number of files, total size]
+        self._files = {}
+        # entries class: [dirs, entries, symlinks, names size, symlinks size]
+        self._dirs = {}
+        self._dir = None
+        self._dirty = False
+
+    def reset(self):
+        super().reset()
+        self._files = {}
+        self._dirs = {}
+        self._dir = None
+        self._dirty = False
+
+    def copy(self):
+        self._build_objects()
+        return super().copy()
+
+    def get_container(self):
+        self._build_objects()
+        return super().get_container()
+
+    def show_stats(self):
+        self._build_objects()
+        super().show_stats()
+
+    def get_state(self):
+        self._close_dir()
+        return (self._files, self._dirs)
+
+    def merge(self, state):
+        files, dirs = state
+        for size_class, bucket in files.items():
+            self._add_to_bucket(self._files, size_class, bucket)
+        for entries_class, bucket in dirs.items():
+            self._add_to_bucket(self._dirs, entries_class, bucket)
+        self._dirty = True
+
+    def relayout(self, oclass, io_size, chunk_size, ec_cell_size):
+        """Return a copy of the histograms using another object layout"""
+        new_dfs = HistogramDFS(oclass)
+        new_dfs.set_verbose(self._verbose)
+        new_dfs.set_io_size(io_size)
+        new_dfs.set_chunk_size(chunk_size)
+        new_dfs.set_ec_cell_size(ec_cell_size)
+        new_dfs.set_assume_aggregation(self._assume_aggregation)
+        new_dfs._dkey0 = copy.deepcopy(self._dkey0)
+        new_dfs._dfs_inode_akey = copy.deepcopy(self._dfs_inode_akey)
+        new_dfs.merge(self.get_state())
+
+        return new_dfs
+
+    def create_dir_obj(self, identical_dirs=1):
+        self._close_dir()
+        self._dir = [identical_dirs, 0, 0, 0, 0]
+        self._dirty = True
+
+        return 0
+
+    def remove_obj(self, oid):
+        self._dir = None
+
+    def add_symlink(self, oid, name, link_size, dkey_count=1):
+        self._dir[1] += dkey_count
+        self._dir[2] += dkey_count
+        self._dir[3] += len(name.encode('utf-8')) * dkey_count
+        self._dir[4] += link_size * dkey_count
+
+    def _add_entry(self, oid, name, dkey_count=1):
+        self._dir[1] += dkey_count
+        self._dir[3] += len(name.encode('utf-8')) * dkey_count
+
+    def add_file(self, oid, name, file_size, dkey_count=1):
+        self._add_entry(oid, name, dkey_count)
+        if file_size == 0:
+            return
+        self._add_to_bucket(self._files, get_size_class(file_size),
+                            [dkey_count, file_size * dkey_count])
+
+    @staticmethod
+    def _add_to_bucket(buckets, key, values):
+        if key not in buckets:
+            buckets[key] = [0] * len(values)
+        bucket = buckets[key]
+        for idx, value in enumerate(values):
+            bucket[idx] += value
+
+    def _close_dir(self):
+        if self._dir is None:
+            return
+        self._add_to_bucket(self._dirs, get_size_class(self._dir[1]), self._dir)
+        self._dir = None
+
+    def _build_objects(self):
+        if not self._dirty:
+            return
+        self._close_dir()
+        self._objects = []
+        self._all_ec_stats = CellStats(self._verbose)
+
+        for entries_class in sorted(self._dirs):
+            self._build_dirs(*self._dirs[entries_class])
+
+        for size_class in sorted(self._files):
+            count, total_size = self._files[size_class]
+            self.create_file_obj(total_size // count, count)
+
+        self._dirty = False
+
+    def _build_dirs(self, dirs, entries, symlinks, names_size, symlinks_size):
+        """Create the directory objects of a bucket.
+
+        The entries and the symbolic links are spread as evenly as possible
+        over the directories, the total numbers of entries and symbolic links
+        are preserved.
+        """
+        if entries == 0:
+            return
+        avg_name = 'x' * (names_size // entries)
+        avg_symlink_size = symlinks_size // symlinks if symlinks else 0
+        entries_per_dir, extra_entries = divmod(entries, dirs)
+        symlinks_per_dir, extra_symlinks = divmod(symlinks, dirs)
+
+        # the extra symbolic links go first to the directories with an extra entry
+        both = min(extra_entries, extra_symlinks)
+        groups = [
+            (both, entries_per_dir + 1, symlinks_per_dir + 1),
+            (extra_entries - both, entries_per_dir + 1, symlinks_per_dir),
+            (extra_symlinks - both, entries_per_dir, symlinks_per_dir + 1),
+            (dirs - extra_entries - extra_symlinks + both, entries_per_dir, symlinks_per_dir)]
+
+        for count, dir_entries, dir_symlinks in groups:
+            if count == 0 or dir_entries == 0:
+                continue
+            oid = super().create_dir_obj(count)
+            if dir_entries > dir_symlinks:
+                super()._add_entry(oid, avg_name, dir_entries - dir_symlinks)
+            if dir_symlinks:
+                super().add_symlink(oid, avg_name, avg_symlink_size, dir_symlinks)
+
+
 class FileSystemExplorer(CommonBase):
-    def __init__(self, path, oclass):
+    def __init__(self, path, oclass, histogram=False):
         super().__init__()
         self._path = path
         self._queue = []
@@ -490,7 +683,23 @@ class FileSystemExplorer(CommonBase):
         self._name_size = 0
 
         self._oid = 0
-        self._dfs = DFS(oclass)
+        if histogram:
+            self._dfs = HistogramDFS(oclass)
+        else:
+            self._dfs = DFS(oclass)
+
+        self._workers = 1
+        self._checkpoint_file = None
+        self._checkpoint_interval = 60
+
+    def set_workers(self, workers):
+        self._check_positive_number(workers)
+        self._workers = workers
+
+    def set_checkpoint(self, file_name, interval=60):
+        self._check_positive_number(interval)
+        self._checkpoint_file = file_name
+        self._checkpoint_interval = interval
 
     def set_dfs_inode(self, akey):
         self._dfs.set_dfs_inode(akey)
@@ -514,7 +723,10 @@ class FileSystemExplorer(CommonBase):
     def explore(self):
         self._debug('processing path: {0}'.format(self._path))
         self._dfs.set_verbose(self._verbose)
-        self._traverse_directories()
+        if self._workers > 1 or self._checkpoint_file:
+            self._traverse_directories_parallel()
+        else:
+            self._traverse_directories()
 
     def print_stats(self):
         pretty_file_size = self._to_human(self._file_size)
@@ -553,12 +765,22 @@ class FileSystemExplorer(CommonBase):
 
     def get_dfs(self):
         self._debug('Gloabal Stripe Stats')
-        self._dfs._all_ec_stats.show()
+        self._dfs.show_stats()
 
         _ = self._dfs.get_container()
 
         return self._dfs
 
+    def get_dfs_layout(self, oclass, io_size, chunk_size, ec_cell_size):
+        if not isinstance(self._dfs, HistogramDFS):
+            raise ValueError('the object layout can only be changed with the histogram model')
+
+        dfs = self._dfs.relayout(oclass, io_size, chunk_size, ec_cell_size)
+
+        _ = dfs.get_container()
+
+        return dfs
+
     def _get_avg_file_name_size(self):
         total_items = self._count_files + self._count_dir + self._count_sym
         if total_items == 0:
@@ -734,14 +956,173 @@ class FileSystemExplorer(CommonBase):
     def _traverse_directories(self):
         self._reset_stats()
         self._dfs.reset()
+        self._queue = deque()
         self._enqueue_path(self._path)
 
         while self._queue:
-            file_path = self._queue.pop(0)
+            file_path = self._queue.popleft()
+            self._oid = self._dfs.create_dir_obj()
+            self._debug('entering {0}'.format(file_path))
+            self._read_directory(file_path)
+
+    def _scan_worker_fn(self, in_work, out_results):
+        """Read the directories received from in_work, one at a time.
+
+        For every directory, the worker emits the tuple
+        (path, subdirectories, stats, dfs_state) to out_results,
+        the main process merges the results and queues the subdirectories,
+        so idle workers pick up any pending directory.
+        """
+        while True:
+            file_path = in_work.get()
+            if file_path is None:
+                break
+
+            self._reset_stats()
+            self._dfs.reset()
+            self._queue = deque()
             self._oid = self._dfs.create_dir_obj()
             self._debug('entering {0}'.format(file_path))
             self._read_directory(file_path)
 
+            out_results.put((file_path, list(self._queue), self._get_stats(),
+                             self._dfs.get_state()))
+
+    def _traverse_directories_parallel(self):
+        self._reset_stats()
+        self._dfs.reset()
+        self._queue = deque()
+
+        work = Queue()
+        results = Queue()
+        procs = []
+        for _ in range(self._workers):
+            worker = Process(target=self._scan_worker_fn, args=(work, results))
+            worker.start()
+            procs.append(worker)
+
+        # directories handed over to the workers and not merged yet
+        in_flight = {}
+        try:
+            for file_path in self._load_checkpoint():
+                self._submit_path(work, in_flight, file_path)
+            self._merge_results(work, results, in_flight, procs)
+        except (KeyboardInterrupt, WorkerError):
+            if self._checkpoint_file:
+                self._save_checkpoint(in_flight)
+            raise
+        finally:
+            if in_flight:
+                for worker in procs:
+                    worker.terminate()
+            else:
+                for _ in procs:
+                    work.put(None)
+            for worker in procs:
+                worker.join()
+
+        if self._checkpoint_file:
+            self._save_checkpoint(in_flight)
+
+    def _merge_results(self, work, results, in_flight, procs):
+        last_checkpoint = time.monotonic()
+        while in_flight:
+            try:
+                (file_path, subdirs, stats, dfs_state) = results.get(
+                    timeout=RESULTS_POLL_INTERVAL)
+            except Empty:
+                self._check_workers(procs)
+                continue
+            self._merge_stats(stats)
+            self._dfs.merge(dfs_state)
+            self._complete_path(in_flight, file_path)
+            for subdir in subdirs:
+                self._submit_path(work, in_flight, subdir)
+
+            if self._checkpoint_file and \
+                    time.monotonic() - last_checkpoint > self._checkpoint_interval:
+                self._save_checkpoint(in_flight)
+                last_checkpoint = time.monotonic()
+
+    @staticmethod
+    def _check_workers(procs):
+        # A worker which died holds a directory whose results will never come
+        for worker in procs:
+            if not worker.is_alive():
+                raise WorkerError(
+                    'scan worker {0} exited with code {1}'.format(worker.pid, worker.exitcode))
+
+    @staticmethod
+    def _submit_path(work, in_flight, file_path):
+        in_flight[file_path] = in_flight.get(file_path, 0) + 1
+        work.put(file_path)
+
+    @staticmethod
+    def _complete_path(in_flight, file_path):
+        in_flight[file_path] -= 1
+        if in_flight[file_path] == 0:
+            del in_flight[file_path]
+
+    def _get_checkpoint_layout(self):
+        return (os.path.realpath(self._path),) + self._dfs.get_layout()
+
+    def _load_checkpoint(self):
+        """Restore the results of an interrupted scan.
+
+        Returns the list of directories left to read.
+        """
+        if not self._checkpoint_file or not os.path.exists(self._checkpoint_file):
+            return [os.path.realpath(self._path)]
+
+        self._debug('resuming from checkpoint {0}'.format(self._checkpoint_file))
+        with open(self._checkpoint_file, 'rb') as f:
+            checkpoint = pickle.load(f)  # nosec
+
+        if checkpoint['layout'] != self._get_checkpoint_layout():
+            raise ValueError(
+                'checkpoint {0} does not match the path and parameters of this scan'.format(
+                    self._checkpoint_file))
+
+        self._merge_stats(checkpoint['stats'])
+        self._dfs.merge(checkpoint['dfs'])
+        self._debug('{0} directories left to read'.format(len(checkpoint['pending'])))
+
+        return checkpoint['pending']
+
+    def _save_checkpoint(self, in_flight):
+        pending = [path for path, count in in_flight.items() for _ in range(count)]
+        checkpoint = {
+            'layout': self._get_checkpoint_layout(),
+            'pending': pending,
+            'stats': self._get_stats(),
+            'dfs': self._dfs.get_state()}
+
+        self._debug('saving checkpoint {0}, {1} directories left to read'.format(
+            self._checkpoint_file, len(pending)))
+        tmp_file = self._checkpoint_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(checkpoint, f)
+        os.replace(tmp_file, self._checkpoint_file)
+
+    def _get_stats(self):
+        return {
+            'count_files': self._count_files,
+            'count_dir': self._count_dir,
+            'count_sym': self._count_sym,
+            'count_error': self._count_error,
+            'file_size': self._file_size,
+            'sym_size': self._sym_size,
+            'name_size': self._name_size}
+
+    def _merge_stats(self, stats):
+        self._count_files += stats['count_files']
+        self._count_dir += stats['count_dir']
+        self._count_sym += stats['count_sym']
+        self._count_error += stats['count_error']
+        self._file_size += stats['file_size']
+        self._sym_size += stats['sym_size']
+        self._name_size += stats['name_size']
+
     def _reset_stats(self):
         self._oid = 0
         self._count_files = 0
@@ -751,3 +1132,309 @@ class FileSystemExplorer(CommonBase):
         self._file_size = 0
         self._sym_size = 0
         self._name_size = 0
+
+
+class ContainerExplorer(FileSystemExplorer):
+    """Explore a DAOS POSIX container instead of a local directory tree.
+
+    The directories are read with the parallel anchored readdir of the
+    pydaos.torch module, path is relative to the root of the container.
+    The readdir does not tell the symbolic links apart, so they are
+    accounted as files of the size of their target path.
+    """
+
+    def __init__(self, pool, cont, path, oclass, histogram=False):
+        super().__init__(path, oclass, histogram)
+        self._pool = pool
+        self._cont = cont
+        self._workers = 16
+
+    def set_checkpoint(self, file_name, interval=60):
+        raise ValueError('checkpoints are not supported when exploring a container')
+
+    def explore(self):
+        try:
+            from pydaos.torch.torch_api import _Dfs
+        except ImportError as err:
+            raise Exception(
+                'exploring a container requires the pydaos.torch module: {0}'.format(err)) from err
+
+        self._debug('processing {0}:{1} path: {2}'.format(self._pool, self._cont, self._path))
+        self._dfs.set_verbose(self._verbose)
+        self._reset_stats()
+        self._dfs.reset()
+
+        dfs = _Dfs(pool=self._pool, cont=self._cont)
+        try:
+            for file_path, dirs, files in dfs.parallel_walk(self._path, workers=self._workers):
+                self._debug('entering {0}'.format(file_path))
+                self._oid = self._dfs.create_dir_obj()
+                self._add_entries(dirs, files)
+        finally:
+            dfs.disconnect()
+
+    def _add_entries(self, dirs, files):
+        for name in dirs:
+            self._name_size += len(name.encode("utf-8"))
+            self._debug('directory: {0}'.format(name))
+            self._dfs.add_dir(self._oid, name)
+            self._count_dir += 1
+
+        for name, size in files:
+            self._name_size += len(name.encode("utf-8"))
+            self._debug('file:      {0}'.format(name))
+            self._dfs.add_file(self._oid, name, size)
+            self._file_size += size
+            self._count_files += 1
+
+        if not dirs and not files:
+            self._process_empty_dir()
+
+
+def get_confidence_interval(values, z_score=1.96):
+    """Return the mean of values and the half width of its confidence interval.
+
+    The default z_score gives the 95% confidence interval of the mean.
+    """
+    count = len(values)
+    mean = sum(values) / count
+    if count < 2:
+        return mean, 0
+
+    variance = sum((value - mean) ** 2 for value in values) / (count - 1)
+    return mean, z_score * math.sqrt(variance / count)
+
+
+class FileSystemSampler(CommonBase):
+    """Estimate the content of a directory tree from random walks.
+
+    Every walk starts at the root and descends into one randomly chosen
+    subdirectory per level, until it reaches a directory without
+    subdirectories. The counts of each directory of a walk are weighted by
+    the product of the number of subdirectories of its ancestors, so that
+    every walk is an unbiased estimate of the totals of the whole tree.
+    Only the sizes of max_entries files and symlinks per directory are read,
+    picked by reservoir sampling.
+    """
+
+    def __init__(self, path, oclass, samples, seed=None, max_entries=64):
+        super().__init__()
+        self._check_positive_number(samples)
+        self._check_positive_number(max_entries)
+        self._path = path
+        self._samples = samples
+        self._max_entries = max_entries
+        self._random = random.Random(seed)  # nosec
+        self._dfs = DFS(oclass)
+        self._dirs = {}
+        self._walks = []
+
+    def set_dfs_inode(self, akey):
+        self._dfs.set_dfs_inode(akey)
+
+    def set_io_size(self, io_size):
+        self._dfs.set_io_size(io_size)
+
+    def set_chunk_size(self, chunk_size):
+        self._dfs.set_chunk_size(chunk_size)
+
+    def set_ec_cell_size(self, ec_cell_size):
+        self._dfs.set_ec_cell_size(ec_cell_size)
+
+    def set_assume_aggregation(self, assume_aggregation):
+        self._dfs.set_assume_aggregation(assume_aggregation)
+
+    def explore(self):
+        self._debug('sampling path: {0}'.format(self._path))
+        self._dfs.set_verbose(self._verbose)
+        self._dirs = {}
+        self._walks = []
+        root = os.path.realpath(self._path)
+        for _ in range(self._samples):
+            self._walks.append(self._walk(root))
+        self._debug('{0} directories read'.format(len(self._dirs)))
+
+    def get_batches(self, max_batches=10):
+        """Split the walks in up to max_batches groups of the same size."""
+        num_batches = min(max_batches, len(self._walks))
+        return [list(range(batch, len(self._walks), num_batches))
+                for batch in range(num_batches)]
+
+    def get_estimate(self, walks=None):
+        """Return the average of the estimates of the given walks."""
+        if walks is None:
+            walks = range(len(self._walks))
+        walks = [self._walks[walk] for walk in walks]
+
+        estimate = self._new_estimate()
+        for walk in walks:
+            for key, value in walk.items():
+                if key == 'files':
+                    continue
+                estimate[key] += value / len(walks)
+            for size_class, (count, size) in walk['files'].items():
+                totals = estimate['files'].setdefault(size_class, [0, 0])
+                totals[0] += count / len(walks)
+                totals[1] += size / len(walks)
+
+        return estimate
+
+    def print_stats(self):
+        self._info('')
+        self._info('Estimate from {0} samples (95% confidence interval):'.format(
+            len(self._walks)))
+        self._info('')
+        for label, key in (('directories', 'count_dir'), ('files', 'count_files'),
+                           ('symlinks', 'count_sym'), ('errors', 'count_error')):
+            mean, error = get_confidence_interval([walk[key] for walk in self._walks])
+            self._info('  {0:<11} {1} +/- {2} count'.format(
+                label, int(round(mean)), int(round(error))))
+        for label, key in (('file size', 'file_size'), ('symlink size', 'sym_size'),
+                           ('name size', 'name_size')):
+            mean, error = get_confidence_interval([walk[key] for walk in self._walks])
+            self._info('  {0:<12} {1} +/- {2}'.format(
+                label, self._to_human(int(mean)), self._to_human(int(error))))
+        self._info('')
+
+    def get_dfs_average(self, walks=None):
+        """Build the average model of the tree extrapolated from the walks."""
+        estimate = self.get_estimate(walks)
+
+        averageFS = AverageFS(self._dfs.copy())
+        averageFS.set_verbose(self._verbose)
+        count_sym = int(round(estimate['count_sym']))
+        averageFS.set_total_symlinks(count_sym)
+        averageFS.set_avg_symlink_size(self._get_average(estimate['sym_size'], count_sym))
+        count_dir = int(round(estimate['count_dir']))
+        averageFS.set_total_directories(count_dir)
+        averageFS.set_avg_dir_name_size(
+            self._get_average(estimate['dir_name_size'], count_dir))
+        total_items = estimate['count_files'] + estimate['count_dir'] + estimate['count_sym']
+        averageFS.set_avg_name_size(self._get_average(estimate['name_size'], total_items))
+
+        for size_class in sorted(estimate['files']):
+            count, size = estimate['files'][size_class]
+            count_files = int(round(count))
+            if count_files == 0:
+                continue
+            avg_file_size = self._get_average(size, count)
+            self._debug('  assuming {0} files of {1} bytes'.format(count_files, avg_file_size))
+            averageFS.add_average_file(count_files, avg_file_size)
+
+        dfs = averageFS.get_dfs()
+
+        _ = dfs.get_container()
+
+        return dfs
+
+    @staticmethod
+    def _get_average(total, count):
+        if count == 0:
+            return 0
+        return int(round(total / count))
+
+    @staticmethod
+    def _new_estimate():
+        return {
+            'count_files': 0,
+            'count_dir': 0,
+            'count_sym': 0,
+            'count_error': 0,
+            'file_size': 0,
+            'sym_size': 0,
+            'name_size': 0,
+            'dir_name_size': 0,
+            'files': {}}
+
+    def _walk(self, root):
+        estimate = self._new_estimate()
+        file_path = root
+        weight = 1
+        while True:
+            summary = self._read_directory(file_path)
+            self._add_summary(estimate, summary, weight)
+            if not summary['subdirs']:
+                break
+            weight *= len(summary['subdirs'])
+            file_path = self._random.choice(summary['subdirs'])
+
+        return estimate
+
+    @staticmethod
+    def _add_summary(estimate, summary, weight):
+        estimate['count_dir'] += weight * len(summary['subdirs'])
+        estimate['count_files'] += weight * summary['count_files']
+        estimate['count_sym'] += weight * summary['count_sym']
+        estimate['count_error'] += weight * summary['count_error']
+        estimate['name_size'] += weight * summary['name_size']
+        estimate['dir_name_size'] += weight * summary['dir_name_size']
+
+        if summary['sym_sizes']:
+            scale = weight * summary['count_sym'] / len(summary['sym_sizes'])
+            estimate['sym_size'] += scale * sum(summary['sym_sizes'])
+
+        if summary['file_sizes']:
+            scale = weight * summary['count_files'] / len(summary['file_sizes'])
+            for size in summary['file_sizes']:
+                totals = estimate['files'].setdefault(get_size_class(size), [0, 0])
+                totals[0] += scale
+                totals[1] += scale * size
+                estimate['file_size'] += scale * size
+
+    def _read_directory(self, file_path):
+        if file_path in self._dirs:
+            return self._dirs[file_path]
+
+        self._debug('entering {0}'.format(file_path))
+        summary = {
+            'subdirs': [],
+            'count_files': 0,
+            'count_sym': 0,
+            'count_error': 0,
+            'name_size': 0,
+            'dir_name_size': 0,
+            'file_sizes': [],
+            'sym_sizes': []}
+        files = []
+        symlinks = []
+        try:
+            with os.scandir(file_path) as it:
+                for entry in it:
+                    name_size = len(entry.name.encode("utf-8"))
+                    if entry.is_symlink():
+                        summary['name_size'] += name_size
+                        summary['count_sym'] += 1
+                        self._reservoir_add(symlinks, entry, summary['count_sym'])
+                    elif entry.is_dir():
+                        summary['dir_name_size'] += name_size
+                        summary['subdirs'].append(os.path.realpath(entry.path))
+                    elif entry.is_file():
+                        summary['name_size'] += name_size
+                        summary['count_files'] += 1
+                        self._reservoir_add(files, entry, summary['count_files'])
+                    else:
+                        self._error(
+                            'found unknown object (skipped): {0}'.format(entry.name))
+
+            summary['file_sizes'] = [entry.stat(follow_symlinks=False).st_size
+                                     for entry in files]
+            summary['sym_sizes'] = [entry.stat(follow_symlinks=False).st_size
+                                    for entry in symlinks]
+        except OSError:
+            self._error('permission denied (skipped): {0}'.format(file_path))
+            summary['count_error'] += 1
+
+        # the dir name sizes are accounted in the common name size as well
+        summary['name_size'] += summary['dir_name_size']
+        self._dirs[file_path] = summary
+
+        return summary
+
+    def _reservoir_add(self, reservoir, entry, count):
+        if len(reservoir) < self._max_entries:
+            reservoir.append(entry)
+            return
+
+        index = self._random.randrange(count)
+        if index < self._max_entries:
+            reservoir[index] = entry
@@ -1,11 +1,19 @@
 '''
   (C) Copyright 2019-2023 Intel Corporation.
+  (C) Copyright 2025 Hewlett Packard Enterprise Development LP
 
   SPDX-License-Identifier: BSD-2-Clause-Patent
 '''
+import bz2
+import csv
+import gzip
+import hashlib
+import lzma
+import os
+from multiprocessing import Pool
 
 from storage_estimator.dfs_sb import get_dfs_inode_akey
-from storage_estimator.explorer import AverageFS
+from storage_estimator.explorer import AverageFS, FileSystemExplorer, get_size_class
 from storage_estimator.util import ProcessBase
 
 FILE_SIZES = ['4k', '64k', '128k', '256k', '512k', '768k', '1m', '8m', '64m',
@@ -18,11 +26,7 @@ class ProcessCSV(ProcessBase):
 
     def run(self):
         fse = self._ingest_csv()
-        config_yaml = self._get_yaml_from_dfs(fse)
-
-        yaml_str = self._dump_yaml(config_yaml)
-        self._create_file(self._args.output, yaml_str)
-        self._process_yaml(config_yaml)
+        self._process_dfs(fse.get_dfs())
 
     def _ingest_csv(self):
         """Parse csv and produce yaml input to vos_size.py"""
@@ -102,3 +106,290 @@ class ProcessCSV(ProcessBase):
                     afs.add_average_file(num_files, avg_file_size)
 
             return afs
+
+
+INVENTORY_TYPES = {
+    'f': 'file', 'file': 'file', 'regular': 'file', '-': 'file',
+    'd': 'dir', 'dir': 'dir', 'directory': 'dir',
+    'l': 'symlink', 'link': 'symlink', 'symlink': 'symlink'}
+
+# uncompressed inventories are split in ranges of this many bytes
+INVENTORY_RANGE_SIZE = 256 * 1024 * 1024
+
+
+def open_inventory(file_name):
+    """Open an inventory file, decompressing it according to its extension"""
+    if file_name.endswith('.gz'):
+        return gzip.open(file_name, 'rb')
+    if file_name.endswith('.bz2'):
+        return bz2.open(file_name, 'rb')
+    if file_name.endswith(('.xz', '.lzma')):
+        return lzma.open(file_name, 'rb')
+    return open(file_name, 'rb')
+
+
+def is_compressed_inventory(file_name):
+    return file_name.endswith(('.gz', '.bz2', '.xz', '.lzma'))
+
+
+def get_dir_key(path):
+    """Return the fixed size key of a directory path, so that the directory
+    tables do not keep the path strings"""
+    return hashlib.blake2b(path.encode('utf-8'), digest_size=16).digest()
+
+
+ROOT_DIR_KEY = get_dir_key('/')
+
+
+def _add_counters(counters, key, values):
+    if key not in counters:
+        counters[key] = [0] * len(values)
+    for idx, value in enumerate(values):
+        counters[key][idx] += value
+
+
+def _read_inventory_lines(inventory, start, end, skip_header):
+    if end is None:
+        if skip_header:
+            inventory.readline()
+        for line in inventory:
+            yield line.decode('utf-8', errors='replace')
+        return
+
+    # a range owns the lines starting in it
+    if start > 0:
+        inventory.seek(start - 1)
+        inventory.readline()
+    elif skip_header:
+        inventory.readline()
+    while inventory.tell() < end:
+        line = inventory.readline()
+        if not line:
+            break
+        yield line.decode('utf-8', errors='replace')
+
+
+def _add_dir(dirs, path):
+    """Return the entry of a directory, adding it and its missing ancestors"""
+    key = get_dir_key(path)
+    entry = dirs.get(key)
+    if entry is not None:
+        return entry
+    result = None
+    while True:
+        parent, _, name = path.rpartition('/')
+        parent = parent or '/'
+        entry = [0, 0, 0, 0, get_dir_key(parent), len(name.encode('utf-8'))]
+        dirs[key] = entry
+        if result is None:
+            result = entry
+        if path == '/':
+            return result
+        path = parent
+        key = entry[4]
+        if key in dirs:
+            return result
+
+
+def read_inventory_range(work):
+    """Aggregate the rows of an inventory file, or of a byte range of it.
+
+    work is (file name, start, end, fields, delimiter, skip header), end is
+    None to read the whole file. Return the file size histogram, the entries
+    of every directory holding a row and of its ancestors, the keys of the
+    directories listed by the inventory and the counters of
+    FileSystemExplorer. The rows are not kept, but every directory has an
+    entry keyed by get_dir_key(), so the memory is O(directories), whatever
+    the number of rows or the length of the paths.
+    """
+    file_name, start, end, fields, delimiter, skip_header = work
+    path_idx = fields.index('path')
+    size_idx = fields.index('size')
+    type_idx = fields.index('type') if 'type' in fields else None
+    min_fields = max(path_idx, size_idx, -1 if type_idx is None else type_idx) + 1
+
+    # size class: [number of files, total size]
+    files = {}
+    # directory key: [entries, symlinks, names size, symlinks size, parent key, name size]
+    dirs = {}
+    listed_dirs = set()
+    stats = {
+        'count_files': 0,
+        'count_dir': 0,
+        'count_sym': 0,
+        'count_error': 0,
+        'file_size': 0,
+        'sym_size': 0,
+        'name_size': 0}
+
+    with open_inventory(file_name) as inventory:
+        lines = _read_inventory_lines(inventory, start, end, skip_header)
+        for row in csv.reader(lines, delimiter=delimiter):
+            if not row:
+                continue
+            try:
+                if len(row) < min_fields:
+                    raise ValueError('missing fields')
+                path = row[path_idx].rstrip('/')
+                size = int(row[size_idx])
+                entry_type = 'file'
+                if type_idx is not None:
+                    entry_type = INVENTORY_TYPES[row[type_idx].strip().lower()]
+                if not row[path_idx] or size < 0:
+                    raise ValueError('invalid path or size')
+                if not path and entry_type != 'dir':
+                    raise ValueError('the root is not a directory')
+            except (KeyError, ValueError):
+                stats['count_error'] += 1
+                continue
+
+            if not path:
+                # the root directory is not an entry of any directory
+                _add_dir(dirs, '/')
+                continue
+
+            parent, _, name = path.rpartition('/')
+            name_size = len(name.encode('utf-8'))
+            entry = _add_dir(dirs, parent or '/')
+            entry[0] += 1
+            entry[2] += name_size
+            stats['name_size'] += name_size
+
+            if entry_type == 'dir':
+                listed_dirs.add(get_dir_key(path))
+                stats['count_dir'] += 1
+            elif entry_type == 'symlink':
+                entry[1] += 1
+                entry[3] += size
+                stats['count_sym'] += 1
+                stats['sym_size'] += size
+            else:
+                stats['count_files'] += 1
+                stats['file_size'] += size
+                if size > 0:
+                    bucket = files.setdefault(get_size_class(size), [0, 0])
+                    bucket[0] += 1
+                    bucket[1] += size
+
+    return files, dirs, listed_dirs, stats
+
+
+class InventoryExplorer(FileSystemExplorer):
+    """Build the histogram model from file system inventories.
+
+    An inventory is a CSV file, optionally compressed with gzip, bzip2 or
+    xz, with one row per path, such as the list policy output of a
+    parallel file system. The columns are named by the header of the
+    files, or by set_fields for files without header. The path and size
+    columns are required, without a type column every row is a file.
+    The files, and the byte ranges of the uncompressed files, are read by
+    a pool of worker processes. Directories missing from the inventory
+    are inferred from the paths of their entries.
+    """
+
+    def __init__(self, files, oclass):
+        super().__init__(None, oclass, histogram=True)
+        self._files = files
+        self._fields = None
+        self._delimiter = ','
+        self._range_size = INVENTORY_RANGE_SIZE
+
+    def set_checkpoint(self, file_name, interval=60):
+        raise ValueError('checkpoints are not supported when reading an inventory')
+
+    def set_fields(self, fields):
+        self._fields = [field.strip().lower() for field in fields]
+        self._check_fields(self._fields, 'the fields option')
+
+    def set_delimiter(self, delimiter):
+        self._delimiter = delimiter
+
+    def set_range_size(self, range_size):
+        self._check_positive_number(range_size)
+        self._range_size = range_size
+
+    def explore(self):
+        self._dfs.set_verbose(self._verbose)
+        self._reset_stats()
+        self._dfs.reset()
+
+        work = []
+        for file_name in self._files:
+            work.extend(self._get_work(file_name))
+
+        files = {}
+        dirs = {}
+        listed_dirs = set()
+        if self._workers > 1 and len(work) > 1:
+            with Pool(min(self._workers, len(work))) as pool:
+                results = pool.imap_unordered(read_inventory_range, work)
+                for result in results:
+                    self._merge_inventory(result, files, dirs, listed_dirs)
+        else:
+            for item in work:
+                self._merge_inventory(read_inventory_range(item), files, dirs, listed_dirs)
+
+        self._add_missing_dirs(dirs, listed_dirs)
+        self._dfs.merge((files, self._get_dirs_histogram(dirs)))
+
+    def _get_work(self, file_name):
+        self._debug('processing inventory: {0}'.format(file_name))
+        fields = self._fields
+        if fields is None:
+            with open_inventory(file_name) as inventory:
+                header = inventory.readline().decode('utf-8', errors='replace')
+            fields = [field.strip().lower()
+                      for field in next(csv.reader([header], delimiter=self._delimiter), [])]
+            self._check_fields(fields, 'the header of {0}'.format(file_name))
+        skip_header = self._fields is None
+
+        if is_compressed_inventory(file_name):
+            return [(file_name, 0, None, fields, self._delimiter, skip_header)]
+
+        file_size = os.path.getsize(file_name)
+        return [(file_name, start, min(start + self._range_size, file_size), fields,
+                 self._delimiter, skip_header)
+                for start in range(0, max(file_size, 1), self._range_size)]
+
+    @staticmethod
+    def _check_fields(fields, origin):
+        for field in ('path', 'size'):
+            if field not in fields:
+                raise ValueError('{0} has no "{1}" column'.format(origin, field))
+
+    def _merge_inventory(self, result, files, dirs, listed_dirs):
+        range_files, range_dirs, range_listed_dirs, stats = result
+        for size_class, bucket in range_files.items():
+            _add_counters(files, size_class, bucket)
+        for key, entry in range_dirs.items():
+            if key in dirs:
+                _add_counters(dirs, key, entry[:4])
+            else:
+                dirs[key] = entry
+        listed_dirs.update(range_listed_dirs)
+        self._merge_stats(stats)
+
+    def _add_missing_dirs(self, dirs, listed_dirs):
+        """Add the directories without row as entries of their parent.
+
+        The ancestors of every directory are in dirs, so the parent entry
+        always exists.
+        """
+        for key, entry in dirs.items():
+            if key in listed_dirs or key == ROOT_DIR_KEY:
+                continue
+            name_size = entry[5]
+            parent = dirs[entry[4]]
+            parent[0] += 1
+            parent[2] += name_size
+            self._count_dir += 1
+            self._name_size += name_size
+
+    @staticmethod
+    def _get_dirs_histogram(dirs):
+        """Return the directories histogram of HistogramDFS from the directory entries"""
+        histogram = {}
+        for entries, symlinks, names_size, symlinks_size, _, _ in dirs.values():
+            _add_counters(histogram, get_size_class(entries),
+                          [1, entries, symlinks, names_size, symlinks_size])
+        return histogram
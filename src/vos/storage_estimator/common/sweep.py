@@ -0,0 +1,237 @@
+'''
+  (C) Copyright 2025 Hewlett Packard Enterprise Development LP
+
+  SPDX-License-Identifier: BSD-2-Clause-Patent
+'''
+import argparse
+import bisect
+import csv
+import itertools
+import sys
+
+from storage_estimator.util import CommonBase, ObjectClass
+from storage_estimator.vos_size import AggregatedMetaOverhead, MetaOverhead
+
+LAYOUT_PARAMETERS = ('dir_oclass', 'file_oclass', 'io_size', 'chunk_size', 'ec_cell_size')
+POOL_PARAMETERS = ('num_shards', 'checksum')
+SWEEP_PARAMETERS = LAYOUT_PARAMETERS + POOL_PARAMETERS + ('scm_cutoff',)
+
+
+class ParameterSweep(CommonBase):
+    """Evaluate the SCM/NVMe totals of one model over a grid of parameters.
+
+    The model is only rebuilt once per combination of the layout parameters,
+    and the overheads are only calculated once per combination of the number
+    of shards and checksum. The SCM threshold only moves the values between
+    SCM and NVMe, so the totals of every threshold are derived from the
+    sorted value sizes of the model in a single pass.
+    """
+
+    def __init__(self, base, meta, fixed_layout=False, engine='aggregated'):
+        """base is a dict with the value of every parameter in SWEEP_PARAMETERS.
+
+        A checksum of None keeps the checksum of the model, with fixed_layout
+        the layout parameters can not be swept.
+        """
+        super().__init__()
+        self._base = base
+        self._meta = meta
+        self._fixed_layout = fixed_layout
+        self._engine = engine
+        self._parameters = {}
+
+    def add_parameter(self, name, values):
+        if name not in SWEEP_PARAMETERS:
+            raise ValueError(
+                'unknown sweep parameter "{0}", the supported parameters are {1}'.format(
+                    name, SWEEP_PARAMETERS))
+        if self._fixed_layout and name in LAYOUT_PARAMETERS:
+            raise ValueError(
+                'the {0} parameter can only be swept when exploring a file system '
+                'with the histogram option'.format(name))
+        if not values:
+            raise ValueError('no values given for the sweep parameter {0}'.format(name))
+
+        self._parameters[name] = [self._parse_value(name, value) for value in values]
+
+    def add_parameter_str(self, sweep_str):
+        """Add a parameter from a "name=value1,value2,..." string"""
+        name, sep, values = sweep_str.partition('=')
+        if not sep:
+            raise ValueError(
+                'invalid sweep "{0}", expected name=value1,value2,...'.format(sweep_str))
+        self.add_parameter(name.strip(), [value.strip() for value in values.split(',')])
+
+    def get_names(self):
+        return list(self._parameters)
+
+    def run(self, get_config):
+        """Return the totals of every valid combination of the parameters.
+
+        get_config(oclass, io_size, chunk_size, ec_cell_size) returns the
+        yaml model, as dumped by Containers, of the given layout.
+        """
+        results = []
+        for layout in self._get_grid(LAYOUT_PARAMETERS):
+            oclass = self._get_oclass(layout['dir_oclass'], layout['file_oclass'])
+            try:
+                self._check_layout(oclass, layout)
+            except ValueError as err:
+                self._error('skipping {0}: {1}'.format(self._get_label(layout), err))
+                continue
+
+            config_yaml = get_config(oclass, layout['io_size'], layout['chunk_size'],
+                                     layout['ec_cell_size'])
+            values = self._get_value_sizes(config_yaml)
+
+            for pool in self._get_grid(POOL_PARAMETERS):
+                pool.update(layout)
+                shards_required = 0
+                if not self._fixed_layout:
+                    shards_required = oclass.validate_number_of_shards(pool['num_shards'])
+                if shards_required > 0:
+                    self._error('skipping {0}: insufficient shards, wanted {1}'.format(
+                        self._get_label(pool), shards_required))
+                    continue
+
+                stats = self._calc_stats(config_yaml, pool)
+                for scm_cutoff in self._get_values('scm_cutoff'):
+                    nvme_total = self._get_nvme_total(values, scm_cutoff)
+                    result = dict(pool, scm_cutoff=scm_cutoff)
+                    result['scm_total'] = stats['total'] - nvme_total
+                    result['nvme_total'] = nvme_total
+                    result['total'] = stats['total']
+                    results.append(result)
+
+        return results
+
+    def write_csv(self, results, csv_file):
+        columns = self.get_names() + ['scm_total', 'nvme_total', 'total']
+        writer = csv.DictWriter(csv_file, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for result in results:
+            writer.writerow(result)
+
+    def print_table(self, results):
+        columns = self.get_names()
+        rows = [[str(result[name]) for name in columns]
+                + [self._to_human(result[name]) for name in ('scm_total', 'nvme_total', 'total')]
+                for result in results]
+        columns += ['scm_total', 'nvme_total', 'total']
+        widths = [max([len(column)] + [len(row[idx]) for row in rows])
+                  for idx, column in enumerate(columns)]
+
+        self._info('')
+        self._info('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+        for row in rows:
+            self._info('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+        self._info('')
+
+    def report(self, results, csv_name=None):
+        if csv_name == '-':
+            self.write_csv(results, sys.stdout)
+        elif csv_name:
+            self._debug('Output file: {0}'.format(csv_name))
+            with open(csv_name, 'w', newline='') as csv_file:
+                self.write_csv(results, csv_file)
+        else:
+            self.print_table(results)
+
+    def _parse_value(self, name, value):
+        if name in ('dir_oclass', 'file_oclass'):
+            supported = self._get_oclass('S1', 'SX').get_supported_oclass()
+            if value not in supported:
+                raise ValueError(
+                    'unknown object class "{0}", the supported objects are {1}'.format(
+                        value, supported))
+            return value
+        if name == 'checksum':
+            if value in ('none', None):
+                return 'none'
+            if value not in self._meta.get('csummers'):
+                raise ValueError(
+                    'unknown checksum algorithm "{0}", the supported checksum algorithms '
+                    'are {1}'.format(value, list(self._meta.get('csummers'))))
+            return value
+        if name == 'num_shards':
+            value = int(value)
+            self._check_positive_number(value)
+            return value
+        if name == 'scm_cutoff':
+            return self._from_human(str(value))
+
+        value = self._from_human(str(value))
+        self._check_positive_number(value)
+        return value
+
+    def _get_values(self, name):
+        return self._parameters.get(name, [self._base[name]])
+
+    def _get_grid(self, names):
+        for values in itertools.product(*[self._get_values(name) for name in names]):
+            yield dict(zip(names, values))
+
+    def _get_label(self, combination):
+        return ' '.join('{0}={1}'.format(name, combination[name])
+                        for name in self.get_names() if name in combination)
+
+    @staticmethod
+    def _get_oclass(dir_oclass, file_oclass):
+        return ObjectClass(argparse.Namespace(dir_oclass=dir_oclass, file_oclass=file_oclass,
+                                              verbose=False))
+
+    def _check_layout(self, oclass, layout):
+        if self._fixed_layout:
+            return
+        if layout['io_size'] > layout['chunk_size']:
+            raise ValueError('io_size must not be larger than chunk_size')
+        if layout['chunk_size'] % layout['io_size']:
+            raise ValueError('If chunk_size > io_size, it must be a multiple')
+        oclass.validate_ec_args(layout['chunk_size'], layout['io_size'],
+                                layout['ec_cell_size'])
+
+    def _calc_stats(self, config_yaml, pool):
+        if self._engine == 'tree':
+            overheads = MetaOverhead(None, pool['num_shards'], self._meta)
+        else:
+            overheads = AggregatedMetaOverhead(None, pool['num_shards'], self._meta)
+
+        for container in config_yaml.get('containers'):
+            if pool['checksum'] is not None:
+                container = dict(container,
+                                 csum_size=self._meta['csummers'].get(pool['checksum'], 0))
+            if not self._fixed_layout:
+                container = dict(container, csum_gran=pool['chunk_size'])
+            overheads.load_container(container)
+
+        return overheads.calc_stats().stats
+
+    @staticmethod
+    def _get_value_sizes(config_yaml):
+        """Return the sorted value sizes and the total bytes of the values larger or equal"""
+        values = {}
+        for cont in config_yaml.get('containers'):
+            cont_count = cont.get('count', 1)
+            for obj in cont.get('objects'):
+                obj_count = cont_count * obj.get('count', 1)
+                for dkey in obj.get('dkeys'):
+                    dkey_count = obj_count * dkey.get('count', 1)
+                    # The engines do not scale the value trees by the akey count,
+                    # so neither do we, otherwise the SCM total goes negative.
+                    for akey in dkey.get('akeys'):
+                        for value in akey.get('values'):
+                            size = value.get('size')
+                            values[size] = values.get(size, 0) + \
+                                dkey_count * value.get('count', 1) * size
+
+        sizes = sorted(values)
+        totals = [0] * (len(sizes) + 1)
+        for idx in range(len(sizes) - 1, -1, -1):
+            totals[idx] = totals[idx + 1] + values[sizes[idx]]
+
+        return sizes, totals
+
+    @staticmethod
+    def _get_nvme_total(values, scm_cutoff):
+        sizes, totals = values
+        return totals[bisect.bisect_left(sizes, scm_cutoff)]
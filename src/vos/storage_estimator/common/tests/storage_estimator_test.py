@@ -3,14 +3,19 @@
 
   SPDX-License-Identifier: BSD-2-Clause-Patent
 '''
+import gzip
 import os
+import random
 import unittest
 
 import pytest
 import yaml
-from storage_estimator.explorer import FileSystemExplorer
-from storage_estimator.parse_csv import ProcessCSV
+from storage_estimator.explorer import (ContainerExplorer, FileSystemExplorer, FileSystemSampler,
+                                        WorkerError)
+from storage_estimator.parse_csv import InventoryExplorer, ProcessCSV
+from storage_estimator.sweep import ParameterSweep
 from storage_estimator.util import ObjectClass
+from storage_estimator.vos_size import AggregatedMetaOverhead, MetaOverhead
 from storage_estimator.vos_structures import (AKey, Container, Containers, DKey, Overhead, ValType,
                                               VosObject, VosValue, VosValueError)
 
@@ -718,6 +723,182 @@ class FSTestCase(unittest.TestCase):
 
         assert got == want  # nosec
 
+    def _explore(self, args, workers=1, checkpoint=None, histogram=False, worker_fn=None):
+        oclass = ObjectClass(args)
+        fse = FileSystemExplorer(self.root_dir, oclass, histogram)
+        if worker_fn:
+            fse._scan_worker_fn = worker_fn
+        akey = self._create_inode_akey("DFS_INODE", 64)
+        fse.set_dfs_inode(akey)
+        fse.set_io_size(131072)
+        fse.set_chunk_size(1048576)
+        fse.set_workers(workers)
+        if checkpoint:
+            fse.set_checkpoint(checkpoint)
+        fse.explore()
+        container = fse.get_dfs().get_container()
+
+        return fse._get_stats(), self.test_data.process_stats(container.dump())
+
+    @pytest.mark.ut
+    def test_explore_parallel(self):
+        args = MockArgs("SX")
+        want = self._explore(args)
+        got = self._explore(args, workers=3)
+        assert want == got  # nosec
+
+    @pytest.mark.ut
+    def test_explore_checkpoint(self):
+        args = MockArgs("SX")
+        want = self._explore(args)
+        checkpoint = os.path.join(os.path.dirname(self.root_dir), "explore.ckpt")
+        got = self._explore(args, workers=2, checkpoint=checkpoint)
+        assert want == got  # nosec
+
+        # a completed scan is restored from its checkpoint without reading the tree
+        self.fg.clean()
+        got = self._explore(args, checkpoint=checkpoint)
+        assert want == got  # nosec
+        os.makedirs(self.root_dir)
+
+        with pytest.raises(ValueError, match="does not match"):
+            self._explore(MockArgs("RP_3GX"), checkpoint=checkpoint)
+
+    @pytest.mark.ut
+    def test_explore_worker_failure(self):
+        args = MockArgs("SX")
+        want = self._explore(args)
+        checkpoint = os.path.join(os.path.dirname(self.root_dir), "explore.ckpt")
+
+        def worker_fn(in_work, out_results):
+            in_work.get()
+            os._exit(1)
+
+        # the scan fails instead of waiting for the directory held by the dead worker
+        with pytest.raises(WorkerError, match="exited with code 1"):
+            self._explore(args, workers=2, checkpoint=checkpoint, worker_fn=worker_fn)
+
+        got = self._explore(args, workers=2, checkpoint=checkpoint)
+        os.unlink(checkpoint)
+        assert want == got  # nosec
+
+    @pytest.mark.ut
+    def test_explore_histogram(self):
+        for oclass in ["SX", "RP_3GX", "EC_16P2GX"]:
+            args = MockArgs(oclass)
+            want_fs, want = self._explore(args)
+            got_fs, got = self._explore(args, histogram=True)
+            assert want_fs == got_fs  # nosec
+
+            # names are approximated by their average size
+            del want["dkey_size"]
+            del got["dkey_size"]
+            assert want == got  # nosec
+
+            _, got_parallel = self._explore(args, workers=2, histogram=True)
+            del got_parallel["dkey_size"]
+            assert want == got_parallel  # nosec
+
+    @pytest.mark.ut
+    def test_explore_sample(self):
+        args = MockArgs("SX")
+        want, _ = self._explore(args)
+
+        sampler = FileSystemSampler(self.root_dir, ObjectClass(args), 20, seed=1)
+        sampler.explore()
+        walks = {}
+        for walk in sampler._walks:
+            assert walk["count_files"] == want["count_files"]  # nosec
+            walks[(walk["count_dir"], walk["count_sym"])] = walk
+
+        # the walk through data/deploy and the walk through specs
+        assert sorted(walks) == [(2, 0), (4, 2)]  # nosec
+        for key in ["count_dir", "count_sym", "file_size", "sym_size", "name_size"]:
+            got = (walks[(2, 0)][key] + walks[(4, 2)][key]) / 2
+            assert got == want[key]  # nosec
+
+        batches = sampler.get_batches(3)
+        assert sorted(sum(batches, [])) == list(range(20))  # nosec
+        container = sampler.get_dfs_average(batches[0]).get_container()
+        assert self.test_data.process_stats(container.dump())["objects"] > 0  # nosec
+
+    @pytest.mark.ut
+    def test_explore_container_entries(self):
+        args = MockArgs("SX")
+        want, _ = self._explore(args)
+        # the container readdir accounts the symbolic links as files
+        want["count_files"] += want.pop("count_sym")
+        want["file_size"] += want.pop("sym_size")
+
+        ce = ContainerExplorer("pool", "cont", "/", ObjectClass(args))
+        for path, dirs, files in os.walk(self.root_dir):
+            ce._oid = ce._dfs.create_dir_obj()
+            files = [(name, os.lstat(os.path.join(path, name)).st_size) for name in files]
+            ce._add_entries(dirs, files)
+        got = ce._get_stats()
+        del got["count_sym"]
+        del got["sym_size"]
+        assert want == got  # nosec
+
+    @pytest.mark.ut
+    def test_read_inventory(self):
+        for oclass in ["SX", "EC_16P2GX"]:
+            args = MockArgs(oclass)
+            want_fs, want = self._explore(args, histogram=True)
+            want_fs["count_error"] += 1
+
+            rows = []
+            for path, dirs, files in os.walk(self.root_dir):
+                for name in dirs + files:
+                    file_path = os.path.join(path, name)
+                    row_type = "l" if os.path.islink(file_path) else "d" if name in dirs else "f"
+                    rows.append("{0},{1},/{2}\n".format(
+                        os.lstat(file_path).st_size if row_type != "d" else 0, row_type,
+                        os.path.relpath(file_path, self.root_dir)))
+            # the missing directories are inferred from the paths
+            rows = [row for row in rows if not row.endswith((",/specs\n", ",/data/deploy\n"))]
+            inventory_dir = os.path.dirname(self.root_dir)
+            plain = os.path.join(inventory_dir, "inventory.csv")
+            with open(plain, "w") as csv_file:
+                csv_file.write("Size,Type,Path\n")
+                csv_file.writelines(rows[:3] + ["bad,f,/data/broken\n", "0,d,/\n"])
+            compressed = os.path.join(inventory_dir, "inventory.csv.gz")
+            with gzip.open(compressed, "wt") as csv_file:
+                csv_file.write("size,type,path\n")
+                csv_file.writelines(rows[3:])
+
+            inv = InventoryExplorer([plain, compressed], ObjectClass(args))
+            inv.set_dfs_inode(self._create_inode_akey("DFS_INODE", 64))
+            inv.set_io_size(131072)
+            inv.set_chunk_size(1048576)
+            inv.set_range_size(16)
+            inv.set_workers(2)
+            inv.explore()
+            got = self.test_data.process_stats(inv.get_dfs().get_container().dump())
+            assert want_fs == inv._get_stats()  # nosec
+            assert want == got  # nosec
+
+        with pytest.raises(ValueError, match="path"):
+            InventoryExplorer([plain], ObjectClass(args)).set_fields(["size", "type"])
+
+    @pytest.mark.ut
+    def test_explore_relayout(self):
+        oclass = ObjectClass(MockArgs("SX"))
+        fse = FileSystemExplorer(self.root_dir, oclass, histogram=True)
+        fse.set_dfs_inode(self._create_inode_akey("DFS_INODE", 64))
+        fse.set_io_size(131072)
+        fse.set_chunk_size(1048576)
+        fse.explore()
+
+        args = MockArgs("EC_16P2GX")
+        _, want = self._explore(args, histogram=True)
+        dfs = fse.get_dfs_layout(ObjectClass(args), 131072, 1048576, 65536)
+        assert self.test_data.process_stats(dfs.get_container().dump()) == want  # nosec
+
+        with pytest.raises(ValueError, match="histogram"):
+            FileSystemExplorer(self.root_dir, oclass).get_dfs_layout(
+                oclass, 131072, 1048576, 65536)
+
     @pytest.mark.sx
     def test_create_dfs_sx(self):
         args = MockArgs("SX")
@@ -780,5 +961,108 @@ class CSVTestCase(unittest.TestCase):
         self._create_dfs_for_read_csv(args, "test_data_big_16p2gx.yaml")
 
 
+class MetaOverheadTestCase(unittest.TestCase):
+    def setUp(self):
+        current_dir = os.path.dirname(__file__)
+        self.test_files = os.path.join(current_dir, "test_files")
+        meta_file = os.path.join(self.test_files, "vos_size.yaml")
+        self.meta = yaml.safe_load(open(meta_file, "r"))
+
+    def _calc_stats(self, engine, config, num_shards, seed=42, meta=None):
+        random.seed(seed)
+        overheads = engine(None, num_shards, meta or self.meta)
+        for container in config.get("containers"):
+            overheads.load_container(container)
+
+        return overheads.calc_stats().stats
+
+    def _check_engines(self, config, num_shards):
+        want = self._calc_stats(MetaOverhead, config, num_shards)
+        got = self._calc_stats(AggregatedMetaOverhead, config, num_shards)
+        assert want == got  # nosec
+
+    @pytest.mark.ut
+    def test_aggregated_engine(self):
+        for reference_file in ["test_data_sx.yaml", "test_data_3gx.yaml",
+                               "test_data_16p2gx.yaml", "test_data_big_sx.yaml",
+                               "test_data_big_3gx.yaml", "test_data_big_16p2gx.yaml"]:
+            test_file = os.path.join(self.test_files, reference_file)
+            config = yaml.safe_load(open(test_file, "r"))
+            for container in config.get("containers"):
+                container["count"] = 3
+                container["csum_size"] = 8
+            for num_shards in [1, 7, 16, 1000]:
+                self._check_engines(config, num_shards)
+
+    @pytest.mark.ut
+    def test_aggregated_engine_targets(self):
+        akey = {"count": 2, "type": "integer", "value_type": "array", "overhead": "user",
+                "values": [{"count": 8, "size": 131072}, {"count": 1, "size": 100}]}
+        dkeys = [{"count": count, "type": "hashed", "size": 5, "akeys": [akey]}
+                 for count in [0, 1, 3, 8, 21]]
+        objects = [{"count": 4, "targets": targets, "dkeys": dkeys}
+                   for targets in [0, 1, 2, 8, 20]]
+        config = {"containers": [{"count": 2, "csum_size": 4, "csum_gran": 4096,
+                                  "objects": objects}]}
+
+        # also covers objects spread over more targets than there are pools
+        for num_shards in [1, 3, 5, 16, 64]:
+            self._check_engines(config, num_shards)
+
+    @pytest.mark.ut
+    def test_sweep(self):
+        test_file = os.path.join(self.test_files, "test_data_big_sx.yaml")
+        config = yaml.safe_load(open(test_file, "r"))
+        base = {"dir_oclass": "S1", "file_oclass": "SX", "io_size": 1048576,
+                "chunk_size": 1048576, "ec_cell_size": 65536, "num_shards": 1,
+                "checksum": None, "scm_cutoff": 4096}
+        sweep = ParameterSweep(base, self.meta, fixed_layout=True)
+        sweep.add_parameter_str("num_shards=1,7")
+        sweep.add_parameter_str("checksum=none,crc64")
+        sweep.add_parameter("scm_cutoff", ["1", "4KiB", "1MiB"])
+        with pytest.raises(ValueError, match="histogram"):
+            sweep.add_parameter("chunk_size", ["2MiB"])
+
+        results = sweep.run(lambda *layout: config)
+        assert len(results) == 12  # nosec
+
+        for result in results:
+            meta = dict(self.meta, scm_cutoff=result["scm_cutoff"])
+            csum_size = self.meta["csummers"].get(result["checksum"], 0)
+            want_config = {"containers": [dict(container, csum_size=csum_size)
+                                          for container in config["containers"]]}
+            want = self._calc_stats(AggregatedMetaOverhead, want_config, result["num_shards"],
+                                    meta=meta)
+
+            assert result["nvme_total"] == want["nvme_total"]  # nosec
+            assert result["scm_total"] + result["nvme_total"] == result["total"]  # nosec
+            # the start pool of the objects is random with more than one pool
+            if result["num_shards"] == 1:
+                assert result["total"] == want["total"]  # nosec
+
+    @pytest.mark.ut
+    def test_sweep_akey_count(self):
+        akey = {"count": 2, "type": "integer", "value_type": "array", "overhead": "user",
+                "values": [{"count": 8, "size": 131072}, {"count": 1, "size": 100}]}
+        dkeys = [{"count": 3, "type": "hashed", "size": 5, "akeys": [akey]}]
+        config = {"containers": [{"count": 1, "objects": [{"count": 1, "dkeys": dkeys}]}]}
+        base = {"dir_oclass": "S1", "file_oclass": "SX", "io_size": 1048576,
+                "chunk_size": 1048576, "ec_cell_size": 65536, "num_shards": 1,
+                "checksum": None, "scm_cutoff": 4096}
+        sweep = ParameterSweep(base, self.meta, fixed_layout=True)
+        sweep.add_parameter("scm_cutoff", ["1", "4KiB", "1MiB"])
+
+        results = sweep.run(lambda *layout: config)
+        assert len(results) == 3  # nosec
+
+        for result in results:
+            meta = dict(self.meta, scm_cutoff=result["scm_cutoff"])
+            want = self._calc_stats(AggregatedMetaOverhead, config, 1, meta=meta)
+
+            assert result["nvme_total"] == want["nvme_total"]  # nosec
+            assert result["scm_total"] >= 0  # nosec
+            assert result["total"] == want["total"]  # nosec
+
+
 if __name__ == "__main__":
     unittest.main()
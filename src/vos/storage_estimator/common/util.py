@@ -9,9 +9,16 @@ import os
 
 import yaml
 from storage_estimator.dfs_sb import VOS_SIZE, get_dfs_sb_obj
-from storage_estimator.vos_size import MetaOverhead
+from storage_estimator.vos_size import AggregatedMetaOverhead, MetaOverhead
 from storage_estimator.vos_structures import Containers
 
+# use the libyaml bindings when available, they are several times faster
+try:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+
 
 class CommonBase():
     def __init__(self):
@@ -120,6 +127,12 @@ class ObjectClass(CommonBase):
         self._file_oclass = self._update_oclass(args, 'file_oclass', 'SX')
         self.set_verbose(args.verbose)
 
+    def get_dir_oclass(self):
+        return self._dir_oclass
+
+    def get_file_oclass(self):
+        return self._file_oclass
+
     def print_pretty_status(self):
         self._debug(
             '{0:<13}{1:<10}{2:<10}{3:<9}{4:<9}{5:<11}'.format(
@@ -311,17 +324,33 @@ class Common(CommonBase):
 
         return meta_str
 
+    def _create_yaml_file(self, file_name, config_yaml):
+        """Stream config_yaml to file_name, nothing is serialized without a file name"""
+        try:
+            if not file_name:
+                return
+
+            if not file_name.endswith('.yaml'):
+                file_name = file_name + '.yaml'
+
+            self._print_destination_file(file_name)
+            with open(file_name, 'w') as f:
+                yaml.dump(config_yaml, f, Dumper=SafeDumper, default_flow_style=False)
+
+        except OSError as err:
+            raise Exception(
+                'Failed to open file {0} {1}'.format(
+                    file_name, err))
+
     def _print_destination_file(self, file_name):
         file_name = os.path.normpath(file_name)
         self._debug('Output file: {0}'.format(file_name))
 
-    def _dump_yaml(self, yaml_str):
-        return yaml.safe_dump(yaml_str, default_flow_style=False)
-
     def _load_yaml_from_file(self, file_name):
         self._debug('loading yaml file {0}'.format(file_name))
         try:
-            data = yaml.safe_load(open(file_name, 'r'))
+            with open(file_name, 'r') as f:
+                data = yaml.load(f, Loader=SafeLoader)  # nosec
         except OSError as err:
             raise Exception(
                 'Failed to open file {0} {1}'.format(
@@ -330,10 +359,19 @@ class Common(CommonBase):
         return data
 
     def _process_yaml(self, config_yaml):
+        overheads = self._get_overheads(config_yaml)
+
+        self._debug('')
+        overheads.print_report()
+
+    def _get_overheads(self, config_yaml):
         num_shards = config_yaml.get('num_shards', 1)
         self._debug('using {0} vos pools'.format(num_shards))
 
-        overheads = MetaOverhead(self._args, num_shards, self._meta)
+        if 'engine' in self._args and self._args.engine == 'tree':
+            overheads = MetaOverhead(self._args, num_shards, self._meta)
+        else:
+            overheads = AggregatedMetaOverhead(self._args, num_shards, self._meta)
 
         if 'containers' not in config_yaml:
             raise Exception(
@@ -349,8 +387,7 @@ class Common(CommonBase):
         for container in config_yaml.get('containers'):
             overheads.load_container(container)
 
-        self._debug('')
-        overheads.print_report()
+        return overheads
 
 
 class ProcessBase(Common):
@@ -454,14 +491,30 @@ class ProcessBase(Common):
         self._ec_cell_size = ec_cell_size
         self._oclass.print_pretty_status()
 
-    def _get_yaml_from_dfs(self, fse, use_average=False):
+    def _get_sweep_base(self):
+        return {
+            'dir_oclass': self._oclass.get_dir_oclass(),
+            'file_oclass': self._oclass.get_file_oclass(),
+            'io_size': self._io_size,
+            'chunk_size': self._chunk_size,
+            'ec_cell_size': self._ec_cell_size,
+            'num_shards': self._num_shards,
+            'checksum': None,
+            'scm_cutoff': self._scm_cutoff}
+
+    def _process_dfs(self, dfs):
+        """Report the overheads of the dfs model
+
+        The overheads are calculated from the model payload directly, the
+        yaml output is only written when an output file is requested.
+        """
+        config_yaml = self._get_containers(dfs).dump()
+        self._create_yaml_file(self._args.output, config_yaml)
+        self._process_yaml(config_yaml)
+
+    def _get_containers(self, dfs):
         dfs_sb = get_dfs_sb_obj()
 
-        if use_average:
-            dfs = fse.get_dfs_average()
-        else:
-            dfs = fse.get_dfs()
-
         container = dfs.get_container()
         container.add_value(dfs_sb)
         container.set_csum_size(self._csum_size)
@@ -471,7 +524,7 @@ class ProcessBase(Common):
         containers.add_value(container)
         containers.set_num_shards(self._num_shards)
 
-        return containers.dump()
+        return containers
 
     def _print_summary(self, config_yaml):
         flat_container = {}
@@ -5,6 +5,7 @@
 '''
 import math
 import random
+from collections import Counter, defaultdict
 
 
 def convert(stat):
@@ -76,10 +77,10 @@ class Stats():
         self.stats["user_meta"] += count
         self.stats["total"] += count
 
-    def merge(self, child):
-        """add child stats to this object"""
+    def merge(self, child, multiplier=1):
+        """add child stats, optionally multiplied by a value, to this object"""
         for key in self.stats:
-            self.stats[key] += child.get(key)
+            self.stats[key] += child.get(key) * multiplier
 
     def get(self, key):
         """get a stat"""
@@ -288,20 +289,23 @@ class MetaOverhead():
                 return item["size"], item["size"], 1
         raise "Bug parsing dynamic tree order information!!!"
 
-    def calc_tree(self, stats, tree):
-        """calculate the totals"""
-        tree_stats = Stats()
-        key = tree["key"]
-        num_values = tree["count"]
+    def calc_overhead(self, key, num_values):
+        """calculate the tree nodes and records overhead of a tree"""
         record_size = self.meta["trees"][key]["record_msize"]
         leaf_size, int_size, tree_nodes = self.get_dynamic(key, num_values)
         rec_overhead = num_values * record_size
         if leaf_size != int_size and tree_nodes != 1:
             leafs = tree_nodes // 2
             ints = tree_nodes - leafs
-            overhead = leafs * leaf_size + ints * int_size + rec_overhead
-        else:
-            overhead = tree_nodes * leaf_size + rec_overhead
+            return leafs * leaf_size + ints * int_size + rec_overhead
+        return tree_nodes * leaf_size + rec_overhead
+
+    def calc_tree(self, stats, tree):
+        """calculate the totals"""
+        tree_stats = Stats()
+        key = tree["key"]
+        num_values = tree["count"]
+        overhead = self.calc_overhead(key, num_values)
         if key in ("akey", "single_value", "array"):
             # key refers to child tree
             parent = "akey"
@@ -322,8 +326,8 @@ class MetaOverhead():
         tree_stats.mult(tree["dup"])
         stats.merge(tree_stats)
 
-    def print_report(self):
-        """Calculate and pretty print a report"""
+    def calc_stats(self):
+        """Calculate the totals over all the pools"""
         stats = Stats()
 
         for pool in range(0, self.num_pools):
@@ -331,4 +335,195 @@ class MetaOverhead():
             stats.add_meta("container", int(self.meta.get("container")))
             self.calc_tree(stats, self.pools[pool])
 
-        stats.pretty_print()
+        return stats
+
+    def print_report(self):
+        """Calculate and pretty print a report"""
+        self.calc_stats().pretty_print()
+
+
+def freeze_spec(spec):
+    """Return a hashable representation of a yaml specification"""
+    if isinstance(spec, dict):
+        return tuple(sorted((key, freeze_spec(value)) for key, value in spec.items()))
+    if isinstance(spec, list):
+        return tuple(freeze_spec(value) for value in spec)
+    return spec
+
+
+class AggregatedMetaOverhead(MetaOverhead):
+    """Class for calculating overheads without instantiating the per pool trees
+
+    The per pool trees built by MetaOverhead only differ by the number of
+    dkeys of each object and the number of objects of each container landing
+    in a given pool.  Identical dkey subtrees are thus calculated once and
+    scaled by their total count, while the object and container tree nodes
+    are calculated once per distinct number of records, using the same
+    distribution of dkeys (and random start pool of each object) as
+    MetaOverhead.  The results are identical to the MetaOverhead ones.
+    """
+
+    def __init__(self, args, num_pools, meta_yaml):
+        """class for keeping track of aggregated overheads"""
+        super().__init__(args, num_pools, meta_yaml)
+        self.pools = None
+        self.num_conts = 0
+        self.conts = []
+        self._dkey_stats = {}
+
+    def init_container(self, cont_spec):
+        """Handle a container specification"""
+        if "objects" not in cont_spec:
+            raise RuntimeError("No objects in container spec %s" % cont_spec)
+
+        self.num_conts += int(cont_spec.get("count", 1))
+        cont = {"dup": int(cont_spec.get("count", 1)),
+                "csum_size": int(cont_spec.get("csum_size", 0)),
+                "csum_gran": int(cont_spec.get("csum_gran", 1048576)),
+                # objects per pool, stored as a difference array
+                "deltas": [0] * (self.num_pools + 1),
+                # number of dkey subtrees of a given kind
+                "dkeys": defaultdict(int),
+                # number of object trees with a given number of dkeys
+                "objects": defaultdict(int)}
+        self.conts.append(cont)
+
+        for obj_spec in cont_spec.get("objects"):
+            self.init_object(obj_spec)
+
+    def init_dkeys(self, oid, obj_spec, num_of_targets):
+        """Handle dkey specification"""
+        start_pool = random.randint(0, self.num_pools - 1)  # nosec
+        cont = self.conts[-1]
+        obj_count = int(obj_spec.get("count", 1))
+
+        full_total = 0
+        partials = []
+        for dkey_spec in obj_spec.get("dkeys"):
+            if "akeys" not in dkey_spec:
+                raise RuntimeError("No akeys in dkey spec %s" % dkey_spec)
+            check_key_type(dkey_spec)
+            dkey_count = int(dkey_spec.get("count", 1))
+            if dkey_count == 0:
+                continue
+            key = self._get_dkey_stats_key(cont, dkey_spec)
+            # every dkey lands exactly once in one of the pools
+            cont["dkeys"][key] += obj_count * dkey_count
+            full_total += dkey_count // num_of_targets
+            partial_count = dkey_count % num_of_targets
+            if partial_count:
+                partials.append(partial_count)
+
+        if full_total:
+            num_pools = num_of_targets
+        else:
+            num_pools = max(partials, default=0)
+        if num_pools == 0:
+            return
+
+        groups = self._get_dkeys_distribution(full_total, partials, num_pools)
+        if num_pools <= self.num_pools:
+            self._add_pool_range(cont, start_pool, num_pools, obj_count)
+            for count, pools in groups:
+                cont["objects"][count] += obj_count * pools
+            return
+
+        # more targets than pools, several shards of the object share a pool
+        obj_dkeys = [0] * self.num_pools
+        idx = 0
+        for count, pools in groups:
+            for _ in range(pools):
+                obj_dkeys[(idx + start_pool) % self.num_pools] += count
+                idx += 1
+        for pool_idx, count in enumerate(obj_dkeys):
+            if count:
+                self._add_pool_range(cont, pool_idx, 1, obj_count)
+                cont["objects"][count] += obj_count
+
+    @staticmethod
+    def _get_dkeys_distribution(full_total, partials, num_pools):
+        """Return the (number of dkeys, number of pools) groups of an object
+
+        The pool at offset idx from the start pool receives every full
+        distribution of dkeys plus one dkey of each dkey specification
+        with more than idx remaining dkeys.
+        """
+        groups = []
+        remaining = Counter(partials)
+        greater = len(partials)
+        prev = 0
+        for partial in sorted(remaining):
+            if partial > prev:
+                groups.append((full_total + greater, partial - prev))
+            greater -= remaining[partial]
+            prev = partial
+        if num_pools > prev:
+            groups.append((full_total, num_pools - prev))
+
+        return groups
+
+    def _add_pool_range(self, cont, start_pool, num_pools, count):
+        """Add count objects to num_pools consecutive pools"""
+        deltas = cont["deltas"]
+        end = start_pool + num_pools
+        deltas[start_pool] += count
+        if end <= self.num_pools:
+            deltas[end] -= count
+            return
+        deltas[self.num_pools] -= count
+        deltas[0] += count
+        deltas[end - self.num_pools] -= count
+
+    def _get_dkey_stats_key(self, cont, dkey_spec):
+        """Calculate the stats of a single dkey subtree, once per kind"""
+        key = (cont["csum_size"], cont["csum_gran"],
+               freeze_spec({k: v for k, v in dkey_spec.items() if k != "count"}))
+        if key in self._dkey_stats:
+            return key
+
+        dkey = {"dup": 1, "key": "akey", "count": 0, "trees": [],
+                "type": dkey_spec.get("type", "hashed"),
+                "size": int(dkey_spec.get("size", 0)),
+                "overhead": dkey_spec.get("overhead", "user")}
+        for akey_spec in dkey_spec.get("akeys"):
+            self.init_akey(cont, dkey, akey_spec)
+
+        stats = Stats()
+        self.csum_size = cont["csum_size"]
+        self.calc_tree(stats, dkey)
+        self._dkey_stats[key] = stats
+
+        return key
+
+    def _calc_container(self, cont):
+        """calculate the totals of a container over all the pools"""
+        stats = Stats()
+        for key, count in cont["dkeys"].items():
+            stats.merge(self._dkey_stats[key], count)
+
+        for num_dkeys, count in cont["objects"].items():
+            stats.add_meta("dkey", self.calc_overhead("dkey", num_dkeys) * count)
+
+        objects = Counter()
+        num_objects = 0
+        for delta in cont["deltas"][:self.num_pools]:
+            num_objects += delta
+            objects[num_objects] += 1
+        for num_objects, count in objects.items():
+            stats.add_meta("object", self.calc_overhead("object", num_objects) * count)
+
+        stats.mult(cont["dup"])
+        return stats
+
+    def calc_stats(self):
+        """Calculate the totals over all the pools"""
+        stats = Stats()
+
+        stats.add_meta("pool", int(self.meta.get("root")) * self.num_pools)
+        stats.add_meta("container", int(self.meta.get("container")) * self.num_pools)
+        stats.add_meta("container",
+                       self.calc_overhead("container", self.num_conts) * self.num_pools)
+        for cont in self.conts:
+            stats.merge(self._calc_container(cont))
+
+        return stats
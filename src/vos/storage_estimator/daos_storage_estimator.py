@@ -8,8 +8,10 @@ import argparse
 import sys
 
 from storage_estimator.dfs_sb import get_dfs_example, get_dfs_inode_akey, print_daos_version
-from storage_estimator.explorer import FileSystemExplorer
-from storage_estimator.parse_csv import ProcessCSV
+from storage_estimator.explorer import (ContainerExplorer, FileSystemExplorer, FileSystemSampler,
+                                        get_confidence_interval)
+from storage_estimator.parse_csv import InventoryExplorer, ProcessCSV
+from storage_estimator.sweep import ParameterSweep
 from storage_estimator.util import Common, ProcessBase
 
 tool_description = '''DAOS estimation tool
@@ -41,31 +43,120 @@ def create_dfs_example(args):
         sys.exit(-1)
 
 
+def get_sweep(args, meta, base, fixed_layout):
+    sweep = ParameterSweep(base, meta, fixed_layout, args.engine)
+    sweep.set_verbose(args.verbose)
+    for sweep_str in args.sweep:
+        sweep.add_parameter_str(sweep_str)
+
+    return sweep
+
+
 class ProcessFS(ProcessBase):
     def __init__(self, args):
         super().__init__(args)
 
     def run(self):
+        if args.sweep:
+            self._run_sweep()
+            return
+
+        if args.sample:
+            self._run_sample()
+            return
+
         fse = self._get_estimate_from_fs()
-        config_yaml = self._get_yaml_from_dfs(fse, args.average)
-        yaml_str = self._dump_yaml(config_yaml)
-        self._create_file(args.output, yaml_str)
-        self._process_yaml(config_yaml)
+        if args.average:
+            self._process_dfs(fse.get_dfs_average())
+        else:
+            self._process_dfs(fse.get_dfs())
 
     def _get_estimate_from_fs(self):
+        if args.average and args.histogram:
+            raise ValueError('the average and histogram options are mutually exclusive')
+
         inode_akey = get_dfs_inode_akey()
-        fse = FileSystemExplorer(args.path[0], self._oclass)
+        fse = self._create_explorer()
         fse.set_verbose(args.verbose)
         fse.set_io_size(self.get_io_size())
         fse.set_chunk_size(self.get_chunk_size())
         fse.set_ec_cell_size(self.get_ec_cell_size())
         fse.set_assume_aggregation(args.assume_aggregation)
         fse.set_dfs_inode(inode_akey)
+        fse.set_workers(args.workers)
+        if args.checkpoint:
+            fse.set_checkpoint(args.checkpoint, args.checkpoint_interval)
         fse.explore()
         fse.print_stats()
 
         return fse
 
+    def _create_explorer(self):
+        return FileSystemExplorer(args.path[0], self._oclass, args.histogram)
+
+    def _run_sweep(self):
+        if args.sample:
+            raise ValueError('the sweep and sample options are mutually exclusive')
+
+        sweep = get_sweep(args, self._meta, self._get_sweep_base(), not args.histogram)
+        fse = self._get_estimate_from_fs()
+
+        def get_config(oclass, io_size, chunk_size, ec_cell_size):
+            if args.histogram:
+                dfs = fse.get_dfs_layout(oclass, io_size, chunk_size, ec_cell_size)
+            elif args.average:
+                dfs = fse.get_dfs_average()
+            else:
+                dfs = fse.get_dfs()
+            return self._get_containers(dfs).dump()
+
+        sweep.report(sweep.run(get_config), args.sweep_csv)
+
+    def _run_sample(self):
+        sampler = self._get_sample_from_fs()
+        self._process_dfs(sampler.get_dfs_average())
+        self._print_confidence_intervals(sampler)
+
+    def _get_sample_from_fs(self):
+        if args.histogram or args.checkpoint:
+            raise ValueError(
+                'the sample option is mutually exclusive with the histogram and checkpoint options')
+
+        inode_akey = get_dfs_inode_akey()
+        sampler = FileSystemSampler(args.path[0], self._oclass, args.sample, args.seed)
+        sampler.set_verbose(args.verbose)
+        sampler.set_io_size(self.get_io_size())
+        sampler.set_chunk_size(self.get_chunk_size())
+        sampler.set_ec_cell_size(self.get_ec_cell_size())
+        sampler.set_assume_aggregation(args.assume_aggregation)
+        sampler.set_dfs_inode(inode_akey)
+        sampler.explore()
+        sampler.print_stats()
+
+        return sampler
+
+    def _print_confidence_intervals(self, sampler):
+        batches = sampler.get_batches()
+        if len(batches) < 2:
+            self._info('At least 2 samples are required to compute the confidence intervals')
+            return
+
+        scm_totals = []
+        nvme_totals = []
+        for walks in batches:
+            config_yaml = self._get_containers(sampler.get_dfs_average(walks)).dump()
+            stats = self._get_overheads(config_yaml).calc_stats().stats
+            scm_totals.append(stats['total'] - stats['nvme_total'])
+            nvme_totals.append(stats['nvme_total'])
+
+        self._info('')
+        self._info('95% confidence intervals over {0} batches of samples:'.format(len(batches)))
+        for label, totals in (('SCM', scm_totals), ('NVMe', nvme_totals)):
+            mean, error = get_confidence_interval(totals)
+            self._info('  {0:<5} {1} - {2}'.format(
+                label, self._to_human(int(max(mean - error, 0))),
+                self._to_human(int(mean + error))))
+
 
 def process_fs(args):
     try:
@@ -78,14 +169,75 @@ def process_fs(args):
         sys.exit(-1)
 
 
+class ProcessDFS(ProcessFS):
+    def __init__(self, args):
+        super().__init__(args)
+
+    def _create_explorer(self):
+        return ContainerExplorer(args.pool[0], args.cont[0], args.path, self._oclass,
+                                 args.histogram)
+
+
+def process_dfs(args):
+    try:
+        print_daos_version()
+        pdfs = ProcessDFS(args)
+        pdfs.run()
+
+    except Exception as err:
+        print('Error: {0}'.format(err))
+        sys.exit(-1)
+
+
+class ProcessInventory(ProcessFS):
+    def __init__(self, args):
+        super().__init__(args)
+
+    def _create_explorer(self):
+        fse = InventoryExplorer(args.inventory, self._oclass)
+        if args.fields:
+            fse.set_fields(args.fields.split(','))
+        fse.set_delimiter(args.delimiter)
+        fse.set_range_size(self._from_human(args.range_size))
+        return fse
+
+
+def process_inventory(args):
+    try:
+        print_daos_version()
+        pinv = ProcessInventory(args)
+        pinv.run()
+
+    except Exception as err:
+        print('Error: {0}'.format(err))
+        sys.exit(-1)
+
+
 class ProcessYAML(Common):
     def __init__(self, args):
         super().__init__(args)
 
     def run(self):
         config_yaml = self._load_yaml_from_file(args.config[0])
+        if args.sweep:
+            self._run_sweep(config_yaml)
+            return
+
         self._process_yaml(config_yaml)
 
+    def _run_sweep(self, config_yaml):
+        base = {
+            'dir_oclass': 'S1',
+            'file_oclass': 'SX',
+            'io_size': 1048576,
+            'chunk_size': 1048576,
+            'ec_cell_size': 65536,
+            'num_shards': config_yaml.get('num_shards', 1),
+            'checksum': None,
+            'scm_cutoff': self._meta.get('scm_cutoff', 4096)}
+        sweep = get_sweep(args, self._meta, base, True)
+        sweep.report(sweep.run(lambda *layout: config_yaml), args.sweep_csv)
+
 
 def process_yaml(args):
     try:
@@ -160,111 +312,208 @@ example.add_argument(
 example.set_defaults(func=create_dfs_example)
 
 
-# read the file system
-explore = subparsers.add_parser(
-    'explore_fs', help='Estimate the VOS overhead from a given tree directory',
-    formatter_class=MyFormatter)
-explore.add_argument(
-    'path',
+# options shared by all the estimating commands
+engine_options = argparse.ArgumentParser(add_help=False)
+engine_options.add_argument(
+    '-E',
+    '--engine',
     type=str,
-    nargs=1,
-    help='Path to the target directory',
-    default=None)
-explore.add_argument(
+    choices=['aggregated', 'tree'],
+    help='Calculation engine. "aggregated" computes the totals from the counts of identical\n'
+         + 'subtrees, "tree" instantiates the VOS trees of every pool (slower)',
+    default='aggregated')
+
+# options shared by the commands estimating from a file system tree
+estimate_options = argparse.ArgumentParser(add_help=False, parents=[engine_options])
+estimate_options.add_argument(
     '-v',
     '--verbose',
     action='store_true',
     help='Explain what is being done')
-explore.add_argument(
+estimate_options.add_argument(
     '-t',
     '--dir_oclass',
     type=str,
     help='Predefined object classes. It describes schema of data distribution & protection '
          + 'for directories.',
     default='S1')
-explore.add_argument(
+estimate_options.add_argument(
     '-r',
     '--file_oclass',
     type=str,
     help='Predefined object classes. It describes schema of data distribution & protection for '
          + 'files.',
     default='SX')
-explore.add_argument(
-    '-x',
-    '--average',
-    action='store_true',
-    help='Use average file size for estimation. (Faster)')
-explore.add_argument(
+estimate_options.add_argument(
     '-i',
     '--io_size',
     type=str,
     help='I/O size.',
     default='1MiB')
-explore.add_argument(
+estimate_options.add_argument(
     '-c',
     '--chunk_size',
     type=str,
     help='Array chunk size/stripe size for regular files.',
     default='1MiB')
-explore.add_argument(
+estimate_options.add_argument(
     '-e',
     '--ec_cell_size',
     type=str,
     help='EC cell size',
     default='64KiB')
-explore.add_argument(
+estimate_options.add_argument(
     '-A',
     '--assume_aggregation',
     action='store_true',
     help='Assume aggregation',
     default=False)
-explore.add_argument(
+estimate_options.add_argument(
     '-s',
     '--scm_cutoff',
     type=str,
     help='SCM threshold in bytes, optional suffixes KiB, MiB, ..., YiB',
     default='4KiB')
-explore.add_argument(
+estimate_options.add_argument(
     '-n',
     '--num_shards',
     type=int,
     help='Number of VOS Pools',
     default=1000)
-explore.add_argument('-a', '--alloc_overhead', type=int,
-                     help='Vos alloc overhead', default=0)
-explore.add_argument(
+estimate_options.add_argument('-a', '--alloc_overhead', type=int,
+                              help='Vos alloc overhead', default=0)
+estimate_options.add_argument(
     '-k',
     '--checksum',
     type=str,
     help='[optional] Checksum algorithm to be used crc16, crc32, crc64, sha1, sha256, sha512',
     default=None)
-explore.add_argument(
+estimate_options.add_argument(
     '-m',
     '--meta',
     metavar='META',
     help='[optional] Input metadata file',
     default=None)
-explore.add_argument(
+estimate_options.add_argument(
     '-o',
     '--output',
     dest='output',
     type=str,
     help='Output file name',
     default=None)
-explore.add_argument(
+estimate_options.add_argument(
     '-S',
     '--storage',
     dest='vospath',
     type=str,
     help='DAOS storage path',
     default=vos_path_default)
+estimate_options.add_argument(
+    '--sweep_csv',
+    type=str,
+    help='[optional] Write the totals of the sweep to this CSV file ("-" for stdout)\n'
+         + 'instead of printing a table',
+    default=None)
+
+# options shared by the commands walking a directory tree
+walk_options = argparse.ArgumentParser(add_help=False)
+walk_options.add_argument(
+    '-x',
+    '--average',
+    action='store_true',
+    help='Use average file size for estimation. (Faster)')
+walk_options.add_argument(
+    '-H',
+    '--histogram',
+    action='store_true',
+    help='Bucket files by size class and directories by number of entries instead of\n'
+         + 'creating one object per file and directory. (Constant memory)')
+walk_options.add_argument(
+    '--sweep',
+    type=str,
+    action='append',
+    help='[optional] Evaluate the estimate for every combination of the given values,\n'
+         + 'as NAME=VALUE1,VALUE2,... The option can be repeated. NAME is one of\n'
+         + 'num_shards, checksum, scm_cutoff and, with -H, dir_oclass, file_oclass,\n'
+         + 'io_size, chunk_size, ec_cell_size',
+    default=None)
+
+# read the file system
+explore = subparsers.add_parser(
+    'explore_fs', help='Estimate the VOS overhead from a given tree directory',
+    parents=[estimate_options, walk_options], formatter_class=MyFormatter)
+explore.add_argument(
+    'path',
+    type=str,
+    nargs=1,
+    help='Path to the target directory',
+    default=None)
+explore.add_argument(
+    '-w',
+    '--workers',
+    type=int,
+    help='Number of processes reading the directories in parallel',
+    default=1)
+explore.add_argument(
+    '--checkpoint',
+    type=str,
+    help='[optional] File used to save the progress of the scan. If the file exists,\n'
+         + 'the scan resumes from it',
+    default=None)
+explore.add_argument(
+    '--checkpoint_interval',
+    type=int,
+    help='Number of seconds between the checkpoints',
+    default=60)
+explore.add_argument(
+    '--sample',
+    type=int,
+    help='[optional] Number of random walks from the root directory. Only the directories\n'
+         + 'of the walks are read, and the tree is extrapolated from them',
+    default=0)
+explore.add_argument(
+    '--seed',
+    type=int,
+    help='[optional] Seed of the random walks',
+    default=None)
 
 explore.set_defaults(func=process_fs)
 
+# read a DAOS POSIX container
+explore_dfs = subparsers.add_parser(
+    'explore_dfs', help='Estimate the VOS overhead from an existing DAOS POSIX container',
+    parents=[estimate_options, walk_options], formatter_class=MyFormatter)
+explore_dfs.add_argument(
+    'pool',
+    type=str,
+    nargs=1,
+    help='Pool label or UUID',
+    default=None)
+explore_dfs.add_argument(
+    'cont',
+    type=str,
+    nargs=1,
+    help='Container label or UUID',
+    default=None)
+explore_dfs.add_argument(
+    '-p',
+    '--path',
+    type=str,
+    help='Path of the directory to explore, relative to the root of the container',
+    default='/')
+explore_dfs.add_argument(
+    '-w',
+    '--workers',
+    type=int,
+    help='Number of processes reading the directories in parallel',
+    default=16)
+
+explore_dfs.set_defaults(func=process_dfs, sample=0, checkpoint=None)
+
 # parse a yaml file
 yaml_file = subparsers.add_parser(
     'read_yaml', help='Estimate the VOS overhead from a given YAML file',
-    formatter_class=MyFormatter)
+    parents=[engine_options], formatter_class=MyFormatter)
 yaml_file.add_argument(
     '-v',
     '--verbose',
@@ -293,12 +542,72 @@ yaml_file.add_argument(
     type=str,
     help='DAOS storage path',
     default=vos_path_default)
+yaml_file.add_argument(
+    '--sweep',
+    type=str,
+    action='append',
+    help='[optional] Evaluate the estimate for every combination of the given values,\n'
+         + 'as NAME=VALUE1,VALUE2,... The option can be repeated. NAME is one of\n'
+         + 'num_shards, checksum, scm_cutoff',
+    default=None)
+yaml_file.add_argument(
+    '--sweep_csv',
+    type=str,
+    help='[optional] Write the totals of the sweep to this CSV file ("-" for stdout)\n'
+         + 'instead of printing a table',
+    default=None)
 yaml_file.set_defaults(func=process_yaml)
 
+# read file system inventories
+inventory = subparsers.add_parser(
+    'read_inventory',
+    help='Estimate the VOS overhead from file system inventories, one CSV row per path',
+    parents=[estimate_options], formatter_class=MyFormatter)
+inventory.add_argument(
+    'inventory',
+    metavar='INVENTORY',
+    type=str,
+    nargs='+',
+    help='Input CSV files, optionally compressed with gzip (.gz), bzip2 (.bz2) or xz (.xz)')
+inventory.add_argument(
+    '--fields',
+    type=str,
+    help='[optional] Comma separated names of the columns of inventories without header,\n'
+         + 'the path and size columns are required, type is one of f, d or l',
+    default=None)
+inventory.add_argument(
+    '--delimiter',
+    type=str,
+    help='Field delimiter',
+    default=',')
+inventory.add_argument(
+    '--range_size',
+    type=str,
+    help='Size of the ranges of the uncompressed inventories read by each worker',
+    default='256MiB')
+inventory.add_argument(
+    '-w',
+    '--workers',
+    type=int,
+    help='Number of processes reading the inventories in parallel',
+    default=1)
+inventory.add_argument(
+    '--sweep',
+    type=str,
+    action='append',
+    help='[optional] Evaluate the estimate for every combination of the given values,\n'
+         + 'as NAME=VALUE1,VALUE2,... The option can be repeated. NAME is one of\n'
+         + 'num_shards, checksum, scm_cutoff, dir_oclass, file_oclass, io_size,\n'
+         + 'chunk_size, ec_cell_size',
+    default=None)
+
+inventory.set_defaults(func=process_inventory, sample=0, checkpoint=None, histogram=True,
+                       average=False)
+
 # parse a csv file
 csv_file = subparsers.add_parser(
     'read_csv', help='Estimate the VOS overhead from a given CSV file',
-    formatter_class=MyFormatter)
+    parents=[engine_options], formatter_class=MyFormatter)
 csv_file.add_argument(
     'csv',
     metavar='CSV',
@@ -18,11 +18,15 @@ the client with fault injection of D_ALLOC() usage.
 # pylint: disable=too-many-lines
 
 import argparse
+import concurrent.futures
+import contextlib
 import copy
 import errno
 import functools
 import importlib
+import io
 import json
+import multiprocessing
 import os
 import pickle  # nosec
 import pprint
@@ -30,6 +34,7 @@ import pwd
 import random
 import re
 import resource
+import selectors
 import shutil
 import signal
 import stat
@@ -125,6 +130,7 @@ class NLTConf():
             os.makedirs(self.tmp_dir)
 
         self._compress_procs = []
+        self._log_checks = None
 
     def __del__(self):
         self.flush_bz2()
@@ -149,18 +155,38 @@ class NLTConf():
                 size *= (1024 * 1024 * 1024)
             self.max_log_size = int(size)
 
+    def start_log_checks(self):
+        """Start the log check service if enabled, once the log tracing code is loaded"""
+        if getattr(self.args, 'log_check_jobs', 0) > 0 and self._log_checks is None:
+            self._log_checks = LogCheckService(self, self.args.log_check_jobs)
+
+    def stop_log_checks(self):
+        """Wait for the log checks of all threads, and stop the log check service"""
+        if self._log_checks is not None:
+            try:
+                self._log_checks.join(all_threads=True)
+            finally:
+                self._log_checks.close()
+                self._log_checks = None
+
     def __getitem__(self, key):
         return self._bc[key]
 
     def compress_file(self, filename):
         """Compress a file using bz2 for space reasons
 
-        Launch a bzip2 process in the background as this is time consuming, and each time
-        a new process is launched then reap any previous ones which have completed.
+        Launch a compression process in the background as this is time consuming, and each time
+        a new process is launched then reap any previous ones which have completed.  Once the log
+        tools are loaded cart_logindex writes the file with a block table, so that reading the log
+        of one pid back only decompresses the blocks containing its lines.
         """
+        if nlt_li is None:
+            cmd = ['bzip2', '--best', filename]
+        else:
+            cmd = [sys.executable, nlt_li.__file__, '--compress', filename]
         # pylint: disable=consider-using-with
         self._compress_procs[:] = (proc for proc in self._compress_procs if proc.poll() is None)
-        self._compress_procs.append(subprocess.Popen(['nice', '-19', 'bzip2', '--best', filename]))
+        self._compress_procs.append(subprocess.Popen(['nice', '-19'] + cmd))
 
     def flush_bz2(self):
         """Wait for all bzip2 subprocess to finish"""
@@ -170,6 +196,149 @@ class NLTConf():
         self._compress_procs = []
         self.compress_timer.stop()
 
+    def check_log(self, filename, **kwargs):
+        """Run log_test on a file, in the background if the log check service is enabled
+
+        Any error from a background check is raised by join_log_checks() so callers which need
+        the result of log_test should call it directly.
+        """
+        if self._log_checks is None:
+            log_test(self, filename, **kwargs)
+        else:
+            self._log_checks.submit(filename, **kwargs)
+
+    def join_log_checks(self, all_threads=False):
+        """Wait for the background log checks started by this thread, or by all threads"""
+        if self._log_checks is not None:
+            self._log_checks.join(all_threads)
+
+
+class LogCheckService():
+    """Run log_test in worker processes so tests can continue while earlier logs are checked
+
+    The workers are forked once the log tracing code is loaded, before the tests start any
+    threads.  A worker cannot report to the WarningsFactory objects or code usage tracer of
+    the parent so it records the calls made to them, and these are repeated by the thread that
+    joins the check, along with printing its output.  Issues are reported once per run, so those
+    already reported by an earlier check are skipped.  Checks are tracked per submitting thread
+    so that each test can wait for its own logs before its verdict.  The log file is compressed
+    as soon as its check completes.
+    """
+
+    def __init__(self, conf, workers):
+        self._conf = conf
+        self._lock = threading.Lock()
+        self._pending = {}
+        # pylint: disable-next=consider-using-with
+        self._pool = multiprocessing.get_context('fork').Pool(workers)
+
+    def submit(self, filename, **kwargs):
+        """Queue a log file to be checked"""
+        leak_wf = kwargs.pop('leak_wf', None)
+        result = self._pool.apply_async(
+            _log_check_worker, (self._conf.max_log_size, filename, leak_wf is not None, kwargs),
+            callback=self._compress)
+        with self._lock:
+            self._pending.setdefault(threading.get_ident(), []).append((result, leak_wf))
+        return result
+
+    def _compress(self, result):
+        """Compress the log files of a check once it completes"""
+        for filename in result[4]:
+            self._conf.compress_file(filename)
+
+    def join(self, all_threads=False):
+        """Wait for the queued checks, printing their output and raising the first error"""
+        with self._lock:
+            if all_threads:
+                results = [result for pending in self._pending.values() for result in pending]
+                self._pending = {}
+            else:
+                results = self._pending.pop(threading.get_ident(), [])
+        to_raise = None
+        for (result, leak_wf) in results:
+            (output, shown, error, calls, _, usage, log_time) = result.get()
+            # Skip the issues already reported by an earlier check, as log_test does.
+            targets = {'wf': self._conf.wf, 'leak_wf': leak_wf}
+            for (target, method, args, kwargs, log) in calls:
+                if log not in nlt_lt.shown_logs:
+                    getattr(targets[target], method)(*args, **kwargs)
+            nlt_lt.replay_output(output, shown)
+            nlt_ct.merge(usage)
+            self._conf.log_timer.total += log_time
+            if error is not None and to_raise is None:
+                to_raise = error
+        if to_raise:
+            raise to_raise
+
+    def close(self):
+        """Stop the worker processes"""
+        self._pool.close()
+        self._pool.join()
+
+
+class WarningsRecorder():
+    """Record the calls made to a WarningsFactory by a log check worker"""
+
+    def __init__(self, calls, target):
+        self._calls = calls
+        self._target = target
+
+    def add(self, line, sev, message, **kwargs):
+        """Record a call to WarningsFactory.add(), with the issue as show_line() prints it"""
+        self._calls.append((self._target, 'add', (line, sev, message), kwargs,
+                            nlt_lt.format_line(line, sev, message)))
+
+    def add_test_case(self, *args, **kwargs):
+        """Record a call to WarningsFactory.add_test_case()"""
+        self._calls.append((self._target, 'add_test_case', args, kwargs, None))
+
+    def reset_pending(self):
+        """Record a call to WarningsFactory.reset_pending()"""
+        self._calls.append((self._target, 'reset_pending', (), {}, None))
+
+
+class LogCheckConf():
+    # pylint: disable=too-few-public-methods
+    """The parts of NLTConf used by log_test, in a log check worker"""
+
+    def __init__(self, max_log_size, wf):
+        self.max_log_size = max_log_size
+        self.wf = wf
+        self.log_timer = CulmTimer()
+        self.compress = []
+
+    def compress_file(self, filename):
+        """Record a file for the parent to compress"""
+        self.compress.append(filename)
+
+
+def _log_check_worker(max_log_size, filename, leak_check, kwargs):
+    """Run log_test in a worker process of LogCheckService
+
+    Returns the output of the check with the issues it reported, its error, the calls made to
+    the WarningsFactory objects, the files to compress, the code usage seen and the time taken.
+    """
+    global nlt_ct  # pylint: disable=invalid-name
+
+    calls = []
+    conf = LogCheckConf(max_log_size, WarningsRecorder(calls, 'wf'))
+    if nlt_lt.wf is not None:
+        nlt_lt.wf = conf.wf
+    if leak_check:
+        kwargs['leak_wf'] = WarningsRecorder(calls, 'leak_wf')
+    nlt_ct = type(nlt_ct)()
+    nlt_lt.shown_logs.clear()
+
+    error = None
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        try:
+            log_test(conf, filename, **kwargs)
+        except Exception as err:  # pylint: disable=broad-except
+            error = err
+    return (output.getvalue(), set(nlt_lt.shown_logs), error, calls, conf.compress, nlt_ct,
+            conf.log_timer.total)
+
 
 class CulmTimer():
     """Class to keep track of elapsed time so we know where to focus performance tuning"""
@@ -957,7 +1126,7 @@ class DaosServer():
         self.conf.compress_file(self.control_log.name)
 
         for log in self.server_logs:
-            log_test(self.conf, log.name, leak_wf=wf, skip_fi=self._fi)
+            self.conf.check_log(log.name, leak_wf=wf, skip_fi=self._fi)
             self.server_logs.remove(log)
         self.running = False
         return ret
@@ -1232,7 +1401,7 @@ class DaosServer():
                                     check=False)
                 print(rc)
                 valgrind_hdl.convert_xml()
-                log_test(self.conf, log_file.name, show_memleaks=False)
+                self.conf.check_log(log_file.name, show_memleaks=False)
 
 
 class ValgrindHelper():
@@ -1504,7 +1673,8 @@ class DFuse():
             fatal_errors = True
             run_leak_test = False
         self._sp = None
-        log_test(self.conf, self.log_file, show_memleaks=run_leak_test, ignore_einval=ignore_einval)
+        self.conf.check_log(self.log_file, show_memleaks=run_leak_test,
+                            ignore_einval=ignore_einval)
 
         # Finally, modify the valgrind xml file to remove the
         # prefix to the src dir.
@@ -1518,7 +1688,7 @@ class DFuse():
         ret = self._sp.wait()
         print(f'rc from dfuse {ret}')
         self._sp = None
-        log_test(self.conf, self.log_file)
+        self.conf.check_log(self.log_file)
 
         # Finally, modify the valgrind xml file to remove the
         # prefix to the src dir.
@@ -4669,6 +4839,8 @@ def run_posix_tests(server, conf, test_list):
                 test_cb()
                 ptl.container.destroy(valgrind=False, log_check=False)
                 ptl.container = None
+                # Wait for the logs of this test to be checked before reporting the result.
+                conf.join_log_checks()
             except Exception as inst:
                 trace = ''.join(traceback.format_tb(inst.__traceback__))
                 duration = time.perf_counter() - start
@@ -4828,6 +5000,7 @@ def check_no_file(dfuse):
 
 
 nlt_lp = None  # pylint: disable=invalid-name
+nlt_li = None  # pylint: disable=invalid-name
 nlt_lt = None  # pylint: disable=invalid-name
 nlt_ct = None  # pylint: disable=invalid-name
 
@@ -4848,10 +5021,12 @@ def setup_log_test(conf):
         sys.path.append(crt_mod_dir)
 
     global nlt_lp  # pylint: disable=invalid-name
+    global nlt_li  # pylint: disable=invalid-name
     global nlt_lt  # pylint: disable=invalid-name
     global nlt_ct  # pylint: disable=invalid-name
 
     nlt_lp = __import__('cart_logparse')
+    nlt_li = __import__('cart_logindex')
     nlt_lt = __import__('cart_logtest')
     ct_mod = __import__('cart_logusage')
 
@@ -4865,9 +5040,12 @@ def setup_log_test(conf):
 
     nlt_lt.wf = conf.wf
 
+    conf.start_log_checks()
+
 
 def close_log_test(conf):
     """Close down the log tracing"""
+    conf.stop_log_checks()
     conf.flush_bz2()
 
     if conf.args.log_usage_save:
@@ -4894,6 +5072,21 @@ def log_timer(func):
     return log_timer_wrapper
 
 
+class IlSummaryTracer():
+    """Log tracer keeping the lines logged by ioil_show_summary"""
+
+    def __init__(self):
+        self.lines = []
+
+    def add_line(self, line):
+        """Save a line"""
+        self.lines.append(line)
+
+    def report(self):
+        """Report per pid"""
+        return
+
+
 @log_timer
 def log_test(conf,
              filename,
@@ -4931,7 +5124,8 @@ def log_test(conf,
     if not quiet:
         print(f'Running log_test on {filename} {sizeof_fmt(fstat.st_size)}')
 
-    log_iter = nlt_lp.LogIter(filename)
+    # The log is compressed straight away so do not leave a sidecar index behind.
+    log_iter = nlt_lp.LogIter(filename, write_index=False)
 
     # LogIter will have opened the file and seek through it as required, so start a background
     # process to compress it in parallel with the log tracing.
@@ -4951,6 +5145,11 @@ def log_test(conf,
     if ignore_busy:
         lto.skip_suffixes.append(" DER_BUSY(-1012): 'Device or resource busy'")
 
+    # Collect the interception library summary in the same pass as the log checks.
+    il_tracer = IlSummaryTracer()
+    if check_read or check_write or check_fstat:
+        lto.add_tracer(il_tracer, None, ('ioil_show_summary',))
+
     try:
         lto.check_log_file(abort_on_warning=True,
                            show_memleaks=show_memleaks,
@@ -4963,9 +5162,7 @@ def log_test(conf,
             raise NLTestNoFi
 
     if check_read or check_write or check_fstat:
-        for line in log_iter.new_iter():
-            if line.function != "ioil_show_summary":
-                continue
+        for line in il_tracer.lines:
             print(line.get_msg())
 
             # These numbers match the D_INFO log line in the ioil_show_summary function.
@@ -5411,7 +5608,7 @@ def test_pydaos_kv(server, conf):
     daos.check(pool.label, "PYDAOS_NLT")
     # pylint: disable=protected-access
     daos._cleanup()
-    log_test(conf, pydaos_log_file.name)
+    conf.check_log(pydaos_log_file.name)
 
 
 def test_pydaos_kv_obj_class(server, conf):
@@ -5483,7 +5680,7 @@ def test_pydaos_kv_obj_class(server, conf):
     del kv2
     del container
     daos._cleanup()
-    log_test(conf, log_name)
+    conf.check_log(log_name)
 
 
 # Fault injection testing.
@@ -5617,6 +5814,25 @@ class AllocFailTestRun():
         self._post(rc)
         return True
 
+    def open_pidfd(self):
+        """Return a file descriptor which becomes readable when the command exits
+
+        Returns None if pidfd is not supported, in which case poll() should be used.
+        """
+        try:
+            return os.pidfd_open(self._sp.pid)
+        except (AttributeError, OSError):
+            return None
+
+    def poll(self):
+        """Return the exit status of the command without performing the checks"""
+        return self._sp.poll()
+
+    def finish(self, rc):
+        """Perform the checks once the command has exited with rc"""
+        if self.returncode is None:
+            self._post(rc)
+
     def wait(self):
         """Wait for the command to complete"""
         if self.returncode is not None:
@@ -5777,6 +5993,57 @@ class AllocFailTestRun():
         _explain()
 
 
+class AdaptiveLimit():
+    # pylint: disable=too-few-public-methods
+    """Limit on the number of processes to run at once, adjusted to the load average and memory
+
+    DAOS-14164 Back off on launching tests if the system is loaded.  The limit is lowered when
+    the load average exceeds the number of cores or the available memory drops below the
+    reserve, and raised again one process at a time once the node has recovered.  As the load
+    average is slow to react the limit is only adjusted once per interval.
+    """
+
+    def __init__(self, maximum, num_cores, reserve=2 * 1024 * 1024 * 1024, interval=2):
+        self.maximum = maximum
+        self.value = maximum
+        self._num_cores = num_cores
+        self._reserve = reserve
+        self._interval = interval
+        self._last = time.monotonic()
+
+    def update(self, active):
+        """Return the limit, adjusting it if the interval has passed"""
+        now = time.monotonic()
+        if self.maximum == 1 or now - self._last < self._interval:
+            return self.value
+        self._last = now
+
+        load_avg, _, _ = os.getloadavg()
+        available = self._get_mem_available()
+        low_memory = available is not None and available < self._reserve
+        if load_avg > self._num_cores or low_memory:
+            value = max(1, min(self.value, active) - max(1, active // 10))
+            if value < self.value:
+                print(f'High load average of {load_avg} or low memory, '
+                      f'decreasing parallelism to {value}')
+            self.value = value
+        elif load_avg < 0.8 * self._num_cores and self.value < self.maximum:
+            self.value += 1
+        return self.value
+
+    @staticmethod
+    def _get_mem_available():
+        """Return the available memory in bytes, or None if not known"""
+        try:
+            with open('/proc/meminfo', 'r') as fd:
+                for line in fd:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        return None
+
+
 class AllocFailTest():
     # pylint: disable=too-few-public-methods
     """Class to describe fault injection command"""
@@ -5843,7 +6110,9 @@ class AllocFailTest():
 
         print(f'Maximum number of spawned tests will be {max_child}')
 
-        active = []
+        limit = AdaptiveLimit(max_child, num_cores)
+        active = {}
+        checking = []
         fid = 2
         max_count = 0
         finished = False
@@ -5853,58 +6122,80 @@ class AllocFailTest():
 
         fatal_errors = False
 
-        max_load_avg = 100
-
-        # Now run all iterations in parallel up to max_child.  Iterations will be launched
-        # in order but may not finish in order, rather they are processed in the order they
-        # finish.  After each repetition completes then check for re-launch new processes
-        # to keep the pipeline full.
-        while not finished or active:
-
-            load_avg, _, _ = os.getloadavg()
-
-            # DAOS-14164 Back off on launching tests if the system is loaded.  If the node is above
-            # a certain load average then pause and lower the level of expected parallelism.  If the
-            # node is close to the maximum then do not decrease the count but put preference to
-            # completing running tests and only launch one test before re-sampling the load average.
-
-            start_this_iteration = 10
-            if max_child > 1 and load_avg > 0.8 * max_load_avg:
-                start_this_iteration = 1
-                if load_avg > max_load_avg:
-                    if max_count < max_child:
-                        max_child -= 5
+        # Now run all iterations in parallel up to the limit.  Iterations will be launched in
+        # order but may not finish in order, rather they are checked in the order they finish.
+        # Rather than polling each process the selector waits for a pidfd of a process to become
+        # readable when it exits, or for the checks of a process to complete.  The checks are run
+        # on a single checker thread so that new iterations can be launched to keep the pipeline
+        # full while the logs are checked.  This is deliberately not a pool sized like the
+        # launches, as the issues of a check are held in the pending list of the WarningsFactory
+        # until explain() is called, so only one check can be in progress at a time.
+        selector = selectors.DefaultSelector()
+        (wake_r, wake_w) = os.pipe()
+        selector.register(wake_r, selectors.EVENT_READ)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as checker:
+                while not finished or active or checking:
+                    # Only launch more iterations while the checks are keeping up, as the end of
+                    # the sweep is only known once an iteration without a fault is checked.
+                    start_this_iteration = 10
+                    while not finished and start_this_iteration > 0 and \
+                            len(active) < limit.update(len(active)) and \
+                            len(checking) < limit.value:
+                        ret = self._run_cmd(fid)
+                        active[ret] = ret.open_pidfd()
+                        if active[ret] is not None:
+                            selector.register(active[ret], selectors.EVENT_READ, ret)
+                        fid += 1
+                        start_this_iteration -= 1
+                        max_count = max(max_count, len(active))
+
+                    # Wait for processes to exit, or the checks of a process to complete.
+                    if not finished and len(active) < limit.value and \
+                            len(checking) < limit.value:
+                        timeout = 0
+                    elif None in active.values():
+                        timeout = 0.1
                     else:
-                        max_child -= 1
-                    max_child = max(max_child, 20)
-                    print(f"High load average of {load_avg}, "
-                          f"pausing and decreasing parallelism to {max_child} {max_count}")
-                    if max_child > 20:
-                        time.sleep(2)
-
-            if not finished:
-                while start_this_iteration > 0 and len(active) < max_child:
-                    active.append(self._run_cmd(fid))
-                    fid += 1
-                    start_this_iteration -= 1
-
-                    max_count = max(max_count, len(active))
-
-            # Now complete as many as have finished.
-            for ret in active:
-                if not ret.has_finished():
-                    continue
-                active.remove(ret)
-                print()
-                print(ret)
-                if ret.returncode < 0:
-                    fatal_errors = True
-                    to_rerun.append(ret.loc)
-
-                if not ret.fault_injected:
-                    print('Fault injection did not trigger, stopping')
-                    finished = True
-                break
+                        timeout = 1
+                    exited = []
+                    for key, _ in selector.select(timeout=timeout):
+                        if key.fd == wake_r:
+                            os.read(wake_r, 4096)
+                        else:
+                            exited.append(key.data)
+                    exited.extend(ret for ret, pidfd in active.items()
+                                  if pidfd is None and ret.poll() is not None)
+
+                    for ret in exited:
+                        pidfd = active.pop(ret)
+                        if pidfd is not None:
+                            selector.unregister(pidfd)
+                            os.close(pidfd)
+                        future = checker.submit(ret.finish, ret.poll())
+                        future.add_done_callback(lambda _: os.write(wake_w, b'.'))
+                        checking.append((ret, future))
+
+                    # Now process as many as have been checked, in the order they finished.
+                    while checking and checking[0][1].done():
+                        (ret, future) = checking.pop(0)
+                        future.result()
+                        print()
+                        print(ret)
+                        if ret.returncode < 0:
+                            fatal_errors = True
+                            to_rerun.append(ret.loc)
+
+                        if not ret.fault_injected:
+                            print('Fault injection did not trigger, stopping')
+                            finished = True
+        finally:
+            for pidfd in active.values():
+                if pidfd is not None:
+                    os.close(pidfd)
+            selector.close()
+            os.close(wake_r)
+            os.close(wake_w)
 
         print(f'Completed, fid {fid}')
         print(f'Max in flight {max_count}/{max_child}')
@@ -6470,6 +6761,8 @@ def server_fi(args):
         server.set_fi(probability=0)
         server.set_fi(probability=0)
 
+    conf.stop_log_checks()
+
 
 def generate_special_test_list():
     """List all special tests"""
@@ -6728,6 +7021,9 @@ def run(wf, args):
             if args.perf_check:
                 check_readdir_perf(server, conf)
 
+    # Wait for any remaining log checks as they may report errors.
+    conf.join_log_checks(all_threads=True)
+
     if fatal_errors.errors:
         wf.add_test_case('Errors', 'Significant errors encountered')
     else:
@@ -6776,6 +7072,9 @@ def main():
     parser.add_argument('--exclude-test', action='append',
                         help='space separated list of tests to exclude')
     parser.add_argument('--valgrind_verbose', action='store_true', help='Use --verbose w/ valgrind')
+    parser.add_argument('--log-check-jobs', type=int, default=0,
+                        help='Number of processes checking log files while the tests continue, '
+                        '0 to check each log file before continuing')
     parser.add_argument('mode', nargs='*')
     args = parser.parse_args()
 